@@ -1,10 +1,16 @@
 import streamlit as st
 
+from utils.layout import exibir_logo
+from utils.warmup import warm_up
+
 # Configuração do layout
 st.set_page_config(page_title="Dashboard Walmart", layout="wide")
 
+# Carregar dados, modelo e bibliotecas em segundo plano para as demais páginas
+warm_up()
+
 # Banner ou imagem
-st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/c/ca/Walmart_logo.svg/2560px-Walmart_logo.svg.png", width=150)
+exibir_logo()
 
 # Título principal
 st.markdown("<h1 style='text-align: center; color: #4CAF50;'>Bem-vindo ao Dashboard Walmart!</h1>", unsafe_allow_html=True)
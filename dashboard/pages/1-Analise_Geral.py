@@ -1,23 +1,23 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from pathlib import Path
 
-# Carregar os dados com caminho absoluto
-def load_data():
-    # Caminho absoluto baseado na raiz do projeto
-    base_dir = Path(__file__).resolve().parent.parent.parent  # Sobe três níveis para "Projeto/"
-    file_path = base_dir / "data" / "processed" / "df_final_walmart.csv"
-    return pd.read_csv(file_path)
+from utils.filters import sidebar_filters
+from utils.layout import exibir_logo
+from utils.sharding import SPECS, aggregate, missing_rate, prepare_frame, region_ranking
+from utils.sketches import use_approximate
+from utils.warmup import get_bitmap_index, get_dataset, get_kpi_store, warm_up
 
-# Carregar os dados
-df = load_data()
+# Iniciar o carregamento compartilhado (dados, modelo e bibliotecas) em segundo plano
+warm_up()
+
+# Carregar os dados (compartilhados entre as sessões)
+df = get_dataset()
 
 # Configuração do layout do Streamlit
 st.set_page_config(page_title="Dashboard Walmart", layout="wide")
 
 # Banner ou imagem
-st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/c/ca/Walmart_logo.svg/2560px-Walmart_logo.svg.png", width=150)
+exibir_logo()
 
 # Layout do Dashboard
 st.title("Visão Geral - Dashboard Walmart")
@@ -27,7 +27,7 @@ st.markdown("""
 <div style="background-color:#f9f9f9; padding: 15px; border-radius: 10px;">
     <p style="font-size: 18px;">         
         Aqui você encontrará uma análise completa sobre os pedidos realizados, itens entregues e faltantes, além de informações financeiras e operacionais.  
-        Use o filtro na barra lateral para explorar os dados por região específica ou visualizar o cenário geral.
+        Use os filtros na barra lateral para explorar os dados por região, categoria, período, dia da semana, faixa etária e datas, ou visualizar o cenário geral.
     </p>
 </div>
 """, unsafe_allow_html=True)
@@ -37,43 +37,61 @@ st.markdown("---")
 # Barra lateral para filtros
 st.sidebar.title("Filtros")
 
-# Ordenar as regiões em ordem alfabética
-regioes_ordenadas = sorted(df["region"].unique())
-
-# Criar botões de seleção para regiões (exibição vertical)
-selected_region = st.sidebar.radio(
-    "Selecione a Região:", 
-    options=["Todas"] + regioes_ordenadas
+# Filtros de seleção múltipla, resolvidos pelos índices de bitmap construídos no carregamento
+indice = get_bitmap_index()
+selecao = sidebar_filters(indice)
+regioes_selecionadas = selecao.values("region")
+
+# Filtrar os dados com base nos filtros selecionados
+df_filtered = selecao.apply(indice, df)
+if df_filtered.empty:
+    st.warning("Nenhum pedido atende aos filtros selecionados.")
+    st.stop()
+
+# Colunas derivadas das agregações compartilhadas com os relatórios (utils.sharding)
+df_filtered = prepare_frame(df_filtered)
+
+# Modo de cálculo dos KPIs: o aproximado usa agregados pré-calculados por partição
+modo_kpis = st.sidebar.radio(
+    "Cálculo dos KPIs:",
+    options=["Automático", "Exato", "Aproximado"],
+    help="No modo aproximado, os pedidos distintos são estimados com HyperLogLog e as somas vêm dos agregados "
+         "pré-calculados. O modo automático só usa a aproximação em seleções muito grandes."
 )
-
-# Filtrar os dados com base na região selecionada
-df_filtered = df if selected_region == "Todas" else df[df["region"] == selected_region]
+# Os agregados aproximados são por região × mês: com outros filtros ativos, o cálculo é exato
+regioes_kpis = regioes_selecionadas or None
+kpi_store = get_kpi_store()
+kpis_aproximados = selecao.only("region") and use_approximate(modo_kpis, kpi_store.rows(regioes_kpis))
 
 # KPIs Gerais
-total_pedidos = df_filtered["order_id"].nunique()
-total_produtos_entregues = df_filtered["items_delivered"].sum()
-total_pedidos_faltantes = df_filtered[df_filtered["items_missing"] > 0]["order_id"].nunique()
-total_itens_faltantes = df_filtered["items_missing"].sum()
-impacto_financeiro = df_filtered[df_filtered["items_missing"] > 0]["order_amount"].sum()
-
-# Corrigir taxa média de faltantes
-total_itens = total_produtos_entregues + total_itens_faltantes
-taxa_media_faltantes = (total_itens_faltantes / total_itens) if total_itens > 0 else 0
+if kpis_aproximados:
+    kpis = kpi_store.kpis(regioes_kpis)
+    total_pedidos = kpis["total_pedidos"]
+    total_produtos_entregues = kpis["total_produtos_entregues"]
+    total_pedidos_faltantes = kpis["total_pedidos_faltantes"]
+    total_itens_faltantes = kpis["total_itens_faltantes"]
+    impacto_financeiro = kpis["impacto_financeiro"]
+else:
+    kpis = aggregate(df_filtered, SPECS["kpis"]).to_dict("records")[0]
+    total_pedidos = kpis["total_pedidos"]
+    total_produtos_entregues = kpis["produtos_entregues"]
+    total_pedidos_faltantes = kpis["pedidos_com_faltantes"]
+    total_itens_faltantes = kpis["itens_faltantes"]
+    impacto_financeiro = kpis["impacto_financeiro"]
+
+# Taxa média de faltantes: faltantes / (entregues + faltantes)
+taxa_media_faltantes = missing_rate(total_itens_faltantes, total_produtos_entregues)
 
 # Motorista com mais entregas
 motorista_top = (
-    df_filtered.groupby("driver_name")
-    .agg(total_pedidos=("order_id", "count"), itens_faltantes=("items_missing", "sum"))
-    .reset_index()
+    aggregate(df_filtered, SPECS["pedidos_motorista"])
     .sort_values(by="total_pedidos", ascending=False)
     .iloc[0]
 )
 
 # Cliente com mais pedidos
 cliente_top = (
-    df_filtered.groupby("customer_name")
-    .agg(total_pedidos=("order_id", "count"), itens_faltantes=("items_missing", "sum"))
-    .reset_index()
+    aggregate(df_filtered, SPECS["pedidos_cliente"])
     .sort_values(by="total_pedidos", ascending=False)
     .iloc[0]
 )
@@ -81,8 +99,15 @@ cliente_top = (
 # KPIs Principais
 st.markdown("#### Indicadores-Chave de Desempenho (KPIs)")
 col1, col2, col3, col4, col5 = st.columns(5)
-col1.metric("Total de Pedidos", total_pedidos)
-col2.metric("Pedidos com Faltantes", total_pedidos_faltantes)
+if kpis_aproximados:
+    # Estimativas com a margem de erro (~95%) ao lado
+    col1.metric("Total de Pedidos", f"≈ {total_pedidos:,.0f}", f"± {kpis['erro_total_pedidos']:,.0f}",
+                delta_color="off")
+    col2.metric("Pedidos com Faltantes", f"≈ {total_pedidos_faltantes:,.0f}",
+                f"± {kpis['erro_total_pedidos_faltantes']:,.0f}", delta_color="off")
+else:
+    col1.metric("Total de Pedidos", total_pedidos)
+    col2.metric("Pedidos com Faltantes", total_pedidos_faltantes)
 col3.metric("Itens Faltantes", total_itens_faltantes)
 col4.metric("Taxa Média de Faltantes", f"{taxa_media_faltantes:.2%}")
 col5.metric("Produtos Entregues", total_produtos_entregues)
@@ -101,27 +126,35 @@ col7.metric(
 )
 col8.metric("Impacto Financeiro", f"$ {impacto_financeiro:,.2f}")
 
+if kpis_aproximados:
+    st.caption("Pedidos distintos estimados com HyperLogLog (margem de erro de ~95%). "
+               "Itens, valores e taxas são exatos.")
+
 st.markdown("---")
 
 # Gráficos por Região
 st.markdown("### Análise por Região")
 
-# Criar uma função para ajustar cores com base na região selecionada
-def ajustar_cores(df, coluna_regiao, regiao_selecionada):
-    if regiao_selecionada != "Todas":
-        df["opacity"] = df[coluna_regiao].apply(lambda x: 1 if x == regiao_selecionada else 0.5)
+# Comparação entre regiões: aplica os demais filtros, mas mantém todas as regiões
+df_regioes = prepare_frame(selecao.without("region").apply(indice, df))
+
+# Agregados por região (os mesmos do ranking dos relatórios), em ordem alfabética nos gráficos
+ranking_regioes = region_ranking(df_regioes)
+df_por_regiao = ranking_regioes.sort_values("region", ignore_index=True)
+
+# Criar uma função para ajustar cores com base nas regiões selecionadas
+def ajustar_cores(df, coluna_regiao, regioes_selecionadas):
+    if regioes_selecionadas:
+        df["opacity"] = df[coluna_regiao].apply(lambda x: 1 if x in regioes_selecionadas else 0.5)
     else:
         df["opacity"] = 1
     return df
 
 # Gráfico 1: Total de Pedidos e Total de Pedidos com Itens Faltantes por Região
-df_grouped_pedidos = df.groupby("region").agg(
-    total_pedidos=("order_id", "count"),
-    pedidos_com_faltantes=("order_id", lambda x: (df.loc[x.index, "items_missing"] > 0).sum())
-).reset_index()
+df_grouped_pedidos = df_por_regiao[["region", "total_pedidos", "pedidos_com_faltantes"]].copy()
 
 # Ajustar cores para destacar a região selecionada
-df_grouped_pedidos = ajustar_cores(df_grouped_pedidos, "region", selected_region)
+df_grouped_pedidos = ajustar_cores(df_grouped_pedidos, "region", regioes_selecionadas)
 
 fig_pedidos = px.bar(
     df_grouped_pedidos.melt(id_vars=["region", "opacity"], value_vars=["total_pedidos", "pedidos_com_faltantes"]),
@@ -153,13 +186,12 @@ st.markdown("""
 st.markdown("---")
 
 # Gráfico 2: Número de Itens Entregues e Itens Faltantes por Região
-df_grouped_itens = df.groupby("region").agg(
-    itens_entregues=("items_delivered", "sum"),
-    itens_faltantes=("items_missing", "sum")
-).reset_index()
+df_grouped_itens = df_por_regiao[["region", "produtos_entregues", "itens_faltantes"]].rename(
+    columns={"produtos_entregues": "itens_entregues"}
+)
 
 # Ajustar cores para destacar a região selecionada
-df_grouped_itens = ajustar_cores(df_grouped_itens, "region", selected_region)
+df_grouped_itens = ajustar_cores(df_grouped_itens, "region", regioes_selecionadas)
 
 fig_itens = px.bar(
     df_grouped_itens.melt(id_vars=["region", "opacity"], value_vars=["itens_entregues", "itens_faltantes"]),
@@ -190,13 +222,11 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Gráfico 3: Impacto Financeiro Comparado com Receita
-df_financeiro = df.groupby("region").agg(
-    receita_total=("order_amount", "sum"),
-    impacto_financeiro=("order_amount", lambda x: (df.loc[x.index, "items_missing"] > 0).sum())
-).reset_index()
+# Impacto financeiro: valor dos pedidos com itens faltantes
+df_financeiro = df_por_regiao[["region", "receita_total", "impacto_financeiro"]].copy()
 
 # Ajustar cores para destacar a região selecionada
-df_financeiro = ajustar_cores(df_financeiro, "region", selected_region)
+df_financeiro = ajustar_cores(df_financeiro, "region", regioes_selecionadas)
 
 fig_financeiro = px.bar(
     df_financeiro.melt(id_vars=["region", "opacity"], value_vars=["receita_total", "impacto_financeiro"]),
@@ -233,22 +263,10 @@ st.markdown("## Ranking das Região com Mais Itens Faltantes")
 # Texto explicativo para o gráfico 4
 st.markdown(""" * Esta tabela apresenta um ranking das regiões com base no impacto financeiro causado por itens faltantes. """)
 
-# Agrupar os dados por região e calcular as métricas
-df_tabela_regiao = df.groupby("region").agg(
-    total_pedidos=("order_id", "nunique"),  # Total de pedidos
-    produtos_entregues=("items_delivered", "sum"),  # Produtos entregues
-    itens_faltantes=("items_missing", "sum"),  # Itens faltantes
-    impacto_financeiro=("order_amount", lambda x: (df.loc[x.index, "items_missing"] > 0).sum())  # Impacto financeiro
-).reset_index()
-
-# Calcular a taxa média de faltantes
-df_tabela_regiao["taxa_media_faltantes"] = (
-    df_tabela_regiao["itens_faltantes"] /
-    (df_tabela_regiao["produtos_entregues"] + df_tabela_regiao["itens_faltantes"])
-) * 100
-
-# Ordenar a tabela pelo impacto financeiro em ordem decrescente
-df_tabela_regiao = df_tabela_regiao.sort_values(by="impacto_financeiro", ascending=False)
+# Ranking por impacto financeiro (já ordenado, com a taxa média de faltantes)
+df_tabela_regiao = ranking_regioes[[
+    "region", "total_pedidos", "produtos_entregues", "itens_faltantes", "impacto_financeiro", "taxa_media_faltantes"
+]].copy()
 
 # Renomear as colunas para exibição mais amigável
 df_tabela_regiao.rename(columns={
@@ -261,7 +279,7 @@ df_tabela_regiao.rename(columns={
 
 # Formatar os valores financeiros como moeda e taxas como porcentagem
 df_tabela_regiao["Valores Perdidos ($)"] = df_tabela_regiao["Valores Perdidos ($)"].apply(lambda x: f"$ {x:,.2f}")
-df_tabela_regiao["Taxa Média de Faltantes (%)"] = df_tabela_regiao["Taxa Média de Faltantes (%)"].apply(lambda x: f"{x:.2f}%")
+df_tabela_regiao["Taxa Média de Faltantes (%)"] = df_tabela_regiao["Taxa Média de Faltantes (%)"].apply(lambda x: f"{x:.2%}")
 
 # Exibir a tabela no Streamlit
 st.dataframe(df_tabela_regiao.set_index("Região"))
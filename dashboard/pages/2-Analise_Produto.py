@@ -1,23 +1,24 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from pathlib import Path
 
-# Carregar os dados com caminho absoluto
-def load_data():
-    # Caminho absoluto baseado na raiz do projeto
-    base_dir = Path(__file__).resolve().parent.parent.parent  # Sobe três níveis para "Projeto/"
-    file_path = base_dir / "data" / "processed" / "df_final_walmart.csv"
-    return pd.read_csv(file_path)
+from utils.features import time_counts, time_labels
+from utils.filters import sidebar_filters
+from utils.layout import exibir_logo
+from utils.tasks import run_tasks
+from utils.warmup import get_bitmap_index, get_dataset, warm_up
 
-# Carregar os dados
-df = load_data()
+# Iniciar o carregamento compartilhado (dados, modelo e bibliotecas) em segundo plano
+warm_up()
+
+# Carregar os dados (compartilhados entre as sessões)
+df = get_dataset()
 
 # Configuração do layout
 st.set_page_config(page_title="Análise Detalhada de Itens Faltantes", layout="wide")
 
 # Banner ou imagem
-st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/c/ca/Walmart_logo.svg/2560px-Walmart_logo.svg.png", width=150)
+exibir_logo()
 
 # Título
 st.title("Análise Detalhada de Itens Faltantes")
@@ -28,7 +29,7 @@ st.markdown("""
     <p style="font-size: 16px;">         
         Esta página apresenta uma análise detalhada sobre os itens faltantes nas entregas realizadas pelo Walmart.  
         Aqui você encontrará informações sobre categorias de produtos, tendências temporais e tamanho dos pedidos.  
-        Use o filtro na barra lateral para explorar os dados por região específica ou visualizar o cenário geral.
+        Use os filtros na barra lateral para explorar os dados por região, categoria, período, dia da semana, faixa etária e datas, ou visualizar o cenário geral.
     </p>
 </div>
 """, unsafe_allow_html=True)
@@ -38,15 +39,16 @@ st.markdown("---")
 # Barra lateral para filtros
 st.sidebar.title("Filtros")
 
-# Filtro por região
-regioes_ordenadas = sorted(df["region"].unique())
-selected_region = st.sidebar.radio(
-    "Selecione a Região:", 
-    options=["Todas"] + regioes_ordenadas
-)
+# Filtros de seleção múltipla, resolvidos pelos índices de bitmap construídos no carregamento
+indice = get_bitmap_index()
+selecao = sidebar_filters(indice)
+regioes_descricao = selecao.label("region")
 
 # Aplicar filtro
-df_filtered = df if selected_region == "Todas" else df[df["region"] == selected_region]
+df_filtered = selecao.apply(indice, df)
+if df_filtered.empty:
+    st.warning("Nenhum pedido atende aos filtros selecionados.")
+    st.stop()
 
 # Função para normalizar as categorias
 def normalize_category(category):
@@ -60,9 +62,99 @@ def normalize_category(category):
 # Aplicar a função na coluna 'category'
 df["category_cleaned"] = df["category"].apply(normalize_category)
 
-# Filtrar os dados com base na região selecionada e categorias válidas
-df_filtered_categoria = df[df["category_cleaned"].notnull()]
-df_filtered_categoria = df_filtered_categoria if selected_region == "Todas" else df_filtered_categoria[df_filtered_categoria["region"] == selected_region]
+# Filtrar os dados com base nos filtros selecionados e categorias válidas
+df_filtered_categoria = selecao.apply(indice, df)
+df_filtered_categoria = df_filtered_categoria[df_filtered_categoria["category_cleaned"].notnull()]
+
+# Função para limpar os nomes dos produtos (remover colchetes e aspas)
+def clean_product_name(product_name):
+    if isinstance(product_name, str):
+        return product_name.strip("[]").replace("'", "").replace('"', "").strip()
+    return product_name
+
+# Indicador de pedido com itens faltantes (usado nas tendências temporais)
+df_filtered = df_filtered.assign(tem_faltantes=df_filtered["items_missing"] > 0)
+
+# Agregações de cada seção da página. São independentes entre si e não alteram os
+# DataFrames de entrada, então são calculadas em paralelo e exibidas em ordem.
+def calcular_kpis():
+    # Número de pedidos fraudulentos
+    fraudes_totais = df_filtered_categoria[df_filtered_categoria["fraud_flag"] == 1]["order_id"].nunique()
+
+    # Número de itens faltantes por categoria (com percentual)
+    itens_faltantes_categoria = df_filtered_categoria.groupby("category_cleaned").agg(
+        total_itens_faltantes=("items_missing", "sum"),
+        total_itens=("items_delivered", "sum")
+    ).reset_index()
+    itens_faltantes_categoria["percentual_faltantes"] = (
+        itens_faltantes_categoria["total_itens_faltantes"] /
+        (itens_faltantes_categoria["total_itens_faltantes"] + itens_faltantes_categoria["total_itens"])
+    ) * 100
+
+    # Agrupar os dados por categoria e produto, calcular o número de vezes que cada produto foi reportado como faltante
+    produto_por_categoria = df_filtered_categoria.groupby(["category_cleaned", "product_name"]).agg(
+        vezes_reportado=("items_missing", "sum")  # Soma do número de itens faltantes
+    ).reset_index()
+
+    # Limpar os nomes dos produtos
+    produto_por_categoria["product_name"] = produto_por_categoria["product_name"].apply(clean_product_name)
+    return fraudes_totais, itens_faltantes_categoria, produto_por_categoria
+
+def calcular_categorias():
+    # Agrupar os dados por categoria limpa e calcular o total de itens faltantes e impacto financeiro
+    return df_filtered_categoria.groupby("category_cleaned").agg(
+        itens_faltantes=("items_missing", "sum"),
+        impacto_financeiro=("order_amount", "sum")  # Soma do valor financeiro por categoria
+    ).reset_index()
+
+def contar_pedidos(coluna, rotulo):
+    # Contagens por código inteiro pré-calculado (hora, dia da semana ou mês), na ordem natural
+    total_pedidos = time_counts(df_filtered[coluna], coluna)
+    pedidos_com_faltantes = time_counts(df_filtered[coluna], coluna, mask=df_filtered["tem_faltantes"])
+    df_contagem = pd.DataFrame({
+        rotulo: time_labels(coluna),
+        "total_pedidos": total_pedidos,
+        "pedidos_com_faltantes": pedidos_com_faltantes,
+    })
+    # Manter apenas os valores com pedidos
+    return df_contagem[total_pedidos > 0].reset_index(drop=True)
+
+def calcular_hora():
+    return contar_pedidos("hour", "delivery_hour")
+
+def calcular_dia():
+    return contar_pedidos("weekday", "day_of_week")
+
+def calcular_mes():
+    return contar_pedidos("month", "month_name")
+
+def calcular_tamanho_pedido():
+    # Calcular o tamanho do pedido (total de itens)
+    tamanho_pedido = (df_filtered["items_delivered"] + df_filtered["items_missing"]).rename("tamanho_pedido")
+
+    # Agrupar os dados pelo tamanho do pedido e calcular o total de itens faltantes
+    return df_filtered.groupby(tamanho_pedido).agg(
+        itens_faltantes=("items_missing", "sum")
+    ).reset_index()
+
+def calcular_tabela_produtos():
+    # Limpar os nomes dos produtos e agrupar por nome do produto e categoria
+    nomes = df_filtered_categoria["product_name"].apply(clean_product_name).rename("product_name_cleaned")
+    return df_filtered_categoria.groupby([nomes, "category_cleaned"]).agg(
+        quantidade_pedidos=("order_id", "count"),  # Número de pedidos
+        quantidade_faltantes=("items_missing", "sum"),  # Soma dos itens faltantes
+        valor_financeiro=("order_amount", "sum")  # Soma do valor financeiro
+    ).reset_index()
+
+resultados = run_tasks({
+    "kpis": calcular_kpis,
+    "categorias": calcular_categorias,
+    "hora": calcular_hora,
+    "dia": calcular_dia,
+    "mes": calcular_mes,
+    "tamanho_pedido": calcular_tamanho_pedido,
+    "tabela_produtos": calcular_tabela_produtos,
+})
 
 # Seção 1: KPIs Resumidos
 st.markdown("### Indicadores-Chave de Desempenho (KPIs)")
@@ -70,20 +162,11 @@ st.markdown("### Indicadores-Chave de Desempenho (KPIs)")
 # Linha 1: Pedidos fraudulentos e itens faltantes (%)
 col1, col2, col3 = st.columns(3)
 
+fraudes_totais, itens_faltantes_categoria, produto_por_categoria = resultados["kpis"]
+
 # Número de pedidos fraudulentos
-fraudes_totais = df_filtered_categoria[df_filtered_categoria["fraud_flag"] == 1]["order_id"].nunique()
 col1.metric("Pedidos Fraudulentos", fraudes_totais)
 
-# Número de itens faltantes por categoria (com percentual)
-itens_faltantes_categoria = df_filtered_categoria.groupby("category_cleaned").agg(
-    total_itens_faltantes=("items_missing", "sum"),
-    total_itens=("items_delivered", "sum")
-).reset_index()
-itens_faltantes_categoria["percentual_faltantes"] = (
-    itens_faltantes_categoria["total_itens_faltantes"] /
-    (itens_faltantes_categoria["total_itens_faltantes"] + itens_faltantes_categoria["total_itens"])
-) * 100
-
 supermarket_percentual = itens_faltantes_categoria.loc[itens_faltantes_categoria["category_cleaned"] == "Supermarket", "percentual_faltantes"]
 electronics_percentual = itens_faltantes_categoria.loc[itens_faltantes_categoria["category_cleaned"] == "Electronics", "percentual_faltantes"]
 
@@ -97,65 +180,41 @@ col3.metric(
 )
 
 # Linha 2: Produtos mais reportados
-# Função para limpar os nomes dos produtos (remover colchetes e aspas)
-def clean_product_name(product_name):
-    if isinstance(product_name, str):
-        return product_name.strip("[]").replace("'", "").replace('"', "").strip()
-    return product_name
-
-# Agrupar os dados por categoria e produto, calcular o número de vezes que cada produto foi reportado como faltante
-produto_por_categoria = df_filtered_categoria.groupby(["category_cleaned", "product_name"]).agg(
-    vezes_reportado=("items_missing", "sum")  # Soma do número de itens faltantes
-).reset_index()
-
-# Limpar os nomes dos produtos
-produto_por_categoria["product_name"] = produto_por_categoria["product_name"].apply(clean_product_name)
-
-# Identificar o produto mais reportado por categoria
-produto_supermarket = produto_por_categoria[produto_por_categoria["category_cleaned"] == "Supermarket"].sort_values(
-    by="vezes_reportado", ascending=False).iloc[0]
-produto_electronics = produto_por_categoria[produto_por_categoria["category_cleaned"] == "Electronics"].sort_values(
-    by="vezes_reportado", ascending=False).iloc[0]
+# Identificar o produto mais reportado por categoria (a categoria pode não ter pedidos nos filtros)
+def produto_mais_reportado(categoria):
+    produtos = produto_por_categoria[produto_por_categoria["category_cleaned"] == categoria]
+    if produtos.empty:
+        return None
+    return produtos.sort_values(by="vezes_reportado", ascending=False).iloc[0]
 
 # Exibir os KPIs para produtos mais reportados
 col4, col5 = st.columns(2)
 
-col4.metric(
-    f"Produto Mais Reportado (Supermarket)",
-    f"{produto_supermarket['product_name']}",
-    f"Vezes Reportado: {produto_supermarket['vezes_reportado']}"
-)
-
-col5.metric(
-    f"Produto Mais Reportado (Electronics)",
-    f"{produto_electronics['product_name']}",
-    f"Vezes Reportado: {produto_electronics['vezes_reportado']}"
-)
+for coluna, categoria in [(col4, "Supermarket"), (col5, "Electronics")]:
+    produto = produto_mais_reportado(categoria)
+    if produto is None:
+        coluna.metric(f"Produto Mais Reportado ({categoria})", "-")
+    else:
+        coluna.metric(
+            f"Produto Mais Reportado ({categoria})",
+            f"{produto['product_name']}",
+            f"Vezes Reportado: {produto['vezes_reportado']}"
+        )
 
 st.markdown("---")
 
 # Seção 2: Análise de Categorias e Produtos
 st.markdown("## Análise de Categorias e Produtos")
 
-# Aplicar a função na coluna 'category'
-df["category_cleaned"] = df["category"].apply(normalize_category)
-
-# Filtrar os dados com base na região selecionada e categorias válidas
-df_filtered_categoria = df[df["category_cleaned"].notnull()]
-df_filtered_categoria = df_filtered_categoria if selected_region == "Todas" else df_filtered_categoria[df_filtered_categoria["region"] == selected_region]
-
-# Agrupar os dados por categoria limpa e calcular o total de itens faltantes e impacto financeiro
-df_categoria = df_filtered_categoria.groupby("category_cleaned").agg(
-    itens_faltantes=("items_missing", "sum"),
-    impacto_financeiro=("order_amount", "sum")  # Soma do valor financeiro por categoria
-).reset_index()
+# Total de itens faltantes e impacto financeiro por categoria
+df_categoria = resultados["categorias"]
 
 # Criar gráfico de barras para as categorias mais associadas a itens faltantes
 fig_categoria = px.bar(
     df_categoria,
     x="category_cleaned",
     y="itens_faltantes",
-    title=f"Categorias mais Associadas a Itens Faltantes ({selected_region})",
+    title=f"Categorias mais Associadas a Itens Faltantes ({regioes_descricao})",
     labels={"category_cleaned": "Categoria", "itens_faltantes": "Itens Faltantes"},
     color="category_cleaned",
     text="impacto_financeiro"  # Adicionar valores financeiros diretamente nas barras
@@ -185,44 +244,34 @@ st.markdown("---")
 st.markdown("## Tendências Temporais")
 
 # Gráfico 1: Pedidos com Itens Faltantes por Hora do Dia
-# Converter delivery_hour para datetime e extrair apenas a hora inteira
-df_filtered["delivery_hour"] = pd.to_datetime(df_filtered["delivery_hour"], format="%H:%M:%S", errors="coerce").dt.hour
+# Pedidos por hora inteira
+df_hora = resultados["hora"]
 
-# Verificar se há dados válidos após a conversão
-if df_filtered["delivery_hour"].isnull().all():
-    st.error("Não há dados válidos na coluna 'delivery_hour'.")
+# Verificar se há dados após o agrupamento
+if df_hora.empty:
+    st.warning("Não há dados disponíveis para criar o gráfico.")
 else:
-    # Agrupar os dados por hora inteira
-    df_hora = df_filtered.groupby("delivery_hour").agg(
-        total_pedidos=("order_id", "count"),
-        pedidos_com_faltantes=("order_id", lambda x: (df.loc[x.index, "items_missing"] > 0).sum())
-    ).reset_index()
-
-    # Verificar se há dados após o agrupamento
-    if df_hora.empty:
-        st.warning("Não há dados disponíveis para criar o gráfico.")
-    else:
-        # Criar gráfico combinado: barras para total de pedidos e linha para pedidos com itens faltantes
-        fig_hora = px.bar(
-            df_hora,
-            x="delivery_hour",
-            y="total_pedidos",
-            title="Frequência de Pedidos por Hora do Dia com Itens Faltantes",
-            labels={"delivery_hour": "Hora do Dia", "total_pedidos": "Número de Pedidos"},
-            color_discrete_sequence=["#636EFA"],  # Cor das barras
-        )
-
-        # Adicionar linha ao gráfico para representar pedidos com itens faltantes
-        fig_hora.add_scatter(
-            x=df_hora["delivery_hour"],
-            y=df_hora["pedidos_com_faltantes"],
-            mode="lines+markers",
-            name="Pedidos com Itens Faltantes",
-            line=dict(color="#EF553B", width=2),  # Cor e espessura da linha
-        )
-
-        # Exibir o gráfico no Streamlit
-        st.plotly_chart(fig_hora, use_container_width=True)
+    # Criar gráfico combinado: barras para total de pedidos e linha para pedidos com itens faltantes
+    fig_hora = px.bar(
+        df_hora,
+        x="delivery_hour",
+        y="total_pedidos",
+        title="Frequência de Pedidos por Hora do Dia com Itens Faltantes",
+        labels={"delivery_hour": "Hora do Dia", "total_pedidos": "Número de Pedidos"},
+        color_discrete_sequence=["#636EFA"],  # Cor das barras
+    )
+
+    # Adicionar linha ao gráfico para representar pedidos com itens faltantes
+    fig_hora.add_scatter(
+        x=df_hora["delivery_hour"],
+        y=df_hora["pedidos_com_faltantes"],
+        mode="lines+markers",
+        name="Pedidos com Itens Faltantes",
+        line=dict(color="#EF553B", width=2),  # Cor e espessura da linha
+    )
+
+    # Exibir o gráfico no Streamlit
+    st.plotly_chart(fig_hora, use_container_width=True)
 
 st.markdown("""
 <div style="background-color:#f9f9f9; padding: 15px; border-radius: 10px;">
@@ -237,18 +286,8 @@ st.markdown("---")
 
 # Gráfico 2: Pedidos com Itens Faltantes por Dia da Semana
 
-# Definir a ordem dos dias da semana
-dias_da_semana = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-
-# Agrupar os dados por dia da semana
-df_dia = df_filtered.groupby("day_of_week").agg(
-    total_pedidos=("order_id", "count"),
-    pedidos_com_faltantes=("order_id", lambda x: (df.loc[x.index, "items_missing"] > 0).sum())
-).reset_index()
-
-# Ordenar os dados pela ordem dos dias da semana
-df_dia["day_of_week"] = pd.Categorical(df_dia["day_of_week"], categories=dias_da_semana, ordered=True)
-df_dia = df_dia.sort_values("day_of_week")
+# Pedidos por dia da semana, na ordem dos dias
+df_dia = resultados["dia"]
 
 # Criar gráfico combinado: barras para total de pedidos e linha para pedidos com itens faltantes
 fig_dia = px.bar(
@@ -285,21 +324,8 @@ st.markdown("---")
 
 # Gráfico 3: Pedidos com Itens Faltantes por Mês
 
-# Definir a ordem dos meses
-meses_do_ano = [
-    "January", "February", "March", "April", "May", "June",
-    "July", "August", "September", "October", "November", "December"
-]
-
-# Agrupar os dados por mês
-df_mes = df_filtered.groupby("month_name").agg(
-    total_pedidos=("order_id", "count"),
-    pedidos_com_faltantes=("order_id", lambda x: (df.loc[x.index, "items_missing"] > 0).sum())
-).reset_index()
-
-# Ordenar os dados pela ordem dos meses do ano
-df_mes["month_name"] = pd.Categorical(df_mes["month_name"], categories=meses_do_ano, ordered=True)
-df_mes = df_mes.sort_values("month_name")
+# Pedidos por mês, na ordem dos meses do ano
+df_mes = resultados["mes"]
 
 # Criar gráfico combinado: barras para total de pedidos e linha para pedidos com itens faltantes
 fig_mes = px.bar(
@@ -337,23 +363,15 @@ st.markdown("---")
 # Seção 3: Tamanho do Pedido vs Itens Faltantes
 st.markdown("## Tamanho do Pedido vs Itens Faltantes")
 
-# Filtrar os dados com base na região selecionada
-df_filtered_tamanho = df if selected_region == "Todas" else df[df["region"] == selected_region]
-
-# Calcular o tamanho do pedido (total de itens)
-df_filtered_tamanho["tamanho_pedido"] = df_filtered_tamanho["items_delivered"] + df_filtered_tamanho["items_missing"]
-
-# Agrupar os dados pelo tamanho do pedido e calcular o total de itens faltantes
-df_tamanho_pedido = df_filtered_tamanho.groupby("tamanho_pedido").agg(
-    itens_faltantes=("items_missing", "sum")
-).reset_index()
+# Total de itens faltantes por tamanho do pedido
+df_tamanho_pedido = resultados["tamanho_pedido"]
 
 # Criar gráfico mostrando a relação entre tamanho do pedido e itens faltantes
 fig_tamanho_pedido = px.bar(
     df_tamanho_pedido,
     x="tamanho_pedido",
     y="itens_faltantes",
-    title=f"Relação entre Tamanho do Pedido e Itens Faltantes ({selected_region})",
+    title=f"Relação entre Tamanho do Pedido e Itens Faltantes ({regioes_descricao})",
     labels={"tamanho_pedido": "Tamanho do Pedido (Número Total de Itens)", "itens_faltantes": "Itens Faltantes"},
     color_discrete_sequence=["#636EFA"]
 )
@@ -380,21 +398,8 @@ st.markdown("""
 * Os produtos estão ordenados por quantidade de itens faltantes e impacto financeiro.
 """)
 
-# Função para limpar os nomes dos produtos (remover colchetes e aspas)
-def clean_product_name(product_name):
-    if isinstance(product_name, str):
-        return product_name.strip("[]").replace("'", "").replace('"', "").strip()
-    return product_name
-
-# Aplicar a função na coluna 'product_name' para limpar os nomes dos produtos
-df_filtered_categoria["product_name_cleaned"] = df_filtered_categoria["product_name"].apply(clean_product_name)
-
-# Agrupar os dados por nome do produto e categoria, calcular as métricas
-df_tabela_produtos = df_filtered_categoria.groupby(["product_name_cleaned", "category_cleaned"]).agg(
-    quantidade_pedidos=("order_id", "count"),  # Número de pedidos
-    quantidade_faltantes=("items_missing", "sum"),  # Soma dos itens faltantes
-    valor_financeiro=("order_amount", "sum")  # Soma do valor financeiro
-).reset_index()
+# Métricas por nome do produto e categoria
+df_tabela_produtos = resultados["tabela_produtos"]
 
 # Separar as tabelas por categoria
 df_supermarket = df_tabela_produtos[df_tabela_produtos["category_cleaned"] == "Supermarket"].sort_values(
@@ -1,23 +1,22 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from pathlib import Path
 
-# Carregar os dados com caminho absoluto
-def load_data():
-    # Caminho absoluto baseado na raiz do projeto
-    base_dir = Path(__file__).resolve().parent.parent.parent  # Sobe três níveis para "Projeto/"
-    file_path = base_dir / "data" / "processed" / "df_final_walmart.csv"
-    return pd.read_csv(file_path)
+from utils.filters import sidebar_filters
+from utils.layout import exibir_logo
+from utils.sharding import SPECS, aggregate, loss_ranking, prepare_frame
+from utils.warmup import get_bitmap_index, get_dataset, warm_up
 
-# Carregar os dados
-df = load_data()
+# Iniciar o carregamento compartilhado (dados, modelo e bibliotecas) em segundo plano
+warm_up()
+
+# Carregar os dados (compartilhados entre as sessões)
+df = get_dataset()
 
 # Configuração do layout
 st.set_page_config(page_title="Análise Detalhada: Motoristas e Clientes", layout="wide")
 
 # Banner ou imagem
-st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/c/ca/Walmart_logo.svg/2560px-Walmart_logo.svg.png", width=150)
+exibir_logo()
 
 # Título
 st.title("Análise Detalhada: Motoristas e Clientes")
@@ -28,7 +27,7 @@ st.markdown("""
     <p style="font-size: 16px;">         
         Esta página apresenta uma análise detalhada sobre motoristas e clientes envolvidos nas entregas realizadas pelo Walmart.  
         Aqui você encontrará informações sobre idade, taxa média de reclamação, número total de viagens/pedidos, além do impacto financeiro associado a problemas nas entregas.  
-        Use o filtro na barra lateral para explorar os dados por região específica ou visualizar o cenário geral.
+        Use os filtros na barra lateral para explorar os dados por região, categoria, período, dia da semana, faixa etária e datas, ou visualizar o cenário geral.
     </p>
 </div>
 """, unsafe_allow_html=True)
@@ -38,25 +37,30 @@ st.markdown("---")
 # Barra lateral para filtros
 st.sidebar.title("Filtros")
 
-# Filtro por região
-regioes_ordenadas = sorted(df["region"].unique())
-selected_region = st.sidebar.radio(
-    "Selecione a Região:", 
-    options=["Todas"] + regioes_ordenadas
-)
+# Filtros de seleção múltipla, resolvidos pelos índices de bitmap construídos no carregamento
+indice = get_bitmap_index()
+selecao = sidebar_filters(indice)
 
 # Aplicar filtro
-df_filtered = df if selected_region == "Todas" else df[df["region"] == selected_region]
+df_filtered = selecao.apply(indice, df)
+if df_filtered.empty:
+    st.warning("Nenhum pedido atende aos filtros selecionados.")
+    st.stop()
+
+# Colunas derivadas das agregações compartilhadas com os relatórios (utils.sharding)
+df_filtered = prepare_frame(df_filtered)
 
 # Seção 1: KPIs Resumidos
 st.markdown("### Indicadores-Chave de Desempenho (KPIs)")
 
+kpis = aggregate(df_filtered, SPECS["motorista_cliente"]).to_dict("records")[0]
+
 col1, col2, col3, col4 = st.columns(4)
 
-col1.metric("Reclamação Média dos Motoristas", f"{df_filtered['driver_complaint_rate'].mean():.2%}")
-col2.metric("Reclamação Média dos Clientes", f"{df_filtered['customer_complaint_rate'].mean():.2%}")
-col3.metric("Total de Viagens (Motoristas)", df_filtered["driver_recurrence"].sum())
-col4.metric("Total de Pedidos (Clientes)", df_filtered["customer_recurrence"].sum())
+col1.metric("Reclamação Média dos Motoristas", f"{kpis['reclamacao_motoristas'] / kpis['n_pedidos']:.2%}")
+col2.metric("Reclamação Média dos Clientes", f"{kpis['reclamacao_clientes'] / kpis['n_pedidos']:.2%}")
+col3.metric("Total de Viagens (Motoristas)", kpis["viagens_motoristas"])
+col4.metric("Total de Pedidos (Clientes)", kpis["pedidos_clientes"])
 
 st.markdown("---")
 
@@ -64,10 +68,7 @@ st.markdown("---")
 st.markdown("## Idade vs Taxa Média de Pedidos com Faltantes")
 
 # Gráfico 1: Idade do Motorista vs Taxa Média de Pedidos com Faltantes e Sem Faltantes
-df_motorista_idade = df_filtered.groupby("age").agg(
-    total_pedidos=("order_id", "count"),
-    pedidos_com_faltantes=("order_id", lambda x: (df.loc[x.index, "items_missing"] > 0).sum())
-).reset_index()
+df_motorista_idade = aggregate(df_filtered, SPECS["idade_motorista"])
 
 # Calcular taxas médias
 df_motorista_idade["taxa_com_faltantes"] = df_motorista_idade["pedidos_com_faltantes"] / df_motorista_idade["total_pedidos"]
@@ -101,10 +102,7 @@ st.markdown("""
 st.markdown("---")
 
 # Gráfico 2: Idade do Cliente vs Taxa Média de Pedidos com Faltantes e Sem Faltantes
-df_cliente_idade = df_filtered.groupby("customer_age").agg(
-    total_pedidos=("order_id", "count"),
-    pedidos_com_faltantes=("order_id", lambda x: (df.loc[x.index, "items_missing"] > 0).sum())
-).reset_index()
+df_cliente_idade = aggregate(df_filtered, SPECS["idade_cliente"])
 
 # Calcular taxas médias
 df_cliente_idade["taxa_com_faltantes"] = df_cliente_idade["pedidos_com_faltantes"] / df_cliente_idade["total_pedidos"]
@@ -138,28 +136,18 @@ st.markdown("""
 st.markdown("---")
 
 # Seção 4: Top 10 Motoristas e Clientes por Perda Financeira
-st.markdown(f"### Detalhes da Região Selecionada: {selected_region}")
+st.markdown(f"### Detalhes da Região Selecionada: {selecao.label('region')}")
 st.markdown("## Top 10 Motoristas e Clientes por Perda Financeira")
 st.markdown("""
 * As tabelas abaixo destacam os motoristas e clientes com mais itens entregues, taxa média e maior perda financeira.  
 * Os motoristas e clientes estão ordenados por perda financeira.
 """)
-    
-df_faltantes = df_filtered[df_filtered["items_missing"] > 0]
 
 # Tabela de motoristas com itens faltantes
 st.markdown("### Motoristas")
-tabela_motoristas = df_faltantes.groupby("driver_name").agg(
-    n_pedidos=("order_id", "count"),
-    pedidos_com_faltantes=("order_id", "nunique"),
-    itens_entregues=("items_delivered", "sum"),
-    itens_faltantes=("items_missing", "sum"),
-    perda_financeira=("order_amount", "sum")
-).reset_index().sort_values(by="perda_financeira", ascending=False)
-
-tabela_motoristas["taxa_media_faltantes"] = (
-    tabela_motoristas["itens_faltantes"] / (tabela_motoristas["itens_entregues"] + tabela_motoristas["itens_faltantes"])
-).apply(lambda x: f"{x*100:.2f}%")
+tabela_motoristas = loss_ranking(df_filtered, "motoristas")
+
+tabela_motoristas["taxa_media_faltantes"] = tabela_motoristas["taxa_media_faltantes"].apply(lambda x: f"{x*100:.2f}%")
 
 tabela_motoristas["perda_financeira"] = tabela_motoristas["perda_financeira"].apply(lambda x: f"$ {x:,.2f}")
 
@@ -169,17 +157,9 @@ st.markdown("---")
 
 # Tabela de clientes com itens faltantes
 st.markdown("### Clientes")
-tabela_clientes = df_faltantes.groupby("customer_name").agg(
-    n_pedidos=("order_id", "count"),
-    pedidos_com_faltantes=("order_id", "nunique"),
-    itens_entregues=("items_delivered", "sum"),
-    itens_faltantes=("items_missing", "sum"),
-    perda_financeira=("order_amount", "sum")
-).reset_index().sort_values(by="perda_financeira", ascending=False)
-
-tabela_clientes["taxa_media_faltantes"] = (
-    tabela_clientes["itens_faltantes"] / (tabela_clientes["itens_entregues"] + tabela_clientes["itens_faltantes"])
-).apply(lambda x: f"{x*100:.2f}%")
+tabela_clientes = loss_ranking(df_filtered, "clientes")
+
+tabela_clientes["taxa_media_faltantes"] = tabela_clientes["taxa_media_faltantes"].apply(lambda x: f"{x*100:.2f}%")
 
 tabela_clientes["perda_financeira"] = tabela_clientes["perda_financeira"].apply(lambda x: f"$ {x:,.2f}")
 
@@ -1,24 +1,27 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
-from pathlib import Path
 
-# Carregar os dados com caminho absoluto
-def load_data():
-    # Caminho absoluto baseado na raiz do projeto
-    base_dir = Path(__file__).resolve().parent.parent.parent  # Sobe três níveis para "Projeto/"
-    file_path = base_dir / "data" / "processed" / "df_final_walmart.csv"
-    return pd.read_csv(file_path)
+from utils.layout import exibir_logo
+from utils.model import CATEGORIES, FEATURE_LABELS
+from utils.sensitivity import (
+    PAINEL, SWEEP_CATEGORICAL, SWEEP_NUMERIC, build_scenarios, categorical_values, heatmap_table, numeric_values,
+    score_scenarios
+)
+from utils.thresholds import threshold_for
+from utils.warmup import get_dataset, get_model, get_model_signature, get_prediction_cache, warm_up
 
-# Carregar os dados
-df = load_data()
+# Iniciar o carregamento compartilhado (dados, modelo e bibliotecas) em segundo plano
+warm_up()
+
+# Carregar os dados (compartilhados entre as sessões)
+df = get_dataset()
 
 # Configuração do layout
 st.set_page_config(page_title="Modelo Preditivo", layout="wide")
 
 # Banner ou imagem
-st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/c/ca/Walmart_logo.svg/2560px-Walmart_logo.svg.png", width=150)
+exibir_logo()
 
 # Título
 st.title("Modelo Preditivo")
@@ -38,14 +41,7 @@ st.markdown("---")
 # Carregar o modelo preditivo salvo em um arquivo .pkl
 def carregar_modelo():
     try:
-        # Caminho absoluto baseado na raiz do projeto
-        base_dir = Path(__file__).resolve().parent.parent.parent  # Sobe três níveis para "Projeto/"
-        modelo_path = base_dir / "modelo" / "gradient_boosting_model.pkl"
-        
-        if not modelo_path.exists():
-            raise FileNotFoundError(f"O arquivo do modelo não foi encontrado em: {modelo_path}")
-        
-        return joblib.load(modelo_path)
+        return get_model()
     except Exception as e:
         st.error(f"Erro ao carregar o modelo: {e}")
         return None
@@ -58,121 +54,58 @@ if modelo is not None:
 else:
     st.error("O modelo não foi carregado corretamente.")
 
-# Definir as colunas usadas no treinamento (extraídas do Jupyter Notebook)
-X_train_columns = [
-    # Variáveis Numéricas
-    "order_amount", "items_delivered", "Trips",
-    "driver_complaint_rate", "customer_complaint_rate", "is_night_delivery",
-
-    # region (codificadas)
-    "region_Altamonte Springs", "region_Apopka", "region_Clermont",
-    "region_Kissimmee", "region_Orlando", "region_Sanford",
-    "region_Winter Park",
-
-    # delivery_period (codificadas)
-    "delivery_period_Manhã", "delivery_period_Noite", "delivery_period_Tarde",
-
-    # day_of_week (codificadas)
-    "day_of_week_Friday", "day_of_week_Monday", "day_of_week_Saturday",
-    "day_of_week_Sunday", "day_of_week_Thursday", "day_of_week_Tuesday",
-    "day_of_week_Wednesday",
-
-    # driver_age_group (codificadas)
-    "driver_age_group_18-25", "driver_age_group_26-35",
-    "driver_age_group_36-45", "driver_age_group_46-55",
-    "driver_age_group_56-65",
-
-    # customer_age_group (codificadas)
-    "customer_age_group_18-25", "customer_age_group_26-35",
-    "customer_age_group_36-45", "customer_age_group_46-55",
-    "customer_age_group_56-65", "customer_age_group_66-75",
-    "customer_age_group_76-85", "customer_age_group_85+",
-
-    # order_value_category (codificadas)
-    "order_value_category_low", "order_value_category_medium",
-    "order_value_category_high"
-]
+# Explicações por previsão (contribuição de cada variável para o log-odds);
+# a versão do arquivo do modelo faz parte da chave do cache
+@st.cache_resource
+def carregar_explicador(_modelo, versao_modelo):
+    from utils.explain import GradientBoostingExplainer
+
+    return GradientBoostingExplainer(_modelo[-1])
 
 if modelo is not None:
     st.markdown("### Insira os Dados para Previsão")
         
     # Widgets interativos para entrada manual de dados
     order_amount = st.number_input("Valor Total do Pedido ($)", min_value=0.0, value=150.0)
-    region = st.selectbox("Região", ['Altamonte Springs', 'Apopka', 'Clermont', 
-                                     'Kissimmee', 'Orlando', 'Sanford', 
-                                     'Winter Park'])
+    region = st.selectbox("Região", CATEGORIES["region"])
     items_delivered = st.number_input("Itens Entregues", min_value=0, value=5)
-    delivery_period = st.selectbox("Período da Entrega", ['Manhã', 'Noite', 
-                                                         'Tarde'])
-    day_of_week = st.selectbox("Dia da Semana", ["Friday", "Monday", "Saturday", 
-                                                 "Sunday", "Thursday", 
-                                                 "Tuesday", "Wednesday"])
-    driver_age_group = st.selectbox("Faixa Etária do Motorista", ['18-25', '26-35', 
-                                                                  '36-45', '46-55',
-                                                                  '56-65'])
-    customer_age_group = st.selectbox("Faixa Etária do Cliente", ['18-25', '26-35',
-                                                                  '36-45', '46-55',
-                                                                  '56-65', '66-75',
-                                                                  '76-85', '85+'])
+    delivery_period = st.selectbox("Período da Entrega", CATEGORIES["delivery_period"])
+    day_of_week = st.selectbox("Dia da Semana", CATEGORIES["day_of_week"])
+    driver_age_group = st.selectbox("Faixa Etária do Motorista", CATEGORIES["driver_age_group"])
+    customer_age_group = st.selectbox("Faixa Etária do Cliente", CATEGORIES["customer_age_group"])
     Trips = st.number_input("Número de Viagens (Motorista)", min_value=0, value=10)
     is_night_delivery = st.selectbox("Entrega Noturna?", [0, 1])
-    order_value_category = st.selectbox("Categoria do Valor do Pedido", ['low', 'medium', 'high'])
+    order_value_category = st.selectbox("Categoria do Valor do Pedido", CATEGORIES["order_value_category"])
+
+    # Dados fornecidos pelo usuário (usados na previsão e na análise de sensibilidade)
+    pedido = {
+        'order_amount': order_amount,
+        'region': region,
+        'items_delivered': items_delivered,
+        'delivery_period': delivery_period,
+        'day_of_week': day_of_week,
+        'driver_age_group': driver_age_group,
+        'Trips': Trips,
+        'customer_age_group': customer_age_group,
+        'is_night_delivery': is_night_delivery,
+        'order_value_category': order_value_category
+    }
 
     if st.button("Realizar Previsão"):
         try:
             # Criar DataFrame com os dados fornecidos pelo usuário
-            new_data = pd.DataFrame({
-                'order_amount': [order_amount],
-                'region': [region],
-                'items_delivered': [items_delivered],
-                'delivery_period': [delivery_period],
-                'day_of_week': [day_of_week],
-                'driver_age_group': [driver_age_group],
-                'Trips': [Trips],
-                'customer_age_group': [customer_age_group],
-                'is_night_delivery': [is_night_delivery],
-                'order_value_category': [order_value_category]
-            })
-
-            # Definir todas as categorias esperadas com base no treinamento
-            region_categories = ['Altamonte Springs', 'Apopka', 'Clermont', 'Kissimmee',
-                     'Orlando', 'Sanford', 'Winter Park']
-            delivery_period_categories = ['Manhã', 'Noite', 'Tarde']
-            day_of_week_categories = ["Friday", "Monday", "Saturday", 
-                                    "Sunday", "Thursday", 
-                                    "Tuesday", "Wednesday"]
-            driver_age_categories = ['18-25', '26-35', '36-45', 
-                                    '46-55', '56-65']
-            customer_age_categories = ['18-25', '26-35', '36-45',
-                                    '46-55', '56-65', 
-                                    '66-75', '76-85',
-                                    '85+']
-            order_value_categories = ['low', 'medium', 'high']
-
-            # Garantir que todas as categorias sejam representadas corretamente
-            new_data['region'] = pd.Categorical(new_data['region'], categories=region_categories)
-            new_data['delivery_period'] = pd.Categorical(new_data['delivery_period'], categories=delivery_period_categories)
-            new_data['day_of_week'] = pd.Categorical(new_data['day_of_week'], categories=day_of_week_categories)
-            new_data['driver_age_group'] = pd.Categorical(new_data['driver_age_group'], categories=driver_age_categories)
-            new_data['customer_age_group'] = pd.Categorical(new_data['customer_age_group'], categories=customer_age_categories)
-            new_data['order_value_category'] = pd.Categorical(new_data['order_value_category'], categories=order_value_categories)
-
-            # Pré-processar os dados
-            new_data = pd.get_dummies(new_data, columns=['region', 'delivery_period', 
-                                                         'day_of_week',
-                                                         'driver_age_group',
-                                                         'customer_age_group',
-                                                         'order_value_category'])
-
-            # Adicionar colunas ausentes e garantir a ordem correta
-            for col in X_train_columns:
-                if col not in new_data.columns:
-                    new_data[col] = 0
-            new_data = new_data[X_train_columns]
-
-            # Fazer previsão usando o modelo carregado
-            probabilities = modelo.predict_proba(new_data)[:, 1]
-            predictions = (probabilities >= 0.45).astype(int)
+            new_data = pd.DataFrame({campo: [valor] for campo, valor in pedido.items()})
+
+            # Pré-processar os dados com o pré-processamento salvo junto com o modelo
+            cache_previsoes = get_prediction_cache()
+            new_data = cache_previsoes.encode(new_data)
+
+            # Fazer previsão usando o modelo carregado (entradas repetidas vêm do cache)
+            probabilities = cache_previsoes.predict_proba(new_data)[:, 1]
+            modelo = cache_previsoes.model
+            # Limiar salvo na página de ajuste (por região, ou o limiar geral)
+            limiar = threshold_for(region)
+            predictions = (probabilities >= limiar).astype(int)
 
             # Exibir os resultados da previsão
             st.markdown("### Resultado da Previsão")
@@ -186,11 +119,141 @@ if modelo is not None:
             <div style="background-color:#f9f9f9; padding: 15px; border-radius: 10px;">
                 <p style="font-size: 14px;">         
                     O nível de confiança indica a probabilidade calculada pelo modelo para cada classe. 
+                    O pedido é classificado como fraude quando a probabilidade atinge o limiar de decisão configurado na página de ajuste do limiar.
+                </p>
+            </div>
+            """, unsafe_allow_html=True)
+
+            estatisticas = cache_previsoes.stats()
+            st.caption(
+                f"Cache de previsões: {estatisticas['hits']} acertos, {estatisticas['misses']} falhas "
+                f"({estatisticas['taxa_acerto']:.0%}), {estatisticas['entradas']} de "
+                f"{estatisticas['max_entradas']} entradas."
+            )
+
+            # Principais fatores da previsão (plotly só é importado quando necessário)
+            import plotly.express as px
+
+            st.markdown("### Por que o modelo chegou a este resultado?")
+            explicador = carregar_explicador(modelo, get_model_signature())
+            contribuicoes = explicador.contributions(new_data).iloc[0].rename(index=FEATURE_LABELS)
+            contribuicoes = contribuicoes.reindex(contribuicoes.abs().sort_values().index)
+
+            fig_fatores = px.bar(
+                x=contribuicoes.values,
+                y=contribuicoes.index,
+                orientation="h",
+                title="Contribuição de Cada Variável para o Risco de Fraude",
+                labels={"x": "Contribuição (log-odds)", "y": "Variável"},
+                color=np.where(contribuicoes.values > 0, "Aumenta o risco", "Reduz o risco"),
+                color_discrete_map={"Aumenta o risco": "#EF553B", "Reduz o risco": "#636EFA"},
+            )
+            st.plotly_chart(fig_fatores, use_container_width=True)
+
+            st.markdown("""
+            <div style="background-color:#f9f9f9; padding: 15px; border-radius: 10px;">
+                <p style="font-size: 14px;">         
+                    Cada barra mostra quanto a variável deslocou a previsão em relação à média do modelo.
+                    Valores positivos aproximam o pedido da classe fraude; valores negativos o afastam.
                 </p>
             </div>
             """, unsafe_allow_html=True)
 
         except Exception as e:
             st.error(f"Erro ao realizar a previsão: {e}")
+
+    # Análise de sensibilidade: todos os cenários pontuados em uma única chamada ao modelo
+    st.markdown("---")
+    st.markdown("### Análise de Sensibilidade")
+    st.markdown("""
+    <div style="background-color:#f9f9f9; padding: 15px; border-radius: 10px;">
+        <p style="font-size: 14px;">
+            Veja como a probabilidade de fraude do pedido acima muda quando uma variável varia e as demais permanecem fixas.
+            O mapa de calor varia duas variáveis ao mesmo tempo.
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    with st.expander("Configurar cenários", expanded=False):
+        pontos = st.slider("Pontos por curva", min_value=10, max_value=200, value=50)
+        faixas = {}
+        for variavel in SWEEP_NUMERIC:
+            maximo = float(np.ceil(df[variavel].max() * 1.1))
+            faixas[variavel] = st.slider(
+                f"Faixa de {FEATURE_LABELS[variavel]}", min_value=0.0, max_value=maximo, value=(0.0, maximo)
+            )
+        eixo_x = st.selectbox("Mapa de calor: eixo horizontal", SWEEP_NUMERIC,
+                              format_func=FEATURE_LABELS.get)
+        eixo_y = st.selectbox("Mapa de calor: eixo vertical",
+                              [v for v in SWEEP_CATEGORICAL + SWEEP_NUMERIC if v != eixo_x],
+                              format_func=FEATURE_LABELS.get)
+        recalcular_categoria = st.checkbox(
+            "Recalcular a categoria do valor do pedido conforme o valor", value=True
+        )
+
+    if st.button("Simular Cenários"):
+        try:
+            import time
+
+            import plotly.express as px
+
+            valores = {
+                variavel: numeric_values(*faixas[variavel], pontos, inteiro=variavel != "order_amount")
+                for variavel in SWEEP_NUMERIC
+            }
+            valores.update({variavel: categorical_values(variavel) for variavel in SWEEP_CATEGORICAL})
+            cenarios = build_scenarios(
+                pedido, valores, mapa={eixo_y: valores[eixo_y], eixo_x: valores[eixo_x]},
+                derive_value_category=recalcular_categoria,
+            )
+
+            inicio = time.perf_counter()
+            cenarios = score_scenarios(get_prediction_cache().model, cenarios)
+            duracao = time.perf_counter() - inicio
+            st.caption(f"{len(cenarios):,} cenários pontuados em uma única chamada ao modelo ({duracao * 1000:.0f} ms).")
+
+            limiar = threshold_for(region)
+            colunas = st.columns(len(SWEEP_NUMERIC))
+            for coluna, variavel in zip(colunas, SWEEP_NUMERIC):
+                curva = cenarios[cenarios[PAINEL] == variavel]
+                fig_curva = px.line(
+                    curva, x=variavel, y="probabilidade",
+                    title=f"Risco x {FEATURE_LABELS[variavel]}",
+                    labels={variavel: FEATURE_LABELS[variavel], "probabilidade": "Probabilidade de Fraude"},
+                )
+                fig_curva.add_hline(y=limiar, line_dash="dash", line_color="red")
+                fig_curva.add_vline(x=pedido[variavel], line_dash="dot", line_color="gray")
+                coluna.plotly_chart(fig_curva, use_container_width=True)
+
+            colunas = st.columns(len(SWEEP_CATEGORICAL))
+            for coluna, variavel in zip(colunas, SWEEP_CATEGORICAL):
+                barras = cenarios[cenarios[PAINEL] == variavel]
+                fig_barras = px.bar(
+                    barras, x=variavel, y="probabilidade",
+                    title=f"Risco por {FEATURE_LABELS[variavel]}",
+                    labels={variavel: FEATURE_LABELS[variavel], "probabilidade": "Probabilidade de Fraude"},
+                    color=np.where(barras["probabilidade"] >= limiar, "Fraude", "Sem fraude"),
+                    color_discrete_map={"Fraude": "#EF553B", "Sem fraude": "#636EFA"},
+                )
+                fig_barras.add_hline(y=limiar, line_dash="dash", line_color="red")
+                coluna.plotly_chart(fig_barras, use_container_width=True)
+
+            tabela = heatmap_table(cenarios, eixo_y, eixo_x)
+            fig_mapa = px.imshow(
+                tabela.to_numpy(),
+                x=tabela.columns,
+                y=tabela.index.astype(str),
+                aspect="auto",
+                origin="lower",
+                color_continuous_scale="Reds",
+                zmin=0,
+                zmax=1,
+                labels={"x": FEATURE_LABELS[eixo_x], "y": FEATURE_LABELS[eixo_y], "color": "Probabilidade"},
+                title=f"Probabilidade de Fraude: {FEATURE_LABELS[eixo_x]} x {FEATURE_LABELS[eixo_y]}",
+            )
+            st.plotly_chart(fig_mapa, use_container_width=True)
+
+        except Exception as e:
+            st.error(f"Erro ao simular os cenários: {e}")
 else:
     st.error("O modelo não foi carregado corretamente.")
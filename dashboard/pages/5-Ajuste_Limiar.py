@@ -0,0 +1,140 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+
+from utils.layout import exibir_logo
+from utils.model import predict_scores
+from utils.thresholds import build_distributions, load_thresholds, save_thresholds
+from utils.warmup import get_dataset, get_model, get_model_signature, warm_up
+
+# Iniciar o carregamento compartilhado (dados, modelo e bibliotecas) em segundo plano
+warm_up()
+
+# Pontuar o dataset rotulado uma única vez por versão do modelo (as distribuições ficam em cache)
+@st.cache_resource
+def carregar_distribuicoes(versao_modelo):
+    df = get_dataset()
+    modelo = get_model()
+    scores = predict_scores(modelo, df)
+    return build_distributions(scores, df["fraud_flag"], df["order_amount"], df["region"])
+
+# Configuração do layout
+st.set_page_config(page_title="Ajuste do Limiar de Decisão", layout="wide")
+
+# Banner ou imagem
+exibir_logo()
+
+# Título
+st.title("Ajuste do Limiar de Decisão")
+
+# Introdução
+st.markdown("""
+<div style="background-color:#f9f9f9; padding: 15px; border-radius: 10px;">
+    <p style="font-size: 16px;">
+        Esta página mostra o impacto do limiar de decisão do modelo preditivo sobre precisão, recall, volume de pedidos sinalizados e valores envolvidos.
+        Escolha um limiar geral e, se necessário, limiares específicos por região. Os limiares salvos passam a ser usados na página de previsão.
+    </p>
+</div>
+""", unsafe_allow_html=True)
+
+st.markdown("---")
+
+try:
+    distribuicoes = carregar_distribuicoes(get_model_signature())
+except Exception as e:
+    st.error(f"Erro ao pontuar o dataset: {e}")
+    st.stop()
+
+limiares_salvos = load_thresholds()
+geral = distribuicoes[None]
+
+# Seção 1: Limiar Geral
+st.markdown("## Limiar Geral")
+
+limiar_geral = st.slider(
+    "Limiar de decisão geral:",
+    min_value=0.0, max_value=1.0, step=0.01,
+    value=float(limiares_salvos["default"])
+)
+
+metricas = geral.metrics(limiar_geral)
+col1, col2, col3, col4, col5 = st.columns(5)
+col1.metric("Precisão", f"{metricas['precisao']:.2%}")
+col2.metric("Recall", f"{metricas['recall']:.2%}")
+col3.metric("F1", f"{metricas['f1']:.2%}")
+col4.metric("Pedidos Sinalizados", metricas["pedidos_sinalizados"])
+col5.metric("Valor Sinalizado", f"$ {metricas['valor_sinalizado']:,.2f}")
+
+# Curva de métricas por limiar
+curva = geral.curve(np.linspace(0, 1, 101))
+fig_curva = px.line(
+    curva.melt(id_vars="limiar", value_vars=["precisao", "recall", "f1"]),
+    x="limiar",
+    y="value",
+    color="variable",
+    title="Precisão, Recall e F1 por Limiar",
+    labels={"limiar": "Limiar", "value": "Valor", "variable": "Métrica"},
+)
+fig_curva.add_vline(x=limiar_geral, line_dash="dash", line_color="#EF553B")
+st.plotly_chart(fig_curva, use_container_width=True)
+
+fig_volume = px.area(
+    curva,
+    x="limiar",
+    y="pedidos_sinalizados",
+    title="Pedidos Sinalizados por Limiar",
+    labels={"limiar": "Limiar", "pedidos_sinalizados": "Pedidos Sinalizados"},
+    hover_data={"valor_sinalizado": ":$,.2f", "valor_fraudes_sinalizadas": ":$,.2f"},
+)
+fig_volume.add_vline(x=limiar_geral, line_dash="dash", line_color="#EF553B")
+st.plotly_chart(fig_volume, use_container_width=True)
+
+st.markdown("""
+<div style="background-color:#f9f9f9; padding: 15px; border-radius: 10px;">
+    <p style="font-size: 16px;">
+        Limiares mais altos reduzem os falsos positivos (maior precisão), mas deixam passar mais fraudes (menor recall).
+        O volume de pedidos sinalizados indica a carga de trabalho da equipe de investigação.
+    </p>
+</div>
+""", unsafe_allow_html=True)
+
+st.markdown("---")
+
+# Seção 2: Limiares por Região
+st.markdown("## Limiares por Região")
+st.markdown(""" * Ajuste o limiar de cada região. Regiões sem ajuste usam o limiar geral. """)
+
+regioes = sorted(r for r in distribuicoes if r is not None)
+limiares_regiao = {}
+linhas = []
+for regiao in regioes:
+    valor_salvo = float(limiares_salvos["regions"].get(regiao, limiar_geral))
+    limiares_regiao[regiao] = st.number_input(
+        regiao, min_value=0.0, max_value=1.0, step=0.01, value=valor_salvo, key=f"limiar_{regiao}"
+    )
+    linhas.append({"Região": regiao, **distribuicoes[regiao].metrics(limiares_regiao[regiao])})
+
+df_regioes = pd.DataFrame(linhas).rename(columns={
+    "limiar": "Limiar",
+    "precisao": "Precisão",
+    "recall": "Recall",
+    "f1": "F1",
+    "pedidos_sinalizados": "Pedidos Sinalizados",
+    "verdadeiros_positivos": "Fraudes Sinalizadas",
+    "falsos_positivos": "Falsos Positivos",
+    "valor_sinalizado": "Valor Sinalizado ($)",
+    "valor_fraudes_sinalizadas": "Valor das Fraudes Sinalizadas ($)",
+})
+for col in ["Precisão", "Recall", "F1"]:
+    df_regioes[col] = df_regioes[col].apply(lambda x: f"{x:.2%}")
+for col in ["Valor Sinalizado ($)", "Valor das Fraudes Sinalizadas ($)"]:
+    df_regioes[col] = df_regioes[col].apply(lambda x: f"$ {x:,.2f}")
+
+st.dataframe(df_regioes.set_index("Região"))
+
+if st.button("Salvar Limiares"):
+    # Só grava limiares de região diferentes do geral
+    especificos = {r: v for r, v in limiares_regiao.items() if v != limiar_geral}
+    save_thresholds(limiar_geral, especificos)
+    st.success("Limiares salvos! A página de previsão passará a utilizá-los.")
@@ -0,0 +1,126 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+from utils.drift import PSI_ATENCAO, PSI_DRIFT, STATE_PATH, bin_labels, load_monitor
+from utils.layout import exibir_logo
+from utils.warmup import get_example_drift_monitor, warm_up
+
+# Iniciar o carregamento compartilhado (dados, modelo e bibliotecas) em segundo plano
+warm_up()
+
+# Monitor com os lotes pontuados; sem estado salvo, usa o dataset processado como exemplo
+def carregar_monitor():
+    if STATE_PATH.exists():
+        return load_monitor(), False
+    return get_example_drift_monitor(), True
+
+# Configuração do layout
+st.set_page_config(page_title="Monitoramento de Drift", layout="wide")
+
+# Banner ou imagem
+exibir_logo()
+
+# Título
+st.title("Monitoramento de Drift dos Dados de Entrada")
+
+# Introdução
+st.markdown("""
+<div style="background-color:#f9f9f9; padding: 15px; border-radius: 10px;">
+    <p style="font-size: 16px;">
+        Esta página compara a distribuição dos pedidos pontuados pelo modelo com a distribuição dos dados de treinamento.
+        Variáveis com distribuição muito diferente (drift) indicam que as previsões podem perder qualidade e que o modelo deve ser reavaliado.
+    </p>
+</div>
+""", unsafe_allow_html=True)
+
+st.markdown("---")
+
+try:
+    monitor, exemplo = carregar_monitor()
+except FileNotFoundError:
+    st.error("Referência de drift não encontrada. Execute `python -m utils.drift reference` na pasta `dashboard/`.")
+    st.stop()
+
+if exemplo:
+    st.info("Nenhum lote pontuado foi registrado ainda. Exibindo o dataset processado como exemplo.")
+
+if not monitor.days:
+    st.warning("Não há dias registrados no monitor.")
+    st.stop()
+
+# Barra lateral para filtros
+st.sidebar.title("Filtros")
+dias = sorted(monitor.days)
+inicio, fim = st.sidebar.select_slider(
+    "Período analisado:",
+    options=dias,
+    value=(dias[max(len(dias) - 7, 0)], dias[-1])
+)
+dias_selecionados = [d for d in dias if inicio <= d <= fim]
+
+# Seção 1: Resumo do Drift
+st.markdown("### Indicadores de Drift")
+
+relatorio = monitor.report(dias_selecionados)
+col1, col2, col3 = st.columns(3)
+col1.metric("Pedidos no Período", monitor.merged_counts(dias_selecionados)["n"])
+col2.metric("Variáveis em Atenção", int((relatorio["status"] == "atenção").sum()))
+col3.metric("Variáveis com Drift", int((relatorio["status"] == "drift").sum()))
+
+fig_psi = px.bar(
+    relatorio,
+    x="variavel",
+    y="psi",
+    color="status",
+    title="PSI por Variável",
+    labels={"variavel": "Variável", "psi": "PSI", "status": "Status"},
+    color_discrete_map={"estável": "#00CC96", "atenção": "#FFA15A", "drift": "#EF553B"},
+)
+fig_psi.add_hline(y=PSI_ATENCAO, line_dash="dot", line_color="#FFA15A")
+fig_psi.add_hline(y=PSI_DRIFT, line_dash="dash", line_color="#EF553B")
+st.plotly_chart(fig_psi, use_container_width=True)
+
+st.dataframe(relatorio.rename(columns={
+    "variavel": "Variável",
+    "tipo": "Tipo",
+    "psi": "PSI",
+    "ks": "KS",
+    "status": "Status",
+}).set_index("Variável"))
+
+st.markdown(f"""
+<div style="background-color:#f9f9f9; padding: 15px; border-radius: 10px;">
+    <p style="font-size: 16px;">
+        PSI abaixo de {PSI_ATENCAO} indica distribuição estável; entre {PSI_ATENCAO} e {PSI_DRIFT}, mudança moderada; acima de {PSI_DRIFT}, drift relevante.
+        O KS é a maior diferença entre as distribuições acumuladas das variáveis numéricas.
+    </p>
+</div>
+""", unsafe_allow_html=True)
+
+st.markdown("---")
+
+# Seção 2: Distribuição por Variável
+st.markdown("## Distribuição por Variável")
+
+variavel = st.selectbox("Variável:", relatorio["variavel"].tolist())
+tipo = "numeric" if variavel in monitor.reference["numeric"] else "categorical"
+referencia = pd.Series(monitor.reference[tipo][variavel]["counts"], dtype=float)
+atual = pd.Series(monitor.merged_counts(dias_selecionados)["features"][variavel], dtype=float)
+
+df_distribuicao = pd.DataFrame({
+    "faixa": bin_labels(monitor.reference, variavel),
+    "Treinamento": referencia / referencia.sum(),
+    "Período Selecionado": atual / atual.sum() if atual.sum() else atual,
+})
+
+fig_distribuicao = px.bar(
+    df_distribuicao.melt(id_vars="faixa", value_vars=["Treinamento", "Período Selecionado"]),
+    x="faixa",
+    y="value",
+    color="variable",
+    barmode="group",
+    title=f"Distribuição de {variavel}: Treinamento x Período Selecionado",
+    labels={"faixa": "Faixa", "value": "Proporção", "variable": "Base"},
+)
+st.plotly_chart(fig_distribuicao, use_container_width=True)
@@ -0,0 +1,113 @@
+import streamlit as st
+import plotly.express as px
+
+from utils.layout import exibir_logo
+from utils.query import (
+    AGGREGATIONS, DIMENSIONS, MEASURES, ROWS, Query, measure_label, measure_name, valid_measure
+)
+from utils.warmup import get_query_engine, warm_up
+
+# Iniciar o carregamento compartilhado (dados, modelo e bibliotecas) em segundo plano
+warm_up()
+
+# Configuração do layout
+st.set_page_config(page_title="Exploração Ad Hoc", layout="wide")
+
+# Banner ou imagem
+exibir_logo()
+
+# Título
+st.title("Exploração Ad Hoc dos Pedidos")
+
+# Introdução
+st.markdown("""
+<div style="background-color:#f9f9f9; padding: 15px; border-radius: 10px;">
+    <p style="font-size: 16px;">
+        Nesta página é possível montar consultas próprias sobre os pedidos: escolha as dimensões de agrupamento, as medidas e os filtros.
+        A consulta lê apenas as colunas e as partições (região e mês) necessárias, e consultas repetidas são respondidas pelo cache.
+    </p>
+</div>
+""", unsafe_allow_html=True)
+
+st.markdown("---")
+
+engine = get_query_engine()
+
+# Barra lateral para filtros
+st.sidebar.title("Filtros")
+filtros = []
+for dimensao, rotulo in DIMENSIONS.items():
+    valores = st.sidebar.multiselect(f"{rotulo}:", engine.values(dimensao), placeholder="Todas")
+    if valores:
+        filtros.append((dimensao, "in", valores))
+
+limites = engine.run(Query.create(measures=[("order_amount", "min"), ("order_amount", "max")])).data.iloc[0]
+valor_min, valor_max = float(limites["order_amount_min"]), float(limites["order_amount_max"])
+faixa_valor = st.sidebar.slider(
+    "Valor do Pedido ($):", min_value=valor_min, max_value=valor_max, value=(valor_min, valor_max)
+)
+if faixa_valor[0] > valor_min:
+    filtros.append(("order_amount", ">=", faixa_valor[0]))
+if faixa_valor[1] < valor_max:
+    filtros.append(("order_amount", "<=", faixa_valor[1]))
+
+# Seção 1: Definição da Consulta
+st.markdown("### Consulta")
+
+col1, col2, col3 = st.columns(3)
+agrupamentos = col1.multiselect(
+    "Agrupar por:", list(DIMENSIONS), default=["region"], format_func=DIMENSIONS.get
+)
+colunas = col2.multiselect(
+    "Medidas:", list(MEASURES), default=["order_amount", "missing_rate"], format_func=MEASURES.get
+)
+agregacoes = col3.multiselect(
+    "Agregações:", list(AGGREGATIONS), default=["sum", "mean"], format_func=AGGREGATIONS.get,
+    help="Cada agregação é aplicada a cada medida; identificadores (pedidos, motoristas e clientes) só admitem contagem e distintos.",
+)
+
+medidas = [(c, a) for c in colunas for a in agregacoes if valid_measure(c, a)]
+resultado = engine.run(Query.create(agrupamentos, medidas, filtros))
+
+# Seção 2: Resultado
+st.markdown("### Resultado")
+
+rotulos = {dimensao: DIMENSIONS[dimensao] for dimensao in agrupamentos}
+rotulos[ROWS] = "Pedidos"
+rotulos.update({measure_name(c, a): measure_label(c, a) for c, a in medidas})
+tabela = resultado.data.rename(columns=rotulos)
+
+if tabela.empty:
+    st.warning("Nenhum pedido atende aos filtros selecionados.")
+    st.stop()
+
+if agrupamentos:
+    y = measure_name(*medidas[0]) if medidas else ROWS
+    fig_consulta = px.bar(
+        resultado.data.astype({d: str for d in agrupamentos}),
+        x=agrupamentos[0],
+        y=y,
+        color=agrupamentos[1] if len(agrupamentos) > 1 else None,
+        barmode="group",
+        title=f"{rotulos[y]} por {DIMENSIONS[agrupamentos[0]]}",
+        labels=rotulos,
+    )
+    st.plotly_chart(fig_consulta, use_container_width=True)
+
+st.dataframe(tabela.set_index([rotulos[d] for d in agrupamentos]) if agrupamentos else tabela)
+
+st.download_button(
+    "Baixar resultado (CSV)",
+    data=tabela.to_csv(index=False).encode("utf-8"),
+    file_name=f"consulta_{resultado.fingerprint[:12]}.csv",
+    mime="text/csv",
+)
+
+estatisticas = engine.stats()
+origem = "cache" if resultado.from_cache else f"{resultado.seconds * 1000:.0f} ms"
+st.caption(
+    f"{resultado.rows_scanned:,} linhas lidas em {resultado.batches} lotes · "
+    f"{resultado.fragments} de {resultado.total_fragments} partições · "
+    f"colunas: {', '.join(resultado.columns) or '-'} · {origem} · "
+    f"cache: {estatisticas['entradas']} consultas, taxa de acerto de {estatisticas['taxa_acerto']:.0%}."
+)
@@ -0,0 +1 @@
+"""Módulos de apoio do Dashboard Walmart (dados, agregações e modelo)."""
@@ -0,0 +1,479 @@
+"""Alertas em janelas deslizantes por motorista e por cliente.
+
+Os pedidos novos são consumidos em lotes e acumulados, por entidade, em buffers
+circulares de tamanho fixo: 24 baldes de uma hora (janela de 24h) e 7 baldes de
+um dia (janela de 7d), com a contagem de entregas, os itens entregues, os itens
+faltantes e o valor dos pedidos. Quando o relógio (a hora do pedido mais
+recente) avança, os baldes que saem da janela são zerados para todas as
+entidades de uma vez; pedidos mais antigos que a janela são descartados.
+
+A memória por entidade é fixa (31 baldes × 4 medidas, mais o último disparo de
+cada regra) e entidades sem pedidos nos últimos 7 dias liberam a sua linha.
+
+Cada regra compara uma métrica da janela com um limite fixo ou, para a taxa de
+itens faltantes, calcula um z-score em relação à taxa de todas as entidades nos
+últimos 7 dias. Os alertas disparados são gravados, um JSON por linha, em
+``data/monitoring/alerts.jsonl``; cada regra tem um intervalo mínimo entre
+disparos para a mesma entidade.
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.alerts update novos.csv     # consome um lote (lido em blocos)
+    python -m utils.alerts replay --scale 20    # reproduz o dataset como fluxo e mede a vazão
+    python -m utils.alerts recent --last 20
+"""
+
+import argparse
+import json
+import time
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.data import DATA_DIR
+
+ALERTS_PATH = DATA_DIR / "monitoring" / "alerts.jsonl"
+STATE_PATH = DATA_DIR / "monitoring" / "alerts_state.npz"
+
+# Entidade -> colunas de id e de nome
+ENTITIES = {
+    "motorista": ("driver_id", "driver_name"),
+    "cliente": ("customer_id", "customer_name"),
+}
+
+HOURS = 24
+DAYS = 7
+WINDOWS = {"24h": HOURS, "7d": DAYS}
+
+# Medidas acumuladas em cada balde
+MEASURES = ("entregas", "itens_entregues", "itens_faltantes", "valor")
+ENTREGAS, ENTREGUES, FALTANTES, VALOR = range(len(MEASURES))
+METRICS = MEASURES + ("taxa_faltantes",)
+
+# Métricas que aceitam regras de z-score
+ZSCORE_METRICS = ("taxa_faltantes",)
+
+_NUNCA = np.iinfo(np.int64).min // 2
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Regra de alerta: dispara quando a métrica da janela atinge ``limite`` ou ``zscore``.
+
+    Apenas entidades com pelo menos ``min_entregas`` entregas na janela são
+    avaliadas; ``cooldown`` é o intervalo mínimo (em horas) entre dois disparos
+    da regra para a mesma entidade.
+    """
+
+    nome: str
+    entidade: str
+    metrica: str
+    janela: str
+    limite: float = None
+    zscore: float = None
+    min_entregas: int = 1
+    cooldown: int = 24
+
+    def __post_init__(self):
+        if self.entidade not in ENTITIES:
+            raise ValueError(f"Entidade desconhecida: {self.entidade}")
+        if self.metrica not in METRICS:
+            raise ValueError(f"Métrica desconhecida: {self.metrica}")
+        if self.janela not in WINDOWS:
+            raise ValueError(f"Janela desconhecida: {self.janela}")
+        if (self.limite is None) == (self.zscore is None):
+            raise ValueError(f"A regra {self.nome} precisa de um limite ou de um z-score (e não ambos).")
+        if self.zscore is not None and self.metrica not in ZSCORE_METRICS:
+            raise ValueError(f"Regras de z-score aceitam apenas: {', '.join(ZSCORE_METRICS)}")
+
+
+DEFAULT_RULES = (
+    Rule("motorista_faltantes_24h", "motorista", "itens_faltantes", "24h", limite=3),
+    Rule("motorista_taxa_7d", "motorista", "taxa_faltantes", "7d", limite=0.25, min_entregas=2),
+    Rule("motorista_taxa_z_7d", "motorista", "taxa_faltantes", "7d", zscore=3.0, min_entregas=2),
+    Rule("cliente_faltantes_7d", "cliente", "itens_faltantes", "7d", limite=3),
+    Rule("cliente_taxa_z_7d", "cliente", "taxa_faltantes", "7d", zscore=3.0, min_entregas=2),
+)
+
+
+def load_rules(path):
+    """Regras de um arquivo JSON (lista de objetos com os campos de ``Rule``)."""
+    with open(path, encoding="utf-8") as f:
+        return [Rule(**regra) for regra in json.load(f)]
+
+
+def metric_values(totais, metrica):
+    """Valores de uma métrica a partir dos totais da janela (linhas × medidas)."""
+    if metrica == "taxa_faltantes":
+        itens = totais[..., ENTREGUES] + totais[..., FALTANTES]
+        return np.divide(totais[..., FALTANTES], itens, out=np.zeros_like(itens), where=itens > 0)
+    return totais[..., MEASURES.index(metrica)]
+
+
+def order_hours(batch):
+    """Hora de cada pedido, em horas desde 1970-01-01."""
+    if "date_days" in batch and "delivery_seconds" in batch:
+        dias, segundos = batch["date_days"], batch["delivery_seconds"]
+    else:
+        from utils.features import time_features
+
+        tempo = time_features(batch["date"], batch["delivery_hour"])
+        dias, segundos = tempo["date_days"], tempo["delivery_seconds"]
+    return dias.to_numpy(dtype=np.int64) * 24 + segundos.to_numpy(dtype=np.int64) // 3600
+
+
+def order_measures(batch):
+    """Matriz pedidos × ``MEASURES``; valores ausentes contam como zero."""
+    medidas = np.ones((len(batch), len(MEASURES)))
+    for i, coluna in ((ENTREGUES, "items_delivered"), (FALTANTES, "items_missing"), (VALOR, "order_amount")):
+        medidas[:, i] = batch[coluna].fillna(0).to_numpy(dtype=float)
+    return medidas
+
+
+class EntityWindows:
+    """Buffers circulares (24h por hora e 7d por dia) de todas as entidades de um tipo.
+
+    Cada entidade ocupa uma linha de arrays pré-alocados, que dobram de tamanho
+    quando cheios; linhas liberadas por entidades inativas são reaproveitadas.
+    """
+
+    def __init__(self, n_rules, capacity=1024):
+        self.rows = {}  # id -> linha
+        self.ids = np.full(capacity, "", dtype=object)
+        self.names = np.full(capacity, "", dtype=object)
+        self.hourly = np.zeros((capacity, HOURS, len(MEASURES)))
+        self.daily = np.zeros((capacity, DAYS, len(MEASURES)))
+        self.last_fired = np.full((capacity, n_rules), _NUNCA, dtype=np.int64)
+        self.free = []
+        self.used = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _grow(self):
+        capacidade = 2 * len(self.ids)
+        for nome in ("ids", "names", "hourly", "daily", "last_fired"):
+            atual = getattr(self, nome)
+            novo = np.empty((capacidade,) + atual.shape[1:], dtype=atual.dtype)
+            novo[:len(atual)] = atual
+            if nome in ("ids", "names"):
+                novo[len(atual):] = ""
+            elif nome == "last_fired":
+                novo[len(atual):] = _NUNCA
+            else:
+                novo[len(atual):] = 0
+            setattr(self, nome, novo)
+
+    def _allocate(self, entidade, nome):
+        if self.free:
+            linha = self.free.pop()
+        else:
+            if self.used == len(self.ids):
+                self._grow()
+            linha = self.used
+            self.used += 1
+        self.rows[entidade] = linha
+        self.ids[linha] = entidade
+        self.names[linha] = nome
+        return linha
+
+    def resolve(self, ids, names):
+        """Linha de cada pedido, criando as entidades novas."""
+        unicos, primeira, inverso = np.unique(ids, return_index=True, return_inverse=True)
+        linhas = np.empty(len(unicos), dtype=np.int64)
+        for i, entidade in enumerate(unicos):
+            linha = self.rows.get(entidade)
+            linhas[i] = self._allocate(entidade, names[primeira[i]]) if linha is None else linha
+        return linhas[inverso]
+
+    def clear(self, horas, dias):
+        """Zera os baldes das horas e dias (posições nos buffers) que saíram da janela."""
+        self.hourly[:self.used, horas] = 0
+        self.daily[:self.used, dias] = 0
+
+    def evict_idle(self, protegidas=()):
+        """Libera as entidades sem entregas nos últimos 7 dias, exceto as linhas
+        ``protegidas`` (as do lote em processamento); retorna quantas."""
+        inativas = (self.ids[:self.used] != "") & (self.daily[:self.used, :, ENTREGAS].sum(axis=1) == 0)
+        inativas[protegidas] = False
+        inativas = np.flatnonzero(inativas)
+        for linha in inativas:
+            del self.rows[self.ids[linha]]
+        self.ids[inativas] = ""
+        self.names[inativas] = ""
+        self.hourly[inativas] = 0
+        self.last_fired[inativas] = _NUNCA
+        self.free.extend(inativas.tolist())
+        return len(inativas)
+
+    def nbytes(self):
+        return sum(getattr(self, nome).nbytes for nome in ("ids", "names", "hourly", "daily", "last_fired"))
+
+
+class AlertEngine:
+    """Consome lotes de pedidos, atualiza as janelas e avalia as regras."""
+
+    def __init__(self, rules=DEFAULT_RULES, sink=None):
+        self.rules = list(rules)
+        self.sink = sink
+        self.entities = {entidade: EntityWindows(len(self.rules)) for entidade in ENTITIES}
+        # Totais de todas as entidades, base dos z-scores
+        self.hourly_total = np.zeros((HOURS, len(MEASURES)))
+        self.daily_total = np.zeros((DAYS, len(MEASURES)))
+        self.hour = None  # hora do pedido mais recente (horas desde 1970)
+        self._lote = {}  # linhas do lote em processamento, por entidade
+        self.stats = {"pedidos": 0, "descartados": 0, "alertas": 0}
+
+    def _advance(self, hora):
+        """Move o relógio para ``hora``, zerando os baldes que saíram das janelas."""
+        if self.hour is None:
+            self.hour = hora
+            return
+        if hora <= self.hour:
+            return
+        horas = np.arange(self.hour + 1, hora + 1)[-HOURS:] % HOURS
+        dias = np.arange(self.hour // 24 + 1, hora // 24 + 1)[-DAYS:] % DAYS
+        for janelas in self.entities.values():
+            janelas.clear(horas, dias)
+        self.hourly_total[horas] = 0
+        self.daily_total[dias] = 0
+        if len(dias):
+            for entidade, janelas in self.entities.items():
+                janelas.evict_idle(self._lote.get(entidade, ()))
+        self.hour = hora
+
+    def update(self, batch):
+        """Consome um lote de pedidos (em qualquer ordem) e retorna os alertas disparados.
+
+        Os pedidos são processados hora a hora, em ordem cronológica; as regras
+        são avaliadas ao fim de cada hora para as entidades com pedidos nela.
+        """
+        if batch.empty:
+            return []
+        horas = order_hours(batch)
+        ordem = np.argsort(horas, kind="stable")
+        horas = horas[ordem]
+        medidas = order_measures(batch)[ordem]
+        linhas = {
+            entidade: janelas.resolve(batch[coluna_id].astype(str).to_numpy()[ordem],
+                                      batch[coluna_nome].to_numpy()[ordem] if coluna_nome in batch
+                                      else np.full(len(batch), "", dtype=object))
+            for entidade, janelas in self.entities.items()
+            for coluna_id, coluna_nome in [ENTITIES[entidade]]
+        }
+
+        self._lote = {entidade: np.unique(l) for entidade, l in linhas.items()}
+
+        alertas = []
+        limites = np.flatnonzero(np.diff(horas)) + 1
+        for inicio, fim in zip(np.r_[0, limites], np.r_[limites, len(horas)]):
+            self._advance(int(horas[inicio]))
+            alertas += self._add(horas[inicio:fim], medidas[inicio:fim],
+                                 {entidade: l[inicio:fim] for entidade, l in linhas.items()})
+
+        self._lote = {}
+        self.stats["pedidos"] += len(batch)
+        self.stats["alertas"] += len(alertas)
+        if alertas and self.sink is not None:
+            self.sink.write(alertas)
+        return alertas
+
+    def _add(self, horas, medidas, linhas):
+        hora = horas[0]
+        na_janela_diaria = hora // 24 > self.hour // 24 - DAYS
+        if not na_janela_diaria:
+            self.stats["descartados"] += len(horas)
+            return []
+        na_janela_horaria = hora > self.hour - HOURS
+        slot_hora, slot_dia = hora % HOURS, (hora // 24) % DAYS
+        soma = medidas.sum(axis=0)
+        self.daily_total[slot_dia] += soma
+        if na_janela_horaria:
+            self.hourly_total[slot_hora] += soma
+        for entidade, janelas in self.entities.items():
+            np.add.at(janelas.daily, (linhas[entidade], slot_dia), medidas)
+            if na_janela_horaria:
+                np.add.at(janelas.hourly, (linhas[entidade], slot_hora), medidas)
+        return self._evaluate({entidade: np.unique(l) for entidade, l in linhas.items()})
+
+    def _evaluate(self, tocadas):
+        """Avalia as regras para as linhas com pedidos novos."""
+        alertas = []
+        base = metric_values(self.daily_total.sum(axis=0), "taxa_faltantes")
+        for j, regra in enumerate(self.rules):
+            janelas = self.entities[regra.entidade]
+            linhas = tocadas[regra.entidade]
+            buffers = janelas.hourly if regra.janela == "24h" else janelas.daily
+            totais = buffers[linhas].sum(axis=1)
+            valores = metric_values(totais, regra.metrica)
+
+            if regra.limite is not None:
+                z = None
+                dispara = valores >= regra.limite
+            else:
+                itens = totais[:, ENTREGUES] + totais[:, FALTANTES]
+                desvio = np.sqrt(base * (1 - base) / np.maximum(itens, 1))
+                z = np.divide(valores - base, desvio, out=np.zeros_like(valores), where=desvio > 0)
+                dispara = z >= regra.zscore
+            dispara &= totais[:, ENTREGAS] >= regra.min_entregas
+            dispara &= self.hour - janelas.last_fired[linhas, j] >= regra.cooldown
+
+            for i in np.flatnonzero(dispara):
+                linha = linhas[i]
+                janelas.last_fired[linha, j] = self.hour
+                alertas.append({
+                    "momento": str(np.datetime64(self.hour, "h").astype("datetime64[m]")),
+                    "regra": regra.nome,
+                    "entidade": regra.entidade,
+                    "id": janelas.ids[linha],
+                    "nome": janelas.names[linha],
+                    "metrica": regra.metrica,
+                    "janela": regra.janela,
+                    "valor": float(valores[i]),
+                    "limite": regra.limite,
+                    "zscore": None if z is None else float(z[i]),
+                    "entregas": int(totais[i, ENTREGAS]),
+                })
+        return alertas
+
+    def window_table(self, entidade, janela="24h"):
+        """Totais e taxa de faltantes da janela para as entidades ativas."""
+        janelas = self.entities[entidade]
+        linhas = np.fromiter(janelas.rows.values(), dtype=np.int64, count=len(janelas))
+        buffers = janelas.hourly if janela == "24h" else janelas.daily
+        totais = buffers[linhas].sum(axis=1)
+        tabela = pd.DataFrame(totais, columns=MEASURES)
+        tabela["taxa_faltantes"] = metric_values(totais, "taxa_faltantes")
+        tabela.insert(0, "nome", janelas.names[linhas])
+        tabela.insert(0, "id", janelas.ids[linhas])
+        return tabela[tabela["entregas"] > 0].reset_index(drop=True)
+
+    def nbytes(self):
+        return sum(janelas.nbytes() for janelas in self.entities.values())
+
+
+class JsonlSink:
+    """Grava os alertas em um arquivo local, um objeto JSON por linha."""
+
+    def __init__(self, path=ALERTS_PATH):
+        self.path = path
+
+    def write(self, alertas):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for alerta in alertas:
+                f.write(json.dumps(alerta, ensure_ascii=False) + "\n")
+
+    def read(self, last=None):
+        """Alertas gravados (os ``last`` mais recentes, se informado)."""
+        if not self.path.exists():
+            return pd.DataFrame()
+        with open(self.path, encoding="utf-8") as f:
+            linhas = [linha for linha in f if linha.strip()]
+        return pd.DataFrame([json.loads(linha) for linha in linhas[-last if last else 0:]])
+
+
+def save_engine(engine, path=STATE_PATH):
+    """Grava as janelas, o relógio e os últimos disparos em um ``.npz``."""
+    arrays = {}
+    for entidade, janelas in engine.entities.items():
+        n = janelas.used
+        arrays[f"{entidade}_ids"] = janelas.ids[:n].astype(str)
+        arrays[f"{entidade}_names"] = janelas.names[:n].astype(str)
+        arrays[f"{entidade}_hourly"] = janelas.hourly[:n]
+        arrays[f"{entidade}_daily"] = janelas.daily[:n]
+        arrays[f"{entidade}_last_fired"] = janelas.last_fired[:n]
+    meta = {"hour": engine.hour, "rules": [asdict(regra) for regra in engine.rules]}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp, meta=json.dumps(meta), hourly_total=engine.hourly_total,
+             daily_total=engine.daily_total, **arrays)
+    tmp.replace(path)
+
+
+def load_engine(rules=DEFAULT_RULES, sink=None, path=STATE_PATH):
+    """Restaura o estado salvo (ou um motor vazio); os disparos são descartados se as regras mudaram."""
+    engine = AlertEngine(rules, sink)
+    if not path.exists():
+        return engine
+    with np.load(path) as dados:
+        meta = json.loads(str(dados["meta"]))
+        mesmas_regras = meta["rules"] == [asdict(regra) for regra in engine.rules]
+        engine.hour = meta["hour"]
+        engine.hourly_total = dados["hourly_total"]
+        engine.daily_total = dados["daily_total"]
+        for entidade, janelas in engine.entities.items():
+            ids = dados[f"{entidade}_ids"].astype(object)
+            n = len(ids)
+            while len(janelas.ids) < n:
+                janelas._grow()
+            janelas.used = n
+            janelas.ids[:n] = ids
+            janelas.names[:n] = dados[f"{entidade}_names"].astype(object)
+            janelas.hourly[:n] = dados[f"{entidade}_hourly"]
+            janelas.daily[:n] = dados[f"{entidade}_daily"]
+            if mesmas_regras:
+                janelas.last_fired[:n] = dados[f"{entidade}_last_fired"]
+            janelas.rows = {entidade_id: linha for linha, entidade_id in enumerate(ids) if entidade_id}
+            janelas.free = [linha for linha, entidade_id in enumerate(ids) if not entidade_id]
+    return engine
+
+
+def replay(df, engine, chunksize=10_000):
+    """Reproduz ``df`` em ordem cronológica, em lotes, como um fluxo de pedidos.
+
+    Retorna ``(segundos, alertas)``.
+    """
+    df = df.iloc[np.argsort(order_hours(df), kind="stable")]
+    alertas = []
+    inicio = time.perf_counter()
+    for i in range(0, len(df), chunksize):
+        alertas += engine.update(df.iloc[i:i + chunksize])
+    return time.perf_counter() - inicio, alertas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alertas em janelas deslizantes por motorista e cliente.")
+    parser.add_argument("--rules", help="Arquivo JSON com as regras (padrão: DEFAULT_RULES).")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    update = sub.add_parser("update", help="Consome um lote de pedidos novos.")
+    update.add_argument("csv")
+    update.add_argument("--chunksize", type=int, default=100_000)
+    replay_parser = sub.add_parser("replay", help="Reproduz o dataset processado e mede a vazão.")
+    replay_parser.add_argument("--scale", type=int, default=1, help="Replica o dataset N vezes.")
+    replay_parser.add_argument("--chunksize", type=int, default=10_000)
+    recent = sub.add_parser("recent", help="Mostra os últimos alertas gravados.")
+    recent.add_argument("--last", type=int, default=20)
+    args = parser.parse_args()
+
+    rules = load_rules(args.rules) if args.rules else DEFAULT_RULES
+    sink = JsonlSink()
+
+    if args.comando == "update":
+        engine = load_engine(rules, sink)
+        for bloco in pd.read_csv(args.csv, chunksize=args.chunksize):
+            engine.update(bloco)
+        save_engine(engine)
+        print(f"{engine.stats['pedidos']} pedidos · {engine.stats['alertas']} alertas gravados em {ALERTS_PATH}")
+    elif args.comando == "replay":
+        from utils.data import load_data
+
+        df = load_data()
+        if args.scale > 1:
+            df = pd.concat([df] * args.scale, ignore_index=True)
+        # Sem gravar: mede apenas o consumo dos pedidos e a avaliação das regras
+        engine = AlertEngine(rules)
+        segundos, alertas = replay(df, engine, args.chunksize)
+        print(f"{len(df)} pedidos em {segundos:.2f}s ({len(df) / segundos:,.0f} pedidos/s) "
+              f"· {len(alertas)} alertas · {engine.stats['descartados']} descartados")
+        print(f"Entidades ativas: {', '.join(f'{e} {len(j)}' for e, j in engine.entities.items())} "
+              f"· janelas {engine.nbytes() / 1e6:.1f} MB")
+        if alertas:
+            print(pd.DataFrame(alertas)["regra"].value_counts().to_string())
+    else:
+        print(sink.read(args.last).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Índices de bitmap para filtrar o dataset por várias dimensões.
+
+Para cada valor de cada dimensão (região, categoria dos itens faltantes, período,
+dia da semana e faixas etárias) é guardado um bitmap com um bit por linha,
+empacotado em palavras de 64 bits (1/8 de byte por linha e valor). A data fica
+como ids de linha ordenados por data: um intervalo vira duas buscas binárias.
+
+Um filtro é resolvido só com operações bit a bit: OU entre os valores escolhidos
+de uma dimensão e E (ou OU) entre as dimensões. O resultado são as posições das
+linhas selecionadas, em ordem, usadas para recortar o DataFrame uma única vez.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.features import WEEKDAY_LABELS
+from utils.model import CATEGORIES
+
+# Dimensões indexadas e os nomes exibidos nos filtros
+DIMENSIONS = {
+    "region": "Região",
+    "category": "Categoria dos Itens Faltantes",
+    "delivery_period": "Período da Entrega",
+    "day_of_week": "Dia da Semana",
+    "driver_age_group": "Faixa Etária do Motorista",
+    "customer_age_group": "Faixa Etária do Cliente",
+}
+
+# Ordem de exibição das dimensões com ordem natural (as demais em ordem alfabética)
+VALUE_ORDER = {
+    "day_of_week": WEEKDAY_LABELS,
+    "delivery_period": ["Manhã", "Tarde", "Noite"],
+    "driver_age_group": CATEGORIES["driver_age_group"],
+    "customer_age_group": CATEGORIES["customer_age_group"],
+}
+
+AND = "and"
+OR = "or"
+
+
+def _words(n):
+    return np.zeros((n + 63) // 64, dtype=np.uint64)
+
+
+def bitmap_from_rows(rows, n):
+    """Bitmap (palavras de 64 bits) com os bits das linhas ``rows`` ligados."""
+    bits = np.zeros(len(_words(n)) * 64, dtype=bool)
+    bits[rows] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def bitmap_rows(bitmap, n):
+    """Posições (ordenadas) dos bits ligados."""
+    return np.flatnonzero(np.unpackbits(bitmap.view(np.uint8), bitorder="little", count=n))
+
+
+def bitmap_count(bitmap):
+    return int(np.bitwise_count(bitmap).sum())
+
+
+def _category_values(category):
+    """Pares (linha, categoria) das listas de categorias (ex.: ``"['Supermarket']"``)."""
+    valores = category.astype(str).str.findall(r"'([^']*)'").explode().dropna()
+    return pd.Series(valores.to_numpy(), index=category.index.get_indexer(valores.index))
+
+
+class BitmapIndex:
+    """Bitmaps por valor de dimensão e ids de linha ordenados por data."""
+
+    def __init__(self, n, bitmaps, date_order, date_sorted):
+        self.n = n
+        self.bitmaps = bitmaps  # dimensão -> {valor: bitmap}
+        self.date_order = date_order  # posições das linhas ordenadas por data
+        self.date_sorted = date_sorted  # datas (dias desde 1970) na mesma ordem
+
+    @classmethod
+    def build(cls, df):
+        n = len(df)
+        bitmaps = {}
+        for dimensao in DIMENSIONS:
+            if dimensao == "category":
+                pares = _category_values(df["category"])
+                linhas, valores = pares.index.to_numpy(), pares.to_numpy()
+            else:
+                linhas, valores = np.arange(n), df[dimensao].to_numpy()
+            codigos, unicos = pd.factorize(valores, sort=True)
+            ordem = np.argsort(codigos, kind="stable")
+            limites = np.searchsorted(codigos[ordem], np.arange(len(unicos) + 1))
+            bitmaps[dimensao] = {
+                valor: bitmap_from_rows(linhas[ordem[limites[i]:limites[i + 1]]], n)
+                for i, valor in enumerate(unicos)
+            }
+        datas = df["date_days"].to_numpy()
+        date_order = np.argsort(datas, kind="stable")
+        return cls(n, bitmaps, date_order, datas[date_order])
+
+    def values(self, dimensao):
+        """Valores de uma dimensão, na ordem natural quando houver."""
+        valores = list(self.bitmaps[dimensao])
+        ordem = VALUE_ORDER.get(dimensao)
+        if ordem is None:
+            return valores
+        return [v for v in ordem if v in self.bitmaps[dimensao]] + [v for v in valores if v not in ordem]
+
+    @property
+    def date_range(self):
+        """Primeira e última data (dias desde 1970)."""
+        return int(self.date_sorted[0]), int(self.date_sorted[-1])
+
+    def dimension_bitmap(self, dimensao, valores):
+        """OU dos bitmaps dos valores escolhidos de uma dimensão."""
+        resultado = _words(self.n)
+        for valor in valores:
+            bitmap = self.bitmaps[dimensao].get(valor)
+            if bitmap is not None:
+                resultado |= bitmap
+        return resultado
+
+    def date_bitmap(self, inicio, fim):
+        """Linhas com data entre ``inicio`` e ``fim`` (dias desde 1970, inclusive)."""
+        a = np.searchsorted(self.date_sorted, inicio, side="left")
+        b = np.searchsorted(self.date_sorted, fim, side="right")
+        return bitmap_from_rows(self.date_order[a:b], self.n)
+
+    def select(self, filtros, date_range=None, combine=AND):
+        """Bitmap da seleção, ou ``None`` se nenhum filtro estiver ativo (todas as linhas).
+
+        ``filtros`` mapeia dimensão -> valores escolhidos (lista vazia: sem filtro).
+        ``combine`` define como as dimensões (e o intervalo de datas) se combinam.
+        """
+        partes = [self.dimension_bitmap(d, v) for d, v in filtros.items() if v]
+        if date_range is not None and tuple(date_range) != self.date_range:
+            partes.append(self.date_bitmap(*date_range))
+        if not partes:
+            return None
+        resultado = partes[0].copy()
+        for parte in partes[1:]:
+            if combine == OR:
+                resultado |= parte
+            else:
+                resultado &= parte
+        return resultado
+
+    def rows(self, bitmap):
+        return np.arange(self.n) if bitmap is None else bitmap_rows(bitmap, self.n)
+
+    def count(self, bitmap):
+        return self.n if bitmap is None else bitmap_count(bitmap)
+
+    def filter(self, df, filtros, date_range=None, combine=AND):
+        """Linhas de ``df`` (o mesmo DataFrame do índice) que atendem aos filtros, na ordem original."""
+        bitmap = self.select(filtros, date_range, combine)
+        return df if bitmap is None else df.take(bitmap_rows(bitmap, self.n))
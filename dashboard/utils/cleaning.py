@@ -0,0 +1,324 @@
+"""Limpeza e validação dos datasets brutos (etapas do notebook de EDA).
+
+Cada função ``clean_*`` é uma etapa do pipeline (``utils.pipeline``): lê o arquivo
+bruto em blocos de ``CHUNKSIZE`` linhas (memória limitada, independente do tamanho
+do arquivo), aplica regras vetorizadas a cada bloco e grava o arquivo limpo e o
+relatório de rejeições de forma incremental.
+
+Regras aplicadas: conversão de tipos, campos obrigatórios, faixas válidas e chaves
+duplicadas (entre todos os blocos). Linhas que violam uma regra vão para o
+relatório com o número da linha no arquivo bruto e o motivo (a primeira regra
+violada); avisos mantêm a linha no arquivo limpo. Faixas de tamanho do pedido e
+períodos do dia são calculados com aritmética inteira e faixas etárias com busca
+binária nos limites das faixas, sem funções Python por linha.
+"""
+
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from utils.data import DATA_DIR
+
+REJECTED_DIR = DATA_DIR / "rejected"
+CHUNKSIZE = 200_000
+
+DRIVER_AGE_BINS = (18, 25, 35, 45, 55, 65)
+DRIVER_AGE_LABELS = ("18-25", "26-35", "36-45", "46-55", "56-65")
+CUSTOMER_AGE_BINS = (18, 25, 35, 45, 55, 65, 75, 85, 90)
+CUSTOMER_AGE_LABELS = ("18-25", "26-35", "36-45", "46-55", "56-65", "66-75", "76-85", "85+")
+ITEMS_BIN_WIDTH = 5
+ITEMS_LABELS = ("1-5", "6-10", "11-15", "16-20")
+MONTH_NAMES = tuple(calendar.month_name)
+
+# Períodos de 6 horas: 0h-5h, 6h-11h, 12h-17h, 18h-23h
+PERIODS_BY_QUARTER = ("Noite", "Manhã", "Tarde", "Noite")
+
+_MISSING_PRODUCT_COLUMNS = ("product_id_1", "product_id_2", "product_id_3")
+
+REJEITADA = "rejeitada"
+MANTIDA = "mantida"
+
+
+class RejectionReport:
+    """Relatório das linhas rejeitadas (ou mantidas com aviso), gravado bloco a bloco."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.rejeitadas = 0
+        self.avisos = 0
+        self._cabecalho = True
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            open(path, "w").close()
+
+    def _write(self, chunk, motivos, acao):
+        linhas = (motivos != "").to_numpy()
+        if not linhas.any() or self.path is None:
+            return
+        registros = chunk.loc[linhas].copy()
+        registros.insert(0, "acao", acao)
+        registros.insert(0, "motivo", motivos[linhas].to_numpy())
+        # Número da linha no arquivo bruto (o cabeçalho é a linha 1)
+        registros.insert(0, "linha", chunk.index[linhas] + 2)
+        registros.to_csv(self.path, mode="a", index=False, header=self._cabecalho)
+        self._cabecalho = False
+
+    def validate(self, chunk, rules, warnings=None):
+        """Aplica as regras ``{motivo: máscara de linhas inválidas}`` e retorna a máscara das linhas válidas.
+
+        As regras são avaliadas em ordem; cada linha é registrada pelo primeiro motivo.
+        ``warnings`` segue o mesmo formato, mas as linhas são mantidas.
+        """
+        motivos = pd.Series("", index=chunk.index, dtype=object)
+        rejeitar = np.zeros(len(chunk), dtype=bool)
+        for motivo, invalidas in rules.items():
+            novas = np.asarray(invalidas, dtype=bool) & ~rejeitar
+            motivos[novas] = motivo
+            rejeitar |= novas
+        self._write(chunk, motivos, REJEITADA)
+        self.rejeitadas += int(rejeitar.sum())
+
+        if warnings:
+            motivos = pd.Series("", index=chunk.index, dtype=object)
+            avisadas = np.zeros(len(chunk), dtype=bool)
+            for motivo, suspeitas in warnings.items():
+                novas = np.asarray(suspeitas, dtype=bool) & ~rejeitar & ~avisadas
+                motivos[novas] = motivo
+                avisadas |= novas
+            self._write(chunk, motivos, MANTIDA)
+            self.avisos += int(avisadas.sum())
+        return ~rejeitar
+
+    def summary(self):
+        return {"rejeitadas": self.rejeitadas, "avisos": self.avisos}
+
+
+class KeySet:
+    """Chaves já vistas (hash de 64 bits), para detectar duplicatas entre blocos.
+
+    Guarda apenas ``uint64`` em vetores ordenados (8 bytes por chave), em vez das
+    strings originais.
+    """
+
+    MAX_RUNS = 8
+
+    def __init__(self):
+        self._runs = []
+
+    def seen(self, keys):
+        """Máscara das chaves repetidas (no próprio bloco ou em blocos anteriores)."""
+        hashes = pd.util.hash_array(keys.to_numpy(dtype=object))
+        repetidas = pd.Series(hashes).duplicated().to_numpy()
+        for run in self._runs:
+            pos = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            repetidas |= run[pos] == hashes
+        return repetidas
+
+    def add(self, keys):
+        if len(keys) == 0:
+            return
+        self._runs.append(np.unique(pd.util.hash_array(keys.to_numpy(dtype=object))))
+        if len(self._runs) > self.MAX_RUNS:
+            self._runs = [np.unique(np.concatenate(self._runs))]
+
+
+def read_chunks(path, chunksize=CHUNKSIZE):
+    """Lê um CSV bruto em blocos, com todas as colunas como texto."""
+    return pd.read_csv(path, dtype=str, chunksize=chunksize)
+
+
+def to_integer(values):
+    """Converte texto em inteiros; valores ausentes ou não inteiros viram NaN."""
+    numeros = pd.to_numeric(values, errors="coerce")
+    return numeros.where(numeros % 1 == 0)
+
+
+def parse_money(values):
+    """Converte valores como ``$1,095.54`` em float (NaN se inválido)."""
+    return pd.to_numeric(values.str.replace("$", "", regex=False).str.replace(",", "", regex=False),
+                         errors="coerce")
+
+
+def parse_hour(delivery_hour):
+    """Valida horários ``H:MM:SS`` ou ``HH:MM:SS`` com aritmética inteira sobre os caracteres.
+
+    Retorna os segundos desde 00:00:00 (-1 se inválido) e o horário normalizado
+    como ``HH:MM:SS``.
+    """
+    bruto = delivery_hour.fillna("").to_numpy(dtype=str)
+    if len(bruto) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype="U8")
+    texto = np.strings.rjust(bruto, 8, "0").astype("U8")
+    # Códigos dos caracteres menos '0': dígitos viram 0-9 e ':' vira 10
+    d = texto.view(np.uint32).reshape(len(texto), 8).astype(np.int64) - ord("0")
+    h = d[:, 0] * 10 + d[:, 1]
+    m = d[:, 3] * 10 + d[:, 4]
+    s = d[:, 6] * 10 + d[:, 7]
+    digitos = d[:, [0, 1, 3, 4, 6, 7]]
+    validos = (
+        ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+        & (d[:, 2] == 10) & (d[:, 5] == 10)
+        & (np.strings.str_len(bruto) <= 8)
+        & (h < 24) & (m < 60) & (s < 60)
+    )
+    segundos = np.where(validos, h * 3600 + m * 60 + s, -1)
+    return segundos, texto
+
+
+def delivery_period(hour):
+    """Período do dia a partir da hora: Manhã (6h-11h), Tarde (12h-17h) ou Noite."""
+    return np.asarray(PERIODS_BY_QUARTER, dtype=object)[np.asarray(hour) // 6]
+
+
+def bin_labels(values, bins, labels):
+    """Rótulo da faixa ``(bins[i], bins[i+1]]`` de cada valor (a primeira inclui o limite inferior).
+
+    Valores fora de ``[bins[0], bins[-1]]`` ficam sem rótulo (NaN).
+    """
+    valores = np.asarray(values, dtype=float)
+    codigos = np.searchsorted(np.asarray(bins), valores, side="left") - 1
+    codigos[valores == bins[0]] = 0
+    validos = (valores >= bins[0]) & (valores <= bins[-1])
+    rotulos = np.asarray(labels, dtype=object)[np.clip(codigos, 0, len(labels) - 1)]
+    return pd.Series(np.where(validos, rotulos, np.nan), index=getattr(values, "index", None))
+
+
+def _clean_file(raw_path, output, report_path, clean_chunk, chunksize):
+    report = RejectionReport(report_path)
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        for i, chunk in enumerate(read_chunks(raw_path, chunksize)):
+            clean_chunk(chunk, report).to_csv(f, index=False, header=(i == 0))
+    return report.summary()
+
+
+def _required(chunk, columns):
+    return {f"{col} ausente": chunk[col].isna() for col in columns}
+
+
+def _drop_duplicates(chunk, column, keys, report):
+    """Rejeita chaves repetidas (mantém a primeira ocorrência válida) e registra as novas."""
+    duplicadas = keys.seen(chunk[column])
+    chunk = chunk[report.validate(chunk, {f"{column} duplicado": duplicadas})]
+    keys.add(chunk[column])
+    return chunk
+
+
+def clean_products(inputs, output, report=None, chunksize=CHUNKSIZE):
+    keys = KeySet()
+
+    def clean_chunk(chunk, report):
+        # Corrigir nome da primeira coluna 'produc_id' para 'product_id'
+        chunk = chunk.rename(columns={"produc_id": "product_id"})
+        price = parse_money(chunk["price"])
+        validas = report.validate(chunk, {
+            **_required(chunk, ["product_id", "product_name", "category"]),
+            "price inválido": price.isna() | (price < 0),
+        })
+        chunk = chunk.assign(price=price)[validas]
+        return _drop_duplicates(chunk, "product_id", keys, report)
+
+    return _clean_file(inputs[0], output, report, clean_chunk, chunksize)
+
+
+def clean_orders(inputs, output, report=None, chunksize=CHUNKSIZE):
+    keys = KeySet()
+
+    def clean_chunk(chunk, report):
+        date = pd.to_datetime(chunk["date"], format="%Y-%m-%d", errors="coerce")
+        order_amount = parse_money(chunk["order_amount"])
+        items_delivered = to_integer(chunk["items_delivered"])
+        items_missing = to_integer(chunk["items_missing"])
+        segundos, horario = parse_hour(chunk["delivery_hour"])
+        validas = report.validate(chunk, {
+            **_required(chunk, ["order_id", "region", "driver_id", "customer_id"]),
+            "date inválida": date.isna(),
+            "order_amount inválido": order_amount.isna() | (order_amount < 0),
+            "items_delivered inválido": items_delivered.isna() | (items_delivered < 1),
+            "items_missing inválido": items_missing.isna() | (items_missing < 0),
+            "delivery_hour inválido": segundos < 0,
+        }, warnings={
+            "items_missing maior que items_delivered": items_missing > items_delivered,
+        })
+
+        orders = chunk[validas].assign(
+            date=date[validas].dt.strftime("%Y-%m-%d"),
+            order_amount=order_amount[validas],
+            items_delivered=items_delivered[validas].astype(np.int64),
+            items_missing=items_missing[validas].astype(np.int64),
+            delivery_hour=horario[validas],
+        )
+        orders = _drop_duplicates(orders, "order_id", keys, report)
+
+        entregues = orders["items_delivered"].to_numpy()
+        orders["missing_rate"] = orders["items_missing"] / orders["items_delivered"]
+        orders["month_name"] = np.asarray(MONTH_NAMES, dtype=object)[date[orders.index].dt.month.to_numpy()]
+        # Faixas de 5 itens: 1-5 -> 0, 6-10 -> 1, ... (acima de 20 fica sem faixa)
+        faixa = np.minimum((entregues - 1) // ITEMS_BIN_WIDTH, len(ITEMS_LABELS) - 1)
+        orders["items_range"] = np.where(
+            entregues <= ITEMS_BIN_WIDTH * len(ITEMS_LABELS),
+            np.asarray(ITEMS_LABELS, dtype=object)[faixa],
+            np.nan,
+        )
+        return orders
+
+    return _clean_file(inputs[0], output, report, clean_chunk, chunksize)
+
+
+def clean_missing_data(inputs, output, report=None, chunksize=CHUNKSIZE):
+    keys = KeySet()
+    colunas = list(_MISSING_PRODUCT_COLUMNS)
+
+    def clean_chunk(chunk, report):
+        produtos = chunk[colunas]
+        validas = report.validate(chunk, {
+            **_required(chunk, ["order_id"]),
+            "nenhum produto informado": produtos.isna().all(axis=1),
+        })
+        chunk = _drop_duplicates(chunk[validas], "order_id", keys, report)
+
+        # Lista dos produtos não entregues no formato de lista do Python: ['A', 'B']
+        citados = chunk[colunas].apply(lambda col: "'" + col + "'")
+        lista = citados.stack().groupby(level=0).agg(", ".join)
+        chunk["products_missing"] = ("[" + lista.reindex(chunk.index).fillna("") + "]")
+        chunk["num_products_missing"] = chunk[colunas].notna().sum(axis=1)
+        return chunk
+
+    return _clean_file(inputs[0], output, report, clean_chunk, chunksize)
+
+
+def clean_drivers(inputs, output, report=None, chunksize=CHUNKSIZE):
+    keys = KeySet()
+
+    def clean_chunk(chunk, report):
+        age = to_integer(chunk["age"])
+        trips = to_integer(chunk["Trips"])
+        validas = report.validate(chunk, {
+            **_required(chunk, ["driver_id", "driver_name"]),
+            "age fora da faixa": ~age.between(DRIVER_AGE_BINS[0], DRIVER_AGE_BINS[-1]),
+            "Trips inválido": trips.isna() | (trips < 0),
+        })
+        drivers = chunk.assign(age=age, Trips=trips)[validas]
+        drivers = drivers.astype({"age": np.int64, "Trips": np.int64})
+        drivers = _drop_duplicates(drivers, "driver_id", keys, report)
+        drivers["age_group"] = bin_labels(drivers["age"], DRIVER_AGE_BINS, DRIVER_AGE_LABELS)
+        return drivers
+
+    return _clean_file(inputs[0], output, report, clean_chunk, chunksize)
+
+
+def clean_customers(inputs, output, report=None, chunksize=CHUNKSIZE):
+    keys = KeySet()
+
+    def clean_chunk(chunk, report):
+        age = to_integer(chunk["customer_age"])
+        validas = report.validate(chunk, {
+            **_required(chunk, ["customer_id", "customer_name"]),
+            "customer_age fora da faixa": ~age.between(CUSTOMER_AGE_BINS[0], CUSTOMER_AGE_BINS[-1]),
+        })
+        customers = chunk.assign(customer_age=age)[validas].astype({"customer_age": np.int64})
+        customers = _drop_duplicates(customers, "customer_id", keys, report)
+        customers["age_group"] = bin_labels(customers["customer_age"], CUSTOMER_AGE_BINS, CUSTOMER_AGE_LABELS)
+        return customers
+
+    return _clean_file(inputs[0], output, report, clean_chunk, chunksize)
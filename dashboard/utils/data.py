@@ -0,0 +1,31 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+# Caminho absoluto baseado na raiz do projeto
+BASE_DIR = Path(__file__).resolve().parent.parent.parent  # Sobe três níveis para "Projeto/"
+DATA_DIR = BASE_DIR / "data"
+PROCESSED_DIR = DATA_DIR / "processed"
+RAW_DIR = DATA_DIR / "raw"
+MODEL_DIR = BASE_DIR / "modelo"
+
+DATASET_PATH = PROCESSED_DIR / "df_final_walmart.csv"
+
+# Variável de ambiente que aponta o dashboard para outro dataset (ex.: o sintético do teste de carga)
+DATASET_ENV = "WALMART_DATASET"
+
+
+def load_data(file_path=DATASET_PATH):
+    """Carrega o dataset integrado usado pelas páginas do dashboard.
+
+    As colunas de tempo pré-calculadas são lidas com tipos inteiros compactos.
+    """
+    from utils.features import TIME_DTYPES
+
+    return pd.read_csv(file_path, dtype=TIME_DTYPES)
+
+
+def dashboard_dataset_path():
+    """Dataset exibido pelo dashboard: ``$WALMART_DATASET`` ou o dataset processado."""
+    return Path(os.environ.get(DATASET_ENV) or DATASET_PATH)
@@ -0,0 +1,304 @@
+"""Monitoramento de drift das variáveis de entrada com sketches de tamanho fixo.
+
+A referência de treinamento guarda, para cada variável numérica, os limites de
+faixas por quantis e as contagens de referência; para as categóricas, o
+vocabulário e as contagens. Cada lote pontuado é reduzido a contagens por
+variável e por dia (somáveis entre lotes e entre dias), então nenhuma linha bruta
+é mantida. PSI e KS são calculados entre as contagens acumuladas e a referência.
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.drift reference            # referência a partir do dataset de treino
+    python -m utils.drift update novos.csv     # acumula um lote (lido em blocos)
+    python -m utils.drift report --days 7
+
+A pontuação em lote (``python -m utils.registry score <csv>``) acumula cada lote
+pontuado automaticamente por ``record_batches``/``record_file``; o ``update``
+manual serve para lotes pontuados fora do registro.
+"""
+
+import argparse
+import json
+import os
+import threading
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.data import DATA_DIR, MODEL_DIR
+
+REFERENCE_PATH = MODEL_DIR / "drift_reference.json"
+STATE_PATH = DATA_DIR / "monitoring" / "drift_state.json"
+
+NUMERIC_FEATURES = [
+    "order_amount", "items_delivered", "Trips",
+    "driver_complaint_rate", "customer_complaint_rate",
+]
+CATEGORICAL_FEATURES = ["region", "delivery_period"]
+
+N_BINS = 20
+RETENTION_DAYS = 180
+OTHER = "__outros__"
+
+# Faixas usuais de interpretação do PSI
+PSI_ATENCAO = 0.1
+PSI_DRIFT = 0.25
+
+_EPS = 1e-6
+
+# Serializa carregar/atualizar/gravar o estado entre threads do mesmo processo
+_lock = threading.Lock()
+
+
+def _numeric_bins(values, edges):
+    """Índice da faixa de cada valor; a última posição conta os nulos."""
+    values = np.asarray(values, dtype=float)
+    bins = np.searchsorted(edges, values, side="right")
+    bins[np.isnan(values)] = len(edges) + 1
+    return bins
+
+
+def numeric_counts(values, edges):
+    """Contagens por faixa (``len(edges) + 1`` faixas + nulos)."""
+    return np.bincount(_numeric_bins(values, edges), minlength=len(edges) + 2)
+
+
+def categorical_counts(values, categories):
+    """Contagens por categoria conhecida; as demais vão para ``OTHER``."""
+    codes = pd.Categorical(values, categories=categories).codes.astype(np.int64)
+    codes[codes < 0] = len(categories)
+    return np.bincount(codes, minlength=len(categories) + 1)
+
+
+def build_reference(df, n_bins=N_BINS):
+    """Cria a referência de drift a partir do dataset de treinamento."""
+    reference = {"numeric": {}, "categorical": {}}
+    quantis = np.linspace(0, 1, n_bins + 1)[1:-1]
+    for col in NUMERIC_FEATURES:
+        edges = np.unique(np.nanquantile(df[col].to_numpy(dtype=float), quantis))
+        reference["numeric"][col] = {
+            "edges": edges.tolist(),
+            "counts": numeric_counts(df[col], edges).tolist(),
+        }
+    for col in CATEGORICAL_FEATURES:
+        categories = sorted(df[col].dropna().unique().tolist())
+        reference["categorical"][col] = {
+            "categories": categories,
+            "counts": categorical_counts(df[col], categories).tolist(),
+        }
+    return reference
+
+
+def psi(reference_counts, current_counts):
+    """Population Stability Index entre duas distribuições de contagens."""
+    ref = np.asarray(reference_counts, dtype=float)
+    cur = np.asarray(current_counts, dtype=float)
+    if cur.sum() == 0 or ref.sum() == 0:
+        return np.nan
+    ref = np.clip(ref / ref.sum(), _EPS, None)
+    cur = np.clip(cur / cur.sum(), _EPS, None)
+    return float(np.sum((cur - ref) * np.log(cur / ref)))
+
+
+def ks(reference_counts, current_counts):
+    """Estatística KS sobre as distribuições acumuladas das faixas."""
+    ref = np.asarray(reference_counts, dtype=float)
+    cur = np.asarray(current_counts, dtype=float)
+    if cur.sum() == 0 or ref.sum() == 0:
+        return np.nan
+    return float(np.max(np.abs(np.cumsum(ref) / ref.sum() - np.cumsum(cur) / cur.sum())))
+
+
+class DriftMonitor:
+    """Contagens acumuladas por variável e por dia, comparadas à referência."""
+
+    def __init__(self, reference, state=None, retention_days=RETENTION_DAYS):
+        self.reference = reference
+        self.retention_days = retention_days
+        # {dia: {"n": int, "features": {variável: [contagens]}}}
+        self.days = {} if state is None else state.get("days", {})
+
+    def _empty_day(self):
+        features = {}
+        for col, ref in self.reference["numeric"].items():
+            features[col] = np.zeros(len(ref["counts"]), dtype=np.int64)
+        for col, ref in self.reference["categorical"].items():
+            features[col] = np.zeros(len(ref["counts"]), dtype=np.int64)
+        return {"n": 0, "features": features}
+
+    def _add(self, day, batch):
+        atual = self.days.get(day)
+        if atual is None:
+            atual = self._empty_day()
+        else:
+            atual = {
+                "n": atual["n"],
+                "features": {col: np.asarray(c, dtype=np.int64) for col, c in atual["features"].items()},
+            }
+        for col, ref in self.reference["numeric"].items():
+            if col in batch:
+                atual["features"][col] += numeric_counts(batch[col], np.asarray(ref["edges"]))
+        for col, ref in self.reference["categorical"].items():
+            if col in batch:
+                atual["features"][col] += categorical_counts(batch[col], ref["categories"])
+        atual["n"] += len(batch)
+        self.days[day] = {
+            "n": int(atual["n"]),
+            "features": {col: c.tolist() for col, c in atual["features"].items()},
+        }
+
+    def update(self, batch, day=None):
+        """Acumula um lote pontuado; sem ``day`` usa a coluna ``date`` ou a data de hoje."""
+        if day is not None:
+            self._add(str(day), batch)
+        elif "date" in batch:
+            for dia, grupo in batch.groupby(batch["date"].astype(str).str[:10]):
+                self._add(dia, grupo)
+        else:
+            self._add(date.today().isoformat(), batch)
+
+        # Mantém apenas os dias mais recentes
+        excedentes = max(len(self.days) - self.retention_days, 0)
+        for dia in sorted(self.days)[:excedentes]:
+            del self.days[dia]
+
+    def merged_counts(self, days=None):
+        """Soma as contagens dos dias selecionados (todos, por padrão)."""
+        selecionados = [d for d in sorted(self.days) if days is None or d in days]
+        total = self._empty_day()
+        for dia in selecionados:
+            total["n"] += self.days[dia]["n"]
+            for col, counts in self.days[dia]["features"].items():
+                total["features"][col] += np.asarray(counts, dtype=np.int64)
+        return total
+
+    def report(self, days=None):
+        """PSI e KS por variável para os dias selecionados."""
+        atual = self.merged_counts(days)
+        linhas = []
+        for tipo in ("numeric", "categorical"):
+            for col, ref in self.reference[tipo].items():
+                valor_psi = psi(ref["counts"], atual["features"][col])
+                linhas.append({
+                    "variavel": col,
+                    "tipo": "numérica" if tipo == "numeric" else "categórica",
+                    "psi": valor_psi,
+                    "ks": ks(ref["counts"], atual["features"][col]) if tipo == "numeric" else np.nan,
+                    "status": status(valor_psi),
+                })
+        return pd.DataFrame(linhas)
+
+    def state(self):
+        return {"days": self.days}
+
+
+def bin_labels(reference, col):
+    """Rótulos das faixas/categorias de uma variável, na ordem das contagens."""
+    if col in reference["categorical"]:
+        return reference["categorical"][col]["categories"] + [OTHER]
+    edges = reference["numeric"][col]["edges"]
+    labels = [f"< {edges[0]:,.2f}"]
+    labels += [f"{a:,.2f} – {b:,.2f}" for a, b in zip(edges[:-1], edges[1:])]
+    labels += [f">= {edges[-1]:,.2f}", "nulos"]
+    return labels
+
+
+def status(valor_psi):
+    if np.isnan(valor_psi):
+        return "sem dados"
+    if valor_psi >= PSI_DRIFT:
+        return "drift"
+    if valor_psi >= PSI_ATENCAO:
+        return "atenção"
+    return "estável"
+
+
+def _write_json(obj, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def save_reference(reference, path=REFERENCE_PATH):
+    _write_json(reference, path)
+
+
+def load_reference(path=REFERENCE_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_monitor(reference_path=REFERENCE_PATH, state_path=STATE_PATH):
+    """Carrega a referência e o estado acumulado (vazio se ainda não existir)."""
+    state = None
+    if state_path.exists():
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    return DriftMonitor(load_reference(reference_path), state)
+
+
+def save_monitor(monitor, path=STATE_PATH):
+    _write_json(monitor.state(), path)
+
+
+def record_batches(batches, reference_path=REFERENCE_PATH, state_path=STATE_PATH):
+    """Acumula lotes pontuados no estado salvo do monitor (carrega, atualiza e grava).
+
+    Sem referência de treinamento o monitoramento não está configurado: nada é
+    gravado e o retorno é ``None``; senão, retorna o monitor atualizado.
+    """
+    if not Path(reference_path).exists():
+        return None
+    with _lock:
+        monitor = load_monitor(reference_path, state_path)
+        for lote in batches:
+            monitor.update(lote)
+        save_monitor(monitor, state_path)
+    return monitor
+
+
+def record_file(path, chunksize=100_000, reference_path=REFERENCE_PATH, state_path=STATE_PATH):
+    """Como ``record_batches``, lendo do CSV em blocos só as variáveis monitoradas e a data."""
+    if not Path(reference_path).exists():
+        return None
+    reference = load_reference(reference_path)
+    monitoradas = set(reference["numeric"]) | set(reference["categorical"]) | {"date"}
+    colunas = [c for c in pd.read_csv(path, nrows=0).columns if c in monitoradas]
+    return record_batches(pd.read_csv(path, usecols=colunas, chunksize=chunksize), reference_path, state_path)
+
+
+def main():
+    from utils.data import load_data
+
+    parser = argparse.ArgumentParser(description="Monitoramento de drift das variáveis de entrada.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("reference", help="Cria a referência a partir do dataset de treino.")
+    update = sub.add_parser("update", help="Acumula um lote de pedidos pontuados.")
+    update.add_argument("csv")
+    update.add_argument("--chunksize", type=int, default=100_000)
+    report = sub.add_parser("report", help="Mostra PSI/KS dos últimos dias.")
+    report.add_argument("--days", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.comando == "reference":
+        save_reference(build_reference(load_data()))
+        print(f"Referência salva em {REFERENCE_PATH}")
+        return
+
+    if args.comando == "update":
+        monitor = record_file(args.csv, args.chunksize)
+        if monitor is None:
+            raise SystemExit(f"Referência não encontrada em {REFERENCE_PATH}. Execute: python -m utils.drift reference")
+        print(f"Estado salvo em {STATE_PATH} ({len(monitor.days)} dias)")
+    else:
+        monitor = load_monitor()
+        dias = sorted(monitor.days)[-args.days:] if args.days else None
+        print(monitor.report(dias).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
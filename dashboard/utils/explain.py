@@ -0,0 +1,132 @@
+"""Explicações por previsão para o modelo Gradient Boosting.
+
+As contribuições seguem o método de Saabas: ao longo do caminho de cada amostra
+em cada árvore, a variação do valor do nó é atribuída à variável usada na divisão.
+A soma das contribuições mais o ``bias`` reproduz exatamente o log-odds do modelo
+(``decision_function``).
+
+Para ser vetorizado, o caminho de cada folha é pré-calculado uma única vez em uma
+matriz esparsa empilhada (nós de todas as árvores x variáveis). Em lote, basta
+``model.apply`` (o mesmo custo de percorrer as árvores na previsão) seguido de um
+produto esparso, processado em blocos para limitar a memória.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.model import FEATURE_LABELS, feature_field
+
+# Tamanho dos blocos usados em lote
+BATCH_SIZE = 100_000
+
+
+class GradientBoostingExplainer:
+    """Contribuições por variável de um ``GradientBoostingClassifier`` binário."""
+
+    def __init__(self, model, feature_names=None):
+        if model.estimators_.shape[1] != 1:
+            raise ValueError("Apenas classificação binária é suportada.")
+
+        self.model = model
+        self.feature_names = list(
+            feature_names if feature_names is not None else model.feature_names_in_
+        )
+        n_features = len(self.feature_names)
+
+        rows, cols, vals = [], [], []
+        offsets = []
+        offset = 0
+        root_total = 0.0
+        for estimator in model.estimators_[:, 0]:
+            tree = estimator.tree_
+            value = tree.value[:, 0, 0] * model.learning_rate
+            left, right = tree.children_left, tree.children_right
+
+            internos = np.flatnonzero(left >= 0)
+            parent = np.full(tree.node_count, -1)
+            parent[left[internos]] = internos
+            parent[right[internos]] = internos
+
+            # Sobe de cada folha até a raiz, acumulando (folha, variável, variação)
+            folhas = np.flatnonzero(left < 0)
+            no = folhas.copy()
+            ativos = parent[no] >= 0
+            while ativos.any():
+                pai = parent[no[ativos]]
+                rows.append(folhas[ativos] + offset)
+                cols.append(tree.feature[pai])
+                vals.append(value[no[ativos]] - value[pai])
+                no[ativos] = pai
+                ativos = parent[no] >= 0
+
+            root_total += value[0]
+            offsets.append(offset)
+            offset += tree.node_count
+
+        # Duplicatas (mesma variável no caminho) são somadas na conversão para CSR
+        self._path_matrix = sparse.coo_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(offset, n_features),
+        ).tocsr()
+        self._offsets = np.asarray(offsets)
+        self.bias = float(
+            model._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0, 0]
+            + root_total
+        )
+
+        # Matriz que soma as colunas codificadas de cada variável original
+        self.fields = list(dict.fromkeys(feature_field(col) for col in self.feature_names))
+        indice = {campo: i for i, campo in enumerate(self.fields)}
+        self._group_matrix = sparse.csr_matrix(
+            (
+                np.ones(n_features),
+                ([*range(n_features)], [indice[feature_field(col)] for col in self.feature_names]),
+            ),
+            shape=(n_features, len(self.fields)),
+        )
+
+        self._grouped_path_matrix = (self._path_matrix @ self._group_matrix).tocsr()
+
+    def _contributions(self, X, path_matrix):
+        """Soma, para cada amostra, as linhas de ``path_matrix`` das folhas atingidas."""
+        X = np.asarray(X, dtype=np.float32)
+        blocos = [np.zeros((0, path_matrix.shape[1]))]
+        for inicio in range(0, X.shape[0], BATCH_SIZE):
+            folhas = self.model.apply(X[inicio:inicio + BATCH_SIZE])[:, :, 0]
+            folhas = folhas.astype(np.int64) + self._offsets
+            m, n_trees = folhas.shape
+            indicadora = sparse.csr_matrix(
+                (np.ones(m * n_trees), folhas.ravel(), np.arange(0, m * n_trees + 1, n_trees)),
+                shape=(m, path_matrix.shape[0]),
+            )
+            blocos.append((indicadora @ path_matrix).toarray())
+        return np.vstack(blocos)
+
+    def contributions(self, X, grouped=True):
+        """Contribuições em log-odds por variável.
+
+        Com ``grouped=True`` as colunas one-hot são somadas de volta às variáveis
+        originais (região, período, faixas etárias, ...).
+        """
+        index = X.index if isinstance(X, pd.DataFrame) else None
+        if grouped:
+            contrib = self._contributions(X, self._grouped_path_matrix)
+            return pd.DataFrame(contrib, columns=self.fields, index=index)
+        contrib = self._contributions(X, self._path_matrix)
+        return pd.DataFrame(contrib, columns=self.feature_names, index=index)
+
+    def top_reasons(self, X, k=3):
+        """Retorna as ``k`` variáveis que mais aumentam o risco de fraude de cada amostra."""
+        contrib = self.contributions(X)
+        valores = contrib.to_numpy()
+        k = min(k, valores.shape[1])
+        ordem = np.argsort(-valores, axis=1)[:, :k]
+        linhas = np.arange(len(valores))
+
+        nomes = np.asarray([FEATURE_LABELS.get(campo, campo) for campo in self.fields])
+        result = {}
+        for i in range(k):
+            result[f"motivo_{i + 1}"] = nomes[ordem[:, i]]
+            result[f"contribuicao_{i + 1}"] = valores[linhas, ordem[:, i]]
+        return pd.DataFrame(result, index=contrib.index)
@@ -0,0 +1,196 @@
+"""Matriz de variáveis codificadas em disco, mapeada em memória.
+
+O dataset processado é codificado uma única vez, em blocos, pelo pré-processamento
+salvo com o modelo (``utils.preprocessing``) e gravado em ``data/processed/matrix/``
+como arquivos ``.npy``: ``X.npy`` (linhas × colunas codificadas, float64) e
+``y.npy`` (rótulos). ``schema.json`` registra a versão do esquema, as colunas na
+ordem da matriz, o número de linhas e os hashes do dataset de origem e do
+pré-processamento; ele é gravado por último e marca a matriz como completa.
+
+Treinamento, folds de validação cruzada e pontuação em lote abrem a matriz com
+``np.load(mmap_mode="r")``: os processos compartilham as páginas do arquivo em
+vez de manter uma cópia de X cada um, e a matriz pode ser maior que a memória
+disponível por processo.
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.feature_matrix build [--force]
+    python -m utils.feature_matrix info
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.data import DATASET_PATH, PROCESSED_DIR
+from utils.model import CATEGORIES, NUMERIC_FEATURES, X_TRAIN_COLUMNS
+from utils.preprocessing import load_preprocessor
+
+MATRIX_DIR = PROCESSED_DIR / "matrix"
+X_FILE = "X.npy"
+Y_FILE = "y.npy"
+SCHEMA_FILE = "schema.json"
+
+# Versão do formato/codificação: mude ao alterar a codificação das variáveis
+SCHEMA_VERSION = 2
+
+TARGET = "fraud_flag"
+CHUNKSIZE = 100_000
+
+# Colunas brutas usadas pela codificação
+RAW_COLUMNS = list(NUMERIC_FEATURES) + list(CATEGORIES)
+
+
+def columns_digest(columns):
+    return hashlib.sha256("\n".join(columns).encode()).hexdigest()
+
+
+def dataset_digest(path):
+    """SHA-256 do conteúdo do dataset de origem, lido em blocos."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def count_rows(path, chunksize=CHUNKSIZE):
+    return sum(len(bloco) for bloco in pd.read_csv(path, usecols=[0], chunksize=chunksize))
+
+
+def read_raw_chunks(path, chunksize=CHUNKSIZE, extra=(TARGET,)):
+    """Blocos do CSV só com as colunas usadas na codificação (e ``extra``, se existirem)."""
+    cabecalho = pd.read_csv(path, nrows=0).columns
+    colunas = [c for c in RAW_COLUMNS + list(extra) if c in cabecalho]
+    return pd.read_csv(path, usecols=colunas, chunksize=chunksize)
+
+
+def preprocessor_digest(preprocessor):
+    """Hash dos parâmetros ajustados do pré-processamento."""
+    import joblib
+
+    return joblib.hash(preprocessor)
+
+
+def write_matrix(chunks, rows, output_dir, preprocessor=None, target=TARGET, source=None):
+    """Codifica os blocos e grava a matriz (e os rótulos, se houver) em ``output_dir``.
+
+    ``preprocessor`` é o pré-processamento ajustado (por padrão, o do pipeline do
+    modelo). Os arquivos são preenchidos bloco a bloco diretamente no disco; o
+    esquema é gravado por último. Retorna o esquema.
+    """
+    preprocessor = load_preprocessor() if preprocessor is None else preprocessor
+    colunas = list(preprocessor.feature_names_out_)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    x_tmp = output_dir / (X_FILE + ".tmp")
+    y_tmp = output_dir / (Y_FILE + ".tmp")
+    (output_dir / SCHEMA_FILE).unlink(missing_ok=True)
+
+    X = np.lib.format.open_memmap(x_tmp, mode="w+", dtype=np.float64, shape=(rows, len(colunas)))
+    y = None
+    inicio = 0
+    for bloco in chunks:
+        fim = inicio + len(bloco)
+        X[inicio:fim] = preprocessor.transform(bloco).to_numpy()
+        if target is not None and target in bloco:
+            if y is None:
+                y = np.lib.format.open_memmap(y_tmp, mode="w+", dtype=np.int8, shape=(rows,))
+            y[inicio:fim] = bloco[target].to_numpy(dtype=np.int8)
+        inicio = fim
+    if inicio != rows:
+        raise ValueError(f"Esperadas {rows} linhas, codificadas {inicio}.")
+
+    X.flush()
+    del X
+    os.replace(x_tmp, output_dir / X_FILE)
+    if y is not None:
+        y.flush()
+        del y
+        os.replace(y_tmp, output_dir / Y_FILE)
+    else:
+        (output_dir / Y_FILE).unlink(missing_ok=True)
+
+    schema = {
+        "version": SCHEMA_VERSION,
+        "columns": colunas,
+        "columns_sha256": columns_digest(colunas),
+        "preprocessor_sha256": preprocessor_digest(preprocessor),
+        "dtype": "float64",
+        "rows": rows,
+        "target": target if (output_dir / Y_FILE).exists() else None,
+        "source": source,
+    }
+    with open(output_dir / SCHEMA_FILE, "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2, ensure_ascii=False)
+    return schema
+
+
+def load_schema(output_dir=MATRIX_DIR):
+    caminho = Path(output_dir) / SCHEMA_FILE
+    if not caminho.exists():
+        return None
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _compatible(schema, columns=X_TRAIN_COLUMNS):
+    return (schema is not None and schema["version"] == SCHEMA_VERSION
+            and schema["columns_sha256"] == columns_digest(columns))
+
+
+def build_matrix(dataset=DATASET_PATH, output_dir=MATRIX_DIR, force=False, chunksize=CHUNKSIZE):
+    """Materializa a matriz do dataset, a menos que a existente já corresponda a ele
+    e ao pré-processamento atual."""
+    preprocessor = load_preprocessor()
+    digest = dataset_digest(dataset)
+    schema = load_schema(output_dir)
+    if (not force and _compatible(schema) and (schema.get("source") or {}).get("sha256") == digest
+            and schema.get("preprocessor_sha256") == preprocessor_digest(preprocessor)):
+        return schema
+    rows = count_rows(dataset, chunksize)
+    source = {"path": Path(dataset).name, "sha256": digest}
+    return write_matrix(read_raw_chunks(dataset, chunksize), rows, output_dir, preprocessor, source=source)
+
+
+def open_matrix(output_dir=MATRIX_DIR, columns=X_TRAIN_COLUMNS):
+    """Abre a matriz mapeada em memória (somente leitura): ``(X, y, schema)``.
+
+    ``y`` é ``None`` se a matriz não tiver rótulos. Falha se o esquema for de outra
+    versão ou tiver outras colunas.
+    """
+    schema = load_schema(output_dir)
+    if schema is None:
+        raise FileNotFoundError(f"Matriz não encontrada em {output_dir}. Execute: python -m utils.feature_matrix build")
+    if not _compatible(schema, columns):
+        raise ValueError("O esquema da matriz é incompatível com a codificação atual. "
+                         "Execute: python -m utils.feature_matrix build --force")
+    X = np.load(Path(output_dir) / X_FILE, mmap_mode="r")
+    y = np.load(Path(output_dir) / Y_FILE, mmap_mode="r") if schema["target"] else None
+    return X, y, schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Matriz de variáveis codificadas mapeada em memória.")
+    parser.add_argument("comando", choices=["build", "info"])
+    parser.add_argument("--dataset", type=Path, default=DATASET_PATH)
+    parser.add_argument("--output", type=Path, default=MATRIX_DIR)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    schema = build_matrix(args.dataset, args.output, args.force) if args.comando == "build" else load_schema(args.output)
+    if schema is None:
+        print("Matriz não encontrada.")
+        return
+    tamanho = (args.output / X_FILE).stat().st_size / 1e6
+    print(f"versão {schema['version']} · {schema['rows']} linhas × {len(schema['columns'])} colunas "
+          f"· {tamanho:.1f} MB · origem {(schema.get('source') or {}).get('path')}")
+
+
+if __name__ == "__main__":
+    main()
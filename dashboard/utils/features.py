@@ -0,0 +1,109 @@
+"""Engenharia de variáveis do modelo preditivo (notebook do modelo).
+
+Etapa do pipeline (``utils.pipeline``): lê ``df_final.csv`` e grava o dataset
+usado pelo dashboard e pelo modelo, ``df_final_walmart.csv``.
+
+As variáveis de tempo são materializadas uma única vez como inteiros compactos
+(``TIME_DTYPES``), então as páginas não precisam converter datas e horários a
+cada execução: os gráficos por hora, dia da semana e mês são contagens sobre
+esses códigos (``time_counts``) e os rótulos ordenados vêm de ``time_labels``.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.cleaning import parse_hour
+
+ORDER_VALUE_BINS = [0, 50, 200, float("inf")]
+ORDER_VALUE_LABELS = ["low", "medium", "high"]
+
+# Colunas de tempo: segundos desde 00:00, hora (0-23), dia da semana ISO
+# (1 = segunda-feira), mês (1-12) e data em dias desde 1970-01-01
+TIME_DTYPES = {
+    "delivery_seconds": "int32",
+    "hour": "int8",
+    "weekday": "int8",
+    "month": "int8",
+    "date_days": "int32",
+}
+
+WEEKDAY_LABELS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MONTH_LABELS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+]
+
+# Valores possíveis e primeiro código de cada coluna de tempo com rótulo
+_CODE_RANGES = {"hour": (24, 0), "weekday": (7, 1), "month": (12, 1)}
+
+
+def time_features(date, delivery_hour):
+    """Colunas de tempo (``TIME_DTYPES``) a partir de ``date`` e ``delivery_hour`` limpos."""
+    dias = pd.to_datetime(date, format="%Y-%m-%d").to_numpy().astype("datetime64[D]")
+    date_days = dias.astype(np.int64)
+    segundos, _ = parse_hour(delivery_hour)
+    return pd.DataFrame({
+        "delivery_seconds": segundos,
+        "hour": segundos // 3600,
+        # 1970-01-01 foi uma quinta-feira (ISO 4)
+        "weekday": (date_days + 3) % 7 + 1,
+        "month": dias.astype("datetime64[M]").astype(np.int64) % 12 + 1,
+        "date_days": date_days,
+    }, index=date.index).astype(TIME_DTYPES)
+
+
+def month_keys(date_days):
+    """Mês (``"AAAA-MM"``) de cada data em dias desde 1970-01-01."""
+    meses = np.asarray(date_days).astype("datetime64[D]").astype("datetime64[M]").astype(str)
+    return pd.Series(meses, index=getattr(date_days, "index", None))
+
+
+def time_counts(codes, column, mask=None):
+    """Contagem de pedidos por código de tempo (hora, dia da semana ou mês).
+
+    Retorna um vetor com uma posição por valor possível (24 horas, 7 dias ou 12
+    meses); ``mask`` restringe a contagem às linhas selecionadas.
+    """
+    tamanho, inicio = _CODE_RANGES[column]
+    codes = np.asarray(codes, dtype=np.int64)
+    if mask is not None:
+        codes = codes[np.asarray(mask, dtype=bool)]
+    return np.bincount(codes - inicio, minlength=tamanho)[:tamanho]
+
+
+def time_labels(column):
+    """Rótulos dos códigos de uma coluna de tempo, para exibição.
+
+    Dias da semana e meses viram categóricos ordenados; horas continuam inteiras.
+    """
+    tamanho, inicio = _CODE_RANGES[column]
+    if column == "weekday":
+        return pd.Categorical(WEEKDAY_LABELS, categories=WEEKDAY_LABELS, ordered=True)
+    if column == "month":
+        return pd.Categorical(MONTH_LABELS, categories=MONTH_LABELS, ordered=True)
+    return np.arange(inicio, inicio + tamanho)
+
+
+def build_features(inputs, output):
+    df_final = pd.read_csv(inputs[0])
+    tempo = time_features(df_final["date"], df_final["delivery_hour"])
+
+    # Variável-alvo: pedido com itens faltantes
+    df_final["fraud_flag"] = (df_final["items_missing"] > 0).astype(int)
+
+    por_motorista = df_final.groupby("driver_id")
+    df_final["driver_complaint_rate"] = df_final["driver_id"].map(
+        por_motorista["fraud_flag"].sum() / por_motorista["order_id"].count()
+    )
+    df_final["is_night_delivery"] = tempo["hour"] < 6
+
+    por_cliente = df_final.groupby("customer_id")
+    df_final["customer_complaint_rate"] = df_final["customer_id"].map(
+        por_cliente["fraud_flag"].sum() / por_cliente["order_id"].count()
+    )
+    df_final["order_value_category"] = pd.cut(
+        df_final["order_amount"], bins=ORDER_VALUE_BINS, labels=ORDER_VALUE_LABELS
+    )
+    df_final["driver_recurrence"] = df_final["driver_id"].map(por_motorista["order_id"].count())
+    df_final["customer_recurrence"] = df_final["customer_id"].map(por_cliente["order_id"].count())
+    pd.concat([df_final, tempo], axis=1).to_csv(output, index=False)
@@ -0,0 +1,70 @@
+"""Filtros da barra lateral, resolvidos pelo índice de bitmaps (``utils.bitmap_index``)."""
+
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import streamlit as st
+
+from utils.bitmap_index import AND, DIMENSIONS, OR
+
+TODAS = "Todas"
+
+_COMBINACOES = {"Todos os filtros (E)": AND, "Qualquer filtro (OU)": OR}
+
+
+def _to_date(dias):
+    return np.datetime64(int(dias), "D").astype(object)
+
+
+def _to_days(data):
+    return int(np.datetime64(data, "D").astype(np.int64))
+
+
+@dataclass(frozen=True)
+class FilterSelection:
+    """Valores escolhidos em cada dimensão, intervalo de datas e combinação entre filtros."""
+
+    filtros: dict = field(default_factory=dict)
+    date_range: tuple = None
+    combine: str = AND
+
+    def values(self, dimensao):
+        return self.filtros.get(dimensao) or []
+
+    def without(self, dimensao):
+        """A mesma seleção sem o filtro de uma dimensão (ex.: para comparar regiões)."""
+        return replace(self, filtros={d: v for d, v in self.filtros.items() if d != dimensao})
+
+    def only(self, dimensao):
+        """Se os únicos filtros ativos são os de ``dimensao``."""
+        return self.date_range is None and all(not v for d, v in self.filtros.items() if d != dimensao)
+
+    def label(self, dimensao):
+        """Descrição dos valores escolhidos (``"Todas"`` sem filtro)."""
+        return ", ".join(map(str, self.values(dimensao))) or TODAS
+
+    def apply(self, index, df):
+        return index.filter(df, self.filtros, self.date_range, self.combine)
+
+
+def sidebar_filters(index, dimensions=DIMENSIONS):
+    """Exibe os filtros na barra lateral e retorna a seleção."""
+    filtros = {
+        dimensao: st.sidebar.multiselect(f"{rotulo}:", index.values(dimensao), placeholder=TODAS)
+        for dimensao, rotulo in dimensions.items()
+    }
+
+    inicio, fim = index.date_range
+    datas = st.sidebar.date_input(
+        "Período dos Pedidos:", value=(_to_date(inicio), _to_date(fim)),
+        min_value=_to_date(inicio), max_value=_to_date(fim),
+    )
+    date_range = None
+    if len(datas) == 2 and (_to_days(datas[0]), _to_days(datas[1])) != (inicio, fim):
+        date_range = (_to_days(datas[0]), _to_days(datas[1]))
+
+    combinacao = st.sidebar.radio(
+        "Combinar os filtros:", options=list(_COMBINACOES),
+        help="Dentro de uma mesma dimensão, os valores escolhidos sempre se somam (OU).",
+    )
+    return FilterSelection(filtros, date_range, _COMBINACOES[combinacao])
@@ -0,0 +1,55 @@
+"""Integração dos datasets limpos em um único dataset (notebook de integração).
+
+Etapa do pipeline (``utils.pipeline``): recebe os arquivos limpos de pedidos,
+clientes, motoristas, produtos faltantes e produtos e grava ``df_final.csv``.
+"""
+
+import ast
+
+import pandas as pd
+
+from utils.cleaning import delivery_period, parse_hour
+
+
+def integrate(inputs, output):
+    orders_path, customers_path, drivers_path, missing_path, products_path = inputs
+    orders = pd.read_csv(orders_path)
+    customer_data = pd.read_csv(customers_path)
+    drivers_data = pd.read_csv(drivers_path)
+    missing_data = pd.read_csv(missing_path)
+    products = pd.read_csv(products_path)
+
+    # Detalhes dos produtos faltantes de cada pedido
+    product_id_to_name = dict(zip(products["product_id"], products["product_name"]))
+    product_id_to_category = dict(zip(products["product_id"], products["category"]))
+    missing_data["products_missing"] = missing_data["products_missing"].map(ast.literal_eval)
+    missing_data["product_name"] = missing_data["products_missing"].map(
+        lambda ids: [product_id_to_name[p] for p in ids if p in product_id_to_name]
+    )
+    missing_data["category"] = missing_data["products_missing"].map(
+        lambda ids: [product_id_to_category[p] for p in ids if p in product_id_to_name]
+    )
+
+    df_final = orders.merge(customer_data, on="customer_id", how="left")
+    df_final = df_final.merge(drivers_data, on="driver_id", how="left")
+    df_final = df_final.merge(
+        missing_data[["order_id", "products_missing", "product_name", "category"]], on="order_id", how="left"
+    )
+    df_final = df_final.rename(columns={
+        "age_group_x": "customer_age_group",
+        "age_group_y": "driver_age_group",
+    })
+
+    # Pedidos sem produtos faltantes ficam com listas vazias; IDs viram nomes
+    for col in ["products_missing", "product_name", "category"]:
+        df_final[col] = df_final[col].map(lambda x: x if isinstance(x, list) else [])
+    df_final["products_missing"] = df_final["products_missing"].map(
+        lambda ids: [product_id_to_name.get(p, "Desconhecido") for p in ids]
+    )
+    # O notebook substituía o preço total (numérico) por lista vazia; mantido por compatibilidade
+    df_final["price"] = [[] for _ in range(len(df_final))]
+
+    segundos, _ = parse_hour(df_final["delivery_hour"])
+    df_final["delivery_period"] = delivery_period(segundos // 3600)
+    df_final["day_of_week"] = pd.to_datetime(df_final["date"]).dt.day_name()
+    df_final.to_csv(output, index=False)
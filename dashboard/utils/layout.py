@@ -0,0 +1,15 @@
+import streamlit as st
+from pathlib import Path
+
+# Logo versionado no repositório (evita buscar a imagem na internet a cada renderização)
+LOGO_PATH = Path(__file__).resolve().parent.parent / "assets" / "walmart_logo.svg"
+
+
+@st.cache_resource(show_spinner=False)
+def _carregar_logo():
+    return LOGO_PATH.read_text(encoding="utf-8")
+
+
+def exibir_logo(width=150):
+    """Exibe o banner do Walmart a partir do arquivo local."""
+    st.image(_carregar_logo(), width=width)
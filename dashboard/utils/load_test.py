@@ -0,0 +1,265 @@
+"""Teste de carga do dashboard com sessões simultâneas, sem servidor nem navegador.
+
+Cada sessão simulada usa o ``streamlit.testing`` (``AppTest``): abre páginas ao
+acaso, troca as regiões do filtro da barra lateral e, na página preditiva, envia
+previsões com valores sorteados. O ``AppTest`` substitui o ``Runtime`` global do
+Streamlit a cada execução, então cada sessão roda em um processo próprio; todas
+carregam os recursos compartilhados (como ``python -m utils.warmup``) e começam
+juntas, disputando a CPU da máquina.
+
+O dataset é sintético, do tamanho pedido: linhas reamostradas do dataset
+processado, com novos ``order_id``, gravadas em um CSV temporário e entregues ao
+dashboard pela variável ``WALMART_DATASET``.
+
+O relatório traz os percentis de latência de cada execução do script (por página
+e ação), a vazão em execuções por segundo e a memória residente (RSS) de cada
+processo de sessão: após carregar os recursos e o pico durante o teste.
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.load_test [--sessions 8] [--duration 60] [--rows 100000] [--output relatorio.json]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.data import DATASET_ENV, DATASET_PATH
+from utils.feature_matrix import count_rows
+from utils.model import CATEGORIES
+
+DASHBOARD_DIR = Path(__file__).resolve().parent.parent
+
+# Home.py e as páginas de análise e previsão
+DEFAULT_PAGES = (
+    "Home.py",
+    "pages/1-Analise_Geral.py",
+    "pages/2-Analise_Produto.py",
+    "pages/3-Analise_Motorista_Cliente.py",
+    "pages/4-Analise_Preditiva.py",
+)
+
+PREDICT_PAGE = "pages/4-Analise_Preditiva.py"
+PREDICT_BUTTON = "Realizar Previsão"
+
+# Ações registradas por execução do script
+ABRIR = "abrir"
+FILTRAR = "filtrar"
+PREVER = "prever"
+RERUN = "rerun"
+
+PERCENTILES = (50, 90, 95, 99)
+
+SCRIPT_CONTEXT_LOGGER = "streamlit.runtime.scriptrunner_utils.script_run_context"
+
+
+@dataclass
+class Sample:
+    sessao: int
+    pagina: str
+    acao: str
+    inicio: float
+    segundos: float
+    erros: int
+
+
+def synthetic_dataset(rows, output, source=DATASET_PATH, seed=0):
+    """Grava em ``output`` um dataset com ``rows`` linhas reamostradas de ``source``.
+
+    As linhas são sorteadas com reposição (mantendo as colunas derivadas
+    coerentes entre si) e recebem novos ``order_id`` únicos.
+    """
+    from utils.features import TIME_DTYPES
+
+    df = pd.read_csv(source, dtype=TIME_DTYPES)
+    rng = np.random.default_rng(seed)
+    sintetico = df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True)
+    sintetico = sintetico.sort_values("date_days", kind="stable", ignore_index=True)
+    sintetico["order_id"] = [f"sint-{i:012d}" for i in range(rows)]
+    sintetico.to_csv(output, index=False)
+    return Path(output)
+
+
+def _rss_mb():
+    """RSS atual e pico do processo (MB), de ``/proc`` quando disponível."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            campos = dict(linha.split(":", 1) for linha in f)
+        return int(campos["VmRSS"].split()[0]) / 1024, int(campos["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError):
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return pico, pico
+
+
+def _regions(dataset):
+    return sorted(pd.read_csv(dataset, usecols=["region"])["region"].dropna().unique())
+
+
+def _predict_inputs(at, rng):
+    """Preenche o formulário da página preditiva com valores sorteados."""
+    numeros = {n.label: n for n in at.number_input}
+    numeros["Valor Total do Pedido ($)"].set_value(round(rng.uniform(10, 2000), 2))
+    numeros["Itens Entregues"].set_value(rng.randint(1, 20))
+    numeros["Número de Viagens (Motorista)"].set_value(rng.randint(1, 60))
+    escolhas = {s.label: s for s in at.selectbox}
+    escolhas["Região"].set_value(rng.choice(CATEGORIES["region"]))
+    escolhas["Período da Entrega"].set_value(rng.choice(CATEGORIES["delivery_period"]))
+    escolhas["Faixa Etária do Motorista"].set_value(rng.choice(CATEGORIES["driver_age_group"]))
+    next(b for b in at.button if b.label == PREDICT_BUTTON).click()
+
+
+def _timed_run(at, sessao, pagina, acao, samples):
+    inicio = time.time()
+    at.run()
+    samples.append(Sample(sessao, pagina, acao, inicio, time.time() - inicio, len(at.exception)))
+
+
+def run_session(sessao, dataset, pages, duration, actions, delay, timeout, seed, barrier):
+    """Uma sessão, em um processo próprio.
+
+    Carrega os recursos compartilhados, espera as demais sessões em ``barrier`` e,
+    depois de ``delay`` segundos, abre páginas ao acaso executando ``actions``
+    interações em cada uma por ``duration`` segundos. Retorna as amostras e a RSS.
+    """
+    os.environ[DATASET_ENV] = str(dataset)
+
+    from streamlit.testing.v1 import AppTest
+
+    from utils.warmup import preload
+
+    # Chamadas em cache fora da thread do script avisam a cada execução ("bare mode");
+    # um filtro, porque o nível do logger é redefinido pelo Streamlit a cada execução
+    logging.getLogger(SCRIPT_CONTEXT_LOGGER).addFilter(lambda registro: registro.levelno >= logging.ERROR)
+    preload()
+    rss_carregado = _rss_mb()[0]
+    regions = _regions(dataset)
+    rng = random.Random(seed)
+    samples = []
+
+    barrier.wait()
+    time.sleep(delay)
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        pagina = rng.choice(pages)
+        at = AppTest.from_file(str(DASHBOARD_DIR / pagina), default_timeout=timeout)
+        _timed_run(at, sessao, pagina, ABRIR, samples)
+        for _ in range(actions):
+            if at.exception or time.time() >= deadline:
+                break
+            if pagina == PREDICT_PAGE:
+                _predict_inputs(at, rng)
+                acao = PREVER
+            elif at.sidebar.multiselect:
+                at.sidebar.multiselect[0].set_value(rng.sample(regions, rng.randint(0, min(3, len(regions)))))
+                acao = FILTRAR
+            else:
+                acao = RERUN
+            _timed_run(at, sessao, pagina, acao, samples)
+    return samples, rss_carregado, _rss_mb()[1]
+
+
+def latency_table(samples):
+    """Percentis de latência (ms) por página e ação, e a linha ``total``."""
+    df = pd.DataFrame([asdict(s) for s in samples])
+    df["ms"] = df["segundos"] * 1000
+    df["pagina"] = df["pagina"].map(lambda p: Path(p).stem)
+
+    def resumo(grupo):
+        linha = {"execucoes": len(grupo), "erros": int(grupo["erros"].gt(0).sum())}
+        linha.update({f"p{p}": np.percentile(grupo["ms"], p) for p in PERCENTILES})
+        linha["max"] = grupo["ms"].max()
+        return pd.Series(linha)
+
+    tabela = df.groupby(["pagina", "acao"])[["ms", "erros"]].apply(resumo)
+    tabela.loc[("total", ""), :] = resumo(df)
+    return tabela
+
+
+def run_load_test(sessions=8, duration=60.0, rows=100_000, pages=DEFAULT_PAGES, actions=3,
+                  ramp_up=2.0, timeout=300, seed=0, dataset=None):
+    """Executa o teste de carga e retorna o relatório (dicionário).
+
+    ``dataset`` usa um CSV existente em vez de gerar o sintético com ``rows`` linhas.
+    As sessões começam espaçadas ao longo de ``ramp_up`` segundos.
+    """
+    contexto = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp, contexto.Manager() as manager:
+        if dataset is None:
+            dataset = synthetic_dataset(rows, Path(tmp) / "walmart_sintetico.csv", seed=seed)
+        else:
+            rows = count_rows(dataset)
+        barrier = manager.Barrier(sessions)
+
+        with ProcessPoolExecutor(max_workers=sessions, mp_context=contexto) as pool:
+            futuros = [
+                pool.submit(run_session, sessao, dataset, list(pages), duration, actions,
+                            ramp_up * sessao / sessions, timeout, seed + sessao, barrier)
+                for sessao in range(sessions)
+            ]
+            resultados = [futuro.result() for futuro in futuros]
+
+    samples = [amostra for amostras, _, _ in resultados for amostra in amostras]
+    rss_carregado = [rss for _, rss, _ in resultados]
+    rss_pico = [pico for _, _, pico in resultados]
+    inicio = min((s.inicio for s in samples), default=0.0)
+    fim = max((s.inicio + s.segundos for s in samples), default=0.0)
+    decorrido = fim - inicio
+    return {
+        "sessoes": sessions,
+        "linhas": rows,
+        "duracao": decorrido,
+        "execucoes": len(samples),
+        "vazao": len(samples) / decorrido if decorrido else 0.0,
+        "rss_carregado_mb": float(np.mean(rss_carregado)),
+        "rss_pico_mb": max(rss_pico),
+        "rss_total_mb": sum(rss_pico),
+        "latencia": latency_table(samples) if samples else pd.DataFrame(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas do dashboard.")
+    parser.add_argument("pages", nargs="*", help=f"Páginas exercitadas (padrão: {', '.join(DEFAULT_PAGES)}).")
+    parser.add_argument("--sessions", type=int, default=8, help="Sessões simultâneas.")
+    parser.add_argument("--duration", type=float, default=60.0, help="Duração do teste (segundos).")
+    parser.add_argument("--rows", type=int, default=100_000, help="Linhas do dataset sintético.")
+    parser.add_argument("--dataset", type=Path, help="CSV já pronto (em vez do sintético).")
+    parser.add_argument("--actions", type=int, default=3, help="Interações por página aberta.")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="Intervalo para iniciar todas as sessões (segundos).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Grava o relatório em JSON.")
+    args = parser.parse_args()
+
+    from utils import load_test
+
+    # Pelo módulo importado (não ``__main__``), para os processos das sessões encontrarem run_session
+    relatorio = load_test.run_load_test(
+        args.sessions, args.duration, args.rows, tuple(args.pages) or DEFAULT_PAGES,
+        args.actions, args.ramp_up, seed=args.seed, dataset=args.dataset,
+    )
+    print(f"{relatorio['sessoes']} sessões · {relatorio['linhas']} linhas · {relatorio['duracao']:.1f}s")
+    print(f"{relatorio['execucoes']} execuções · vazão {relatorio['vazao']:.2f} execuções/s")
+    print(f"RSS por sessão: {relatorio['rss_carregado_mb']:.0f} MB com os recursos carregados "
+          f"· pico {relatorio['rss_pico_mb']:.0f} MB · soma dos picos {relatorio['rss_total_mb']:.0f} MB")
+    print("\nLatência por execução (ms):")
+    print(relatorio["latencia"].round(1).to_string())
+
+    if args.output:
+        saida = dict(relatorio, latencia=relatorio["latencia"].reset_index().to_dict(orient="records"))
+        args.output.write_text(json.dumps(saida, indent=2, ensure_ascii=False, default=float), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from utils.data import MODEL_DIR
+
+MODEL_PATH = MODEL_DIR / "gradient_boosting_model.pkl"
+
+# Variáveis numéricas usadas no treinamento (extraídas do Jupyter Notebook)
+NUMERIC_FEATURES = [
+    "order_amount", "items_delivered", "Trips",
+    "driver_complaint_rate", "customer_complaint_rate", "is_night_delivery",
+]
+
+# Categorias esperadas de cada variável categórica, na ordem das colunas codificadas
+CATEGORIES = {
+    "region": ["Altamonte Springs", "Apopka", "Clermont", "Kissimmee",
+               "Orlando", "Sanford", "Winter Park"],
+    "delivery_period": ["Manhã", "Noite", "Tarde"],
+    "day_of_week": ["Friday", "Monday", "Saturday", "Sunday",
+                    "Thursday", "Tuesday", "Wednesday"],
+    "driver_age_group": ["18-25", "26-35", "36-45", "46-55", "56-65"],
+    "customer_age_group": ["18-25", "26-35", "36-45", "46-55",
+                           "56-65", "66-75", "76-85", "85+"],
+    "order_value_category": ["low", "medium", "high"],
+}
+
+# Colunas usadas no treinamento, na ordem esperada pelo modelo
+X_TRAIN_COLUMNS = NUMERIC_FEATURES + [
+    f"{campo}_{categoria}" for campo, categorias in CATEGORIES.items() for categoria in categorias
+]
+
+# Nomes amigáveis das variáveis originais
+FEATURE_LABELS = {
+    "order_amount": "Valor do Pedido",
+    "items_delivered": "Itens Entregues",
+    "Trips": "Número de Viagens",
+    "driver_complaint_rate": "Taxa de Reclamação do Motorista",
+    "customer_complaint_rate": "Taxa de Reclamação do Cliente",
+    "is_night_delivery": "Entrega Noturna",
+    "region": "Região",
+    "delivery_period": "Período da Entrega",
+    "day_of_week": "Dia da Semana",
+    "driver_age_group": "Faixa Etária do Motorista",
+    "customer_age_group": "Faixa Etária do Cliente",
+    "order_value_category": "Categoria do Valor do Pedido",
+}
+
+
+def load_model(path=MODEL_PATH):
+    """Carrega o modelo preditivo salvo em um arquivo .pkl."""
+    if not path.exists():
+        raise FileNotFoundError(f"O arquivo do modelo não foi encontrado em: {path}")
+
+    # Importado aqui para que páginas que não usam o modelo não carreguem joblib/sklearn
+    import joblib
+
+    return joblib.load(path)
+
+
+def feature_field(column):
+    """Retorna a variável original de uma coluna codificada (ex.: ``region_Apopka``)."""
+    for campo in CATEGORIES:
+        if column.startswith(f"{campo}_"):
+            return campo
+    return column
+
+
+def predict_scores(model, df):
+    """Probabilidade de fraude para cada linha de ``df`` (dados brutos).
+
+    ``model`` é o pipeline com o pré-processamento (``utils.preprocessing``).
+    """
+    return model.predict_proba(df)[:, 1]
@@ -0,0 +1,285 @@
+"""Pipeline de construção dos datasets: bruto → limpo → integrado → variáveis.
+
+As etapas dos notebooks viram etapas nomeadas de um grafo (``STAGES``). A chave de
+cada etapa é o hash do conteúdo dos arquivos de entrada, do código da etapa (a
+função e as funções, classes e constantes do projeto que ela usa) e da versão
+do pandas. O resultado fica em um cache endereçado pela chave; se a chave não
+mudou, a etapa não é executada e o arquivo em cache é publicado. Como as entradas
+de uma etapa são os arquivos gerados pelas anteriores, uma mudança na engenharia
+de variáveis só executa ``features`` — a limpeza dos dados brutos fica no cache.
+
+Etapas independentes (a limpeza de cada arquivo bruto) rodam em paralelo em um
+pool de processos. As etapas de limpeza também publicam o relatório de linhas
+rejeitadas em ``data/rejected/``.
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.pipeline                 # constrói tudo (usa o cache)
+    python -m utils.pipeline integrate       # só até a etapa indicada
+    python -m utils.pipeline --force features
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from utils.cleaning import (
+    REJECTED_DIR, clean_customers, clean_drivers, clean_missing_data, clean_orders, clean_products
+)
+from utils.data import DATA_DIR, DATASET_PATH, PROCESSED_DIR, RAW_DIR
+from utils.features import build_features
+from utils.integration import integrate
+
+CACHE_DIR = DATA_DIR / ".cache" / "pipeline"
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+_BLOCK = 1 << 20
+_PROJECT_PACKAGE = "utils."
+
+
+@dataclass(frozen=True)
+class Stage:
+    """Etapa do pipeline.
+
+    ``inputs`` contém nomes de outras etapas ou caminhos de arquivos brutos;
+    ``func(inputs, output)`` lê os arquivos de entrada e grava ``output``. Se a
+    etapa tiver ``report``, é chamada como ``func(inputs, output, report)`` e
+    retorna o resumo das rejeições.
+    """
+
+    name: str
+    func: object
+    inputs: tuple
+    output: Path
+    report: Path = None
+
+
+STAGES = (
+    Stage("products", clean_products, (RAW_DIR / "products.csv",), PROCESSED_DIR / "products_cleaned.csv",
+          REJECTED_DIR / "products_rejeitados.csv"),
+    Stage("orders", clean_orders, (RAW_DIR / "orders.csv",), PROCESSED_DIR / "orders_cleaned.csv",
+          REJECTED_DIR / "orders_rejeitados.csv"),
+    Stage("missing_data", clean_missing_data, (RAW_DIR / "missing_data.csv",),
+          PROCESSED_DIR / "missing_data_cleaned.csv", REJECTED_DIR / "missing_data_rejeitados.csv"),
+    Stage("drivers", clean_drivers, (RAW_DIR / "drivers_data.csv",), PROCESSED_DIR / "drivers_data_cleaned.csv",
+          REJECTED_DIR / "drivers_data_rejeitados.csv"),
+    Stage("customers", clean_customers, (RAW_DIR / "customers_data.csv",),
+          PROCESSED_DIR / "customer_data_cleaned.csv", REJECTED_DIR / "customer_data_rejeitados.csv"),
+    Stage("integrate", integrate, ("orders", "customers", "drivers", "missing_data", "products"),
+          PROCESSED_DIR / "df_final.csv"),
+    Stage("features", build_features, ("integrate",), DATASET_PATH),
+)
+
+
+def file_digest(path):
+    """SHA-256 do conteúdo de um arquivo, lido em blocos."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(_BLOCK), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _code_names(code):
+    """Nomes globais usados por um código e pelas funções internas (lambdas)."""
+    nomes = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            nomes |= _code_names(const)
+    return nomes
+
+
+def _project_object(valor):
+    """Funções e classes definidas nos módulos do projeto (``utils.*``)."""
+    return ((inspect.isfunction(valor) or inspect.isclass(valor))
+            and getattr(valor, "__module__", "").startswith(_PROJECT_PACKAGE))
+
+
+def _code_of(obj):
+    """Códigos de uma função ou dos métodos de uma classe."""
+    if inspect.isfunction(obj):
+        return [obj.__code__]
+    return [v.__code__ for v in vars(obj).values() if inspect.isfunction(v)]
+
+
+def code_fingerprint(func):
+    """Hash do código da função e das funções, classes e constantes do projeto que ela usa."""
+    partes, vistos, pendentes = [], set(), [func]
+    while pendentes:
+        atual = pendentes.pop()
+        nome_completo = f"{atual.__module__}.{atual.__qualname__}"
+        if nome_completo in vistos:
+            continue
+        vistos.add(nome_completo)
+        partes.append(inspect.getsource(atual))
+        modulo = sys.modules[atual.__module__]
+        for code in _code_of(atual):
+            for nome in sorted(_code_names(code)):
+                valor = getattr(modulo, nome, None)
+                if _project_object(valor):
+                    pendentes.append(valor)
+                elif isinstance(valor, (int, float, str, list, tuple, dict)):
+                    partes.append(f"{atual.__module__}.{nome} = {valor!r}")
+    return hashlib.sha256("\n".join(sorted(set(partes))).encode()).hexdigest()
+
+
+def stage_key(stage, input_digests):
+    """Chave da etapa: entradas + código + versão do pandas."""
+    conteudo = json.dumps({
+        "stage": stage.name,
+        "code": code_fingerprint(stage.func),
+        "inputs": input_digests,
+        "pandas": pd.__version__,
+    }, sort_keys=True)
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+def artifact_path(stage, key, cache_dir=CACHE_DIR):
+    return cache_dir / f"{stage.name}-{key[:16]}{stage.output.suffix}"
+
+
+def report_path(stage, key, cache_dir=CACHE_DIR):
+    return cache_dir / f"{stage.name}-{key[:16]}.rejeitados.csv"
+
+
+def report_summary(path):
+    """Conta as linhas rejeitadas e mantidas com aviso de um relatório de rejeições."""
+    if path.stat().st_size == 0:
+        return {"rejeitadas": 0, "avisos": 0}
+    acoes = pd.read_csv(path, usecols=["acao"])["acao"]
+    return {"rejeitadas": int((acoes == "rejeitada").sum()), "avisos": int((acoes == "mantida").sum())}
+
+
+def _execute(func, inputs, artifact, report=None):
+    """Executa a etapa gravando em arquivos temporários (o cache só recebe arquivos completos).
+
+    O relatório é movido antes do artefato, que marca a etapa como concluída no cache.
+    """
+    inicio = time.perf_counter()
+    tmp = artifact.with_name(artifact.name + ".tmp")
+    if report is None:
+        func(inputs, tmp)
+    else:
+        tmp_report = report.with_name(report.name + ".tmp")
+        func(inputs, tmp, tmp_report)
+        os.replace(tmp_report, report)
+    os.replace(tmp, artifact)
+    return time.perf_counter() - inicio
+
+
+def _publish(artifact, digest, output):
+    """Copia o artefato para o caminho publicado, se o conteúdo for diferente."""
+    if output.exists() and file_digest(output) == digest:
+        return
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + ".tmp")
+    shutil.copyfile(artifact, tmp)
+    os.replace(tmp, output)
+
+
+def select_stages(targets=None, stages=STAGES):
+    """Etapas necessárias para construir ``targets`` (todas, por padrão), em ordem."""
+    por_nome = {stage.name: stage for stage in stages}
+    if not targets:
+        return list(stages)
+    desconhecidas = set(targets) - set(por_nome)
+    if desconhecidas:
+        raise ValueError(f"Etapas desconhecidas: {', '.join(sorted(desconhecidas))}")
+    necessarias, pendentes = set(), list(targets)
+    while pendentes:
+        nome = pendentes.pop()
+        if nome not in necessarias:
+            necessarias.add(nome)
+            pendentes.extend(i for i in por_nome[nome].inputs if isinstance(i, str))
+    return [stage for stage in stages if stage.name in necessarias]
+
+
+def run(targets=None, force=(), max_workers=MAX_WORKERS, stages=STAGES, cache_dir=CACHE_DIR):
+    """Executa o pipeline e retorna um relatório por etapa.
+
+    ``force`` lista etapas executadas mesmo com a chave em cache (``True`` para todas).
+    """
+    selecionadas = select_stages(targets, stages)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    artefatos = {}  # etapa -> (caminho, digest)
+    relatorio = {}
+    pendentes = list(selecionadas)
+    em_execucao = {}
+
+    def pronta(stage):
+        return all(not isinstance(i, str) or i in artefatos for i in stage.inputs)
+
+    def entradas(stage):
+        caminhos = [artefatos[i][0] if isinstance(i, str) else Path(i) for i in stage.inputs]
+        digests = [artefatos[i][1] if isinstance(i, str) else file_digest(i) for i in stage.inputs]
+        return caminhos, digests
+
+    def concluir(stage, key, status, segundos):
+        artefato = artifact_path(stage, key, cache_dir)
+        digest = file_digest(artefato)
+        artefatos[stage.name] = (artefato, digest)
+        _publish(artefato, digest, stage.output)
+        relatorio[stage.name] = {"etapa": stage.name, "status": status, "segundos": segundos, "chave": key[:16]}
+        if stage.report is not None:
+            rejeicoes = report_path(stage, key, cache_dir)
+            _publish(rejeicoes, file_digest(rejeicoes), stage.report)
+            relatorio[stage.name].update(report_summary(rejeicoes))
+
+    with ProcessPoolExecutor(max_workers=max(max_workers, 1)) as pool:
+        while pendentes or em_execucao:
+            for stage in [s for s in pendentes if pronta(s)]:
+                pendentes.remove(stage)
+                caminhos, digests = entradas(stage)
+                key = stage_key(stage, digests)
+                artefato = artifact_path(stage, key, cache_dir)
+                if artefato.exists() and not (force is True or stage.name in force):
+                    concluir(stage, key, "cache", 0.0)
+                else:
+                    rejeicoes = report_path(stage, key, cache_dir) if stage.report is not None else None
+                    future = pool.submit(_execute, stage.func, caminhos, artefato, rejeicoes)
+                    em_execucao[future] = (stage, key)
+            if not em_execucao:
+                continue
+            prontos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for future in prontos:
+                stage, key = em_execucao.pop(future)
+                concluir(stage, key, "executada", future.result())
+
+    return [relatorio[stage.name] for stage in selecionadas]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline dos datasets (bruto → limpo → integrado → variáveis).")
+    parser.add_argument("targets", nargs="*", help="Etapas a construir, com as dependências (padrão: todas).")
+    parser.add_argument("--force", nargs="*", default=None,
+                        help="Ignora o cache das etapas indicadas (sem nomes: todas).")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--list", action="store_true", help="Lista as etapas e sai.")
+    args = parser.parse_args()
+
+    if args.list:
+        for stage in STAGES:
+            entradas = ", ".join(i if isinstance(i, str) else Path(i).name for i in stage.inputs)
+            print(f"{stage.name:<14} {entradas} -> {stage.output.name}")
+        return
+
+    force = () if args.force is None else (args.force or True)
+    inicio = time.perf_counter()
+    relatorio = run(args.targets, force=force, max_workers=args.workers)
+    print(pd.DataFrame(relatorio).convert_dtypes().to_string(index=False))
+    print(f"\nTotal: {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Cache LRU de previsões na frente do modelo.
+
+As entradas do formulário de previsão são quase todas discretas e as mesmas
+combinações são enviadas repetidamente. O cache guarda a probabilidade de fraude
+por vetor codificado (saída do pré-processamento do pipeline) em forma canônica,
+limitado a ``max_entries`` entradas. O pipeline é recarregado e o cache esvaziado
+sempre que o arquivo ``.pkl`` muda (data de modificação ou tamanho).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.model import load_model
+from utils.preprocessing import PIPELINE_PATH
+
+MAX_ENTRIES = 4096
+
+
+def model_signature(path=PIPELINE_PATH):
+    """Identifica a versão do arquivo do modelo (data de modificação e tamanho)."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def canonical_keys(X):
+    """Chave de cada linha codificada: bytes dos valores em float64 canônico.
+
+    ``-0.0`` vira ``0.0`` e todos os NaN ficam com a mesma representação, então
+    vetores iguais sempre geram a mesma chave.
+    """
+    valores = np.asarray(X, dtype=np.float64) + 0.0
+    valores[np.isnan(valores)] = np.nan
+    return [linha.tobytes() for linha in np.ascontiguousarray(valores)]
+
+
+class PredictionCache:
+    """Pipeline com cache LRU de probabilidades, compartilhado entre sessões."""
+
+    def __init__(self, path=PIPELINE_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._model = None
+        self._signature = None
+        self._lock = threading.RLock()
+
+    @property
+    def model(self):
+        """Pipeline atual; recarrega (e esvazia o cache) se o arquivo mudou."""
+        if not self.path.exists():
+            raise FileNotFoundError(f"O arquivo do modelo não foi encontrado em: {self.path}")
+        assinatura = model_signature(self.path)
+        with self._lock:
+            if assinatura != self._signature:
+                self._model = load_model(self.path)
+                self._signature = assinatura
+                self._entries.clear()
+            return self._model
+
+    @property
+    def signature(self):
+        self.model
+        return self._signature
+
+    def encode(self, df):
+        """Aplica o pré-processamento do pipeline atual aos dados brutos."""
+        return self.model[:-1].transform(df)
+
+    def predict_proba(self, X):
+        """Mesmo formato do ``predict_proba`` do sklearn (colunas: não fraude, fraude).
+
+        ``X`` são dados já codificados por ``encode``. Só as linhas ausentes do
+        cache vão ao modelo, em uma única chamada. Se o pipeline for recarregado
+        durante a chamada, as probabilidades do modelo anterior não entram no cache.
+        """
+        chaves = canonical_keys(X)
+        probabilidades = np.empty(len(chaves))
+        faltantes = []
+        with self._lock:
+            # Modelo e assinatura da mesma versão das entradas consultadas
+            modelo, assinatura = self.model[-1], self._signature
+            for i, chave in enumerate(chaves):
+                valor = self._entries.get(chave)
+                if valor is None:
+                    faltantes.append(i)
+                else:
+                    self._entries.move_to_end(chave)
+                    probabilidades[i] = valor
+            self.hits += len(chaves) - len(faltantes)
+            self.misses += len(faltantes)
+
+        if faltantes:
+            linhas = X.iloc[faltantes] if hasattr(X, "iloc") else np.asarray(X)[faltantes]
+            novas = modelo.predict_proba(linhas)[:, 1]
+            probabilidades[faltantes] = novas
+            with self._lock:
+                # Recarregado durante a previsão: o cache já é do modelo novo
+                if self._signature == assinatura:
+                    for i, valor in zip(faltantes, novas):
+                        self._entries[chaves[i]] = float(valor)
+                        self._entries.move_to_end(chaves[i])
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return np.column_stack([1 - probabilidades, probabilidades])
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": self.hits / total if total else 0.0,
+                "entradas": len(self._entries),
+                "max_entradas": self.max_entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
@@ -0,0 +1,146 @@
+"""Pré-processamento ajustado, salvo junto com o modelo em um único artefato.
+
+O modelo foi treinado no notebook com os dados preenchidos (mediana nas variáveis
+numéricas, moda nas categóricas), variáveis indicadoras e ``StandardScaler`` em
+``order_amount``, ``items_delivered`` e ``Trips``. ``FeaturePreprocessor`` guarda
+esses parâmetros ajustados (medianas, modas, vocabulários, média e desvio) e
+aplica tudo em uma única transformação vetorizada.
+
+O artefato ``modelo/fraud_pipeline.pkl`` é um ``Pipeline`` do scikit-learn
+(pré-processamento + modelo): o dashboard, a pontuação em lote e qualquer serviço
+carregam esse objeto e chamam ``predict_proba`` com os dados brutos.
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.preprocessing build     # ajusta no dataset e empacota o modelo atual
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from utils.data import DATASET_PATH, MODEL_DIR
+from utils.model import CATEGORIES, MODEL_PATH, NUMERIC_FEATURES, load_model
+
+PIPELINE_PATH = MODEL_DIR / "fraud_pipeline.pkl"
+
+# Variáveis padronizadas no notebook
+SCALED_FEATURES = ("order_amount", "items_delivered", "Trips")
+
+
+class FeaturePreprocessor(BaseEstimator, TransformerMixin):
+    """Preenchimento, variáveis indicadoras e padronização em uma só transformação.
+
+    ``categories`` fixa o vocabulário de cada variável categórica (por padrão, as
+    categorias vistas no ajuste, em ordem alfabética, como no ``get_dummies``).
+    Categorias desconhecidas ficam com todas as indicadoras zeradas; valores
+    ausentes (ou colunas ausentes) recebem a mediana/moda do ajuste.
+    """
+
+    def __init__(self, numeric=tuple(NUMERIC_FEATURES), categories=None, scaled=SCALED_FEATURES,
+                 drop_first=False):
+        self.numeric = numeric
+        self.categories = categories
+        self.scaled = scaled
+        self.drop_first = drop_first
+
+    def fit(self, X, y=None):
+        valores = np.column_stack([X[col].to_numpy(dtype=float) for col in self.numeric])
+        self.medians_ = np.nanmedian(valores, axis=0)
+        valores = np.where(np.isnan(valores), self.medians_, valores)
+
+        escalar = np.isin(self.numeric, self.scaled)
+        self.mean_ = np.where(escalar, valores.mean(axis=0), 0.0)
+        desvio = valores.std(axis=0)
+        self.scale_ = np.where(escalar & (desvio > 0), desvio, 1.0)
+
+        campos = list(self.categories) if self.categories is not None else [
+            c for c in X.columns if c not in self.numeric
+        ]
+        self.categories_ = {}
+        self.modes_ = {}
+        for campo in campos:
+            coluna = X[campo]
+            self.modes_[campo] = coluna.mode().iloc[0]
+            if self.categories is not None:
+                self.categories_[campo] = list(self.categories[campo])
+            else:
+                self.categories_[campo] = sorted(coluna.dropna().unique())
+
+        inicio = 1 if self.drop_first else 0
+        self.feature_names_out_ = list(self.numeric) + [
+            f"{campo}_{categoria}"
+            for campo, categorias in self.categories_.items() for categoria in categorias[inicio:]
+        ]
+        return self
+
+    def transform(self, X):
+        n = len(X)
+        saida = np.zeros((n, len(self.feature_names_out_)))
+
+        for i, col in enumerate(self.numeric):
+            valores = X[col].to_numpy(dtype=float) if col in X else np.full(n, np.nan)
+            saida[:, i] = np.where(np.isnan(valores), self.medians_[i], valores)
+        saida[:, :len(self.numeric)] -= self.mean_
+        saida[:, :len(self.numeric)] /= self.scale_
+
+        inicio = 1 if self.drop_first else 0
+        offset = len(self.numeric)
+        linhas = np.arange(n)
+        for campo, categorias in self.categories_.items():
+            coluna = X[campo].fillna(self.modes_[campo]) if campo in X else np.full(n, self.modes_[campo])
+            codigos = pd.Categorical(coluna, categories=categorias).codes.astype(np.int64) - inicio
+            validos = codigos >= 0
+            saida[linhas[validos], offset + codigos[validos]] = 1.0
+            offset += len(categorias) - inicio
+
+        return pd.DataFrame(saida, columns=self.feature_names_out_, index=getattr(X, "index", None))
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_out_, dtype=object)
+
+
+def build_pipeline(estimator, df):
+    """Ajusta o pré-processamento em ``df`` e o empacota com o modelo já treinado."""
+    from sklearn.pipeline import Pipeline
+
+    preprocessor = FeaturePreprocessor(categories=CATEGORIES).fit(df)
+    esperadas = list(getattr(estimator, "feature_names_in_", preprocessor.feature_names_out_))
+    if esperadas != preprocessor.feature_names_out_:
+        raise ValueError("As colunas do pré-processamento não correspondem às do modelo.")
+    return Pipeline([("preprocessamento", preprocessor), ("modelo", estimator)])
+
+
+def load_pipeline(path=PIPELINE_PATH):
+    """Pipeline (pré-processamento + modelo) salvo em ``modelo/``."""
+    return load_model(path)
+
+
+def load_preprocessor(path=PIPELINE_PATH):
+    return load_pipeline(path)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Empacota o pré-processamento ajustado com o modelo.")
+    parser.add_argument("comando", choices=["build"])
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--dataset", type=Path, default=DATASET_PATH)
+    parser.add_argument("--output", type=Path, default=PIPELINE_PATH)
+    args = parser.parse_args()
+
+    import joblib
+
+    from utils import preprocessing
+    from utils.data import load_data
+
+    # Pelo módulo importado (não ``__main__``), para o artefato referenciar utils.preprocessing
+    pipeline = preprocessing.build_pipeline(load_model(args.model), load_data(args.dataset))
+    joblib.dump(pipeline, args.output)
+    print(f"Pipeline gravado em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,527 @@
+"""Consultas ad hoc (agrupamentos, medidas e filtros) sobre o dataset em Parquet.
+
+O dataset processado é convertido uma vez, em blocos, para Parquet particionado
+por região e mês (``data/processed/parquet/region=.../mes=.../``); ``_dataset.json``
+registra o hash do CSV de origem, é gravado por último e evita reconversões.
+
+Uma consulta vira uma varredura do ``pyarrow.dataset``: só as colunas usadas são
+lidas, os filtros são empurrados para a varredura (partições descartadas pelo
+caminho, grupos de linhas pelas estatísticas do Parquet) e os lotes são agregados
+um a um pelo ``pyarrow.compute``. Cada lote gera agregados parciais (somas,
+contagens, mínimos, máximos e pares distintos) que são combinados no fim, então a
+memória depende do número de grupos e não do número de linhas.
+
+Os resultados ficam em um cache LRU indexado pela impressão digital da consulta
+(agrupamentos, medidas e filtros normalizados + hash do dataset).
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.query build [--force]
+    python -m utils.query run --by region mes --measure order_amount:sum missing_rate:mean \\
+        --where "region in Winter Park,Orlando" "order_amount >= 100"
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from utils.data import DATASET_PATH, PROCESSED_DIR
+from utils.feature_matrix import CHUNKSIZE, dataset_digest
+from utils.features import TIME_DTYPES, month_keys
+
+PARQUET_DIR = PROCESSED_DIR / "parquet"
+MANIFEST_FILE = "_dataset.json"
+
+# Versão do formato: mude ao alterar as partições ou as colunas derivadas
+FORMAT_VERSION = 1
+
+PARTITIONING = ds.partitioning(pa.schema([("region", pa.string()), ("mes", pa.string())]), flavor="hive")
+
+# Dimensões de agrupamento e filtro
+DIMENSIONS = {
+    "region": "Região",
+    "mes": "Mês",
+    "delivery_period": "Período da Entrega",
+    "day_of_week": "Dia da Semana",
+    "hour": "Hora da Entrega",
+    "driver_age_group": "Faixa Etária do Motorista",
+    "customer_age_group": "Faixa Etária do Cliente",
+    "order_value_category": "Categoria do Valor do Pedido",
+    "items_range": "Faixa de Itens",
+    "is_night_delivery": "Entrega Noturna",
+}
+
+# Colunas agregáveis
+MEASURES = {
+    "order_amount": "Valor do Pedido",
+    "items_missing": "Itens Faltantes",
+    "items_delivered": "Itens Entregues",
+    "missing_rate": "Taxa de Itens Faltantes",
+    "fraud_flag": "Pedidos com Itens Faltantes",
+    "driver_complaint_rate": "Taxa de Reclamação do Motorista",
+    "customer_complaint_rate": "Taxa de Reclamação do Cliente",
+    "Trips": "Viagens do Motorista",
+    "order_id": "Pedidos",
+    "driver_id": "Motoristas",
+    "customer_id": "Clientes",
+}
+
+AGGREGATIONS = {
+    "sum": "soma",
+    "mean": "média",
+    "count": "contagem",
+    "distinct": "distintos",
+    "min": "mínimo",
+    "max": "máximo",
+}
+
+# Identificadores só admitem contagens
+ID_COLUMNS = {"order_id", "driver_id", "customer_id"}
+ID_AGGREGATIONS = ("count", "distinct")
+
+FILTER_OPS = ("==", "!=", "<", "<=", ">", ">=", "in", "not in")
+
+# Coluna de contagem de linhas incluída em todo resultado
+ROWS = "pedidos"
+
+BATCH_SIZE = 64 * 1024
+# Linhas de agregados parciais acumuladas antes de combiná-las
+COMPACT_ROWS = 200_000
+MAX_ENTRIES = 256
+
+# Chave constante quando a consulta não agrupa
+_ALL = "__all__"
+
+# Agregados parciais de cada medida e como combiná-los entre lotes
+_PARTIALS = {"sum": ("sum",), "mean": ("sum", "count"), "count": ("count",), "min": ("min",), "max": ("max",)}
+_MERGE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+def measure_name(coluna, agregacao):
+    """Nome da coluna de uma medida no resultado (ex.: ``order_amount_sum``)."""
+    return f"{coluna}_{agregacao}"
+
+
+def measure_label(coluna, agregacao):
+    return f"{MEASURES[coluna]} ({AGGREGATIONS[agregacao]})"
+
+
+def valid_measure(coluna, agregacao):
+    return agregacao in (ID_AGGREGATIONS if coluna in ID_COLUMNS else AGGREGATIONS)
+
+
+def _plain(valor):
+    """Valores de filtro como tipos nativos (numpy → Python), para o JSON e o Arrow."""
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+@dataclass(frozen=True)
+class Query:
+    """Agrupamentos, medidas ``(coluna, agregação)`` e filtros ``(coluna, operador, valor)``.
+
+    Use ``Query.create``, que valida e normaliza os campos: filtros em ordem
+    canônica e valores de ``in``/``not in`` sem repetição, de modo que consultas
+    equivalentes tenham a mesma impressão digital.
+    """
+
+    by: tuple = ()
+    measures: tuple = ()
+    where: tuple = ()
+
+    @classmethod
+    def create(cls, by=(), measures=(), where=()):
+        by = tuple(dict.fromkeys(by))
+        for dimensao in by:
+            if dimensao not in DIMENSIONS:
+                raise ValueError(f"Dimensão desconhecida: {dimensao}")
+
+        medidas = []
+        for coluna, agregacao in dict.fromkeys(tuple(m) for m in measures):
+            if coluna not in MEASURES or agregacao not in AGGREGATIONS:
+                raise ValueError(f"Medida desconhecida: {coluna}:{agregacao}")
+            if not valid_measure(coluna, agregacao):
+                raise ValueError(f"A agregação '{agregacao}' não se aplica a {coluna}.")
+            medidas.append((coluna, agregacao))
+
+        filtros = set()
+        for coluna, operador, valor in where:
+            if coluna not in DIMENSIONS and coluna not in MEASURES:
+                raise ValueError(f"Coluna de filtro desconhecida: {coluna}")
+            if operador not in FILTER_OPS:
+                raise ValueError(f"Operador desconhecido: {operador}")
+            if operador in ("in", "not in"):
+                valores = tuple(sorted({_plain(v) for v in valor}, key=repr))
+                if not valores:
+                    continue
+                filtros.add((coluna, operador, valores))
+            else:
+                filtros.add((coluna, operador, _plain(valor)))
+        return cls(by, tuple(medidas), tuple(sorted(filtros, key=repr)))
+
+    @property
+    def columns(self):
+        """Colunas projetadas na varredura (as dos filtros são lidas pelo próprio scanner)."""
+        return list(dict.fromkeys(list(self.by) + [c for c, _ in self.measures]))
+
+    def to_dict(self):
+        return {
+            "by": list(self.by),
+            "measures": [list(m) for m in self.measures],
+            "where": [[c, o, list(v) if isinstance(v, tuple) else v] for c, o, v in self.where],
+        }
+
+    def fingerprint(self, dataset_sha=""):
+        """SHA-256 da consulta normalizada e da versão do dataset."""
+        texto = json.dumps({"query": self.to_dict(), "dataset": dataset_sha}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def filter_expression(where):
+    """Expressão do ``pyarrow.dataset`` com os filtros combinados (E); ``None`` sem filtros."""
+    expressao = None
+    for coluna, operador, valor in where:
+        campo = pc.field(coluna)
+        if operador == "in":
+            termo = campo.isin(list(valor))
+        elif operador == "not in":
+            termo = ~campo.isin(list(valor))
+        elif operador == "==":
+            termo = campo == valor
+        elif operador == "!=":
+            termo = campo != valor
+        elif operador == "<":
+            termo = campo < valor
+        elif operador == "<=":
+            termo = campo <= valor
+        elif operador == ">":
+            termo = campo > valor
+        else:
+            termo = campo >= valor
+        expressao = termo if expressao is None else expressao & termo
+    return expressao
+
+
+# --- Conversão do CSV para Parquet ------------------------------------------------
+
+def load_manifest(output_dir=PARQUET_DIR):
+    caminho = Path(output_dir) / MANIFEST_FILE
+    if not caminho.exists():
+        return None
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _record_batches(dataset, chunksize):
+    """Blocos do CSV como tabelas Arrow com a coluna ``mes``, todos com o esquema do primeiro."""
+    esquema = None
+    for bloco in pd.read_csv(dataset, dtype=TIME_DTYPES, chunksize=chunksize):
+        bloco["mes"] = month_keys(bloco["date_days"])
+        if esquema is None:
+            esquema = pa.Schema.from_pandas(bloco, preserve_index=False)
+            yield esquema
+        yield from pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False).to_batches()
+
+
+def build_dataset(dataset=DATASET_PATH, output_dir=PARQUET_DIR, force=False, chunksize=CHUNKSIZE):
+    """Converte o CSV para Parquet particionado, a menos que o existente já corresponda a ele.
+
+    Os arquivos são gravados em uma pasta temporária que substitui a anterior no
+    fim. Retorna o manifesto.
+    """
+    digest = dataset_digest(dataset)
+    manifesto = load_manifest(output_dir)
+    if (not force and manifesto is not None and manifesto["version"] == FORMAT_VERSION
+            and manifesto["source"]["sha256"] == digest):
+        return manifesto
+
+    output_dir = Path(output_dir)
+    tmp = output_dir.with_name(output_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    lotes = _record_batches(dataset, chunksize)
+    esquema = next(lotes)
+    ds.write_dataset(
+        pa.RecordBatchReader.from_batches(esquema, lotes), tmp, format="parquet",
+        partitioning=PARTITIONING, basename_template="parte-{i}.parquet",
+    )
+
+    escrito = ds.dataset(tmp, format="parquet", partitioning=PARTITIONING)
+    manifesto = {
+        "version": FORMAT_VERSION,
+        "rows": escrito.count_rows(),
+        "partitions": len(list(escrito.get_fragments())),
+        "source": {"path": Path(dataset).name, "sha256": digest},
+    }
+    with open(tmp / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    tmp.rename(output_dir)
+    return manifesto
+
+
+# --- Execução ----------------------------------------------------------------------
+
+def _rename(tabela, nomes):
+    return tabela.rename_columns([nomes.get(n, n) for n in tabela.column_names])
+
+
+def _merge_partials(tabelas, keys, specs):
+    """Combina agregados parciais (mesmas chaves) em uma tabela do mesmo formato."""
+    tabela = pa.concat_tables(tabelas)
+    agregados = [("count_all", "sum")] + [(f"{c}_{k}", _MERGE[k]) for c, k in specs]
+    nomes = {f"{nome}_{func}": nome for nome, func in agregados}
+    return _rename(tabela.group_by(keys, use_threads=False).aggregate(agregados), nomes)
+
+
+def _merge_pairs(tabelas, keys, coluna):
+    """Pares (chaves, valor) distintos de vários lotes, sem repetição."""
+    return pa.concat_tables(tabelas).group_by(keys + [coluna], use_threads=False).aggregate([])
+
+
+@dataclass(frozen=True)
+class QueryResult:
+    """Resultado de uma consulta e as estatísticas da varredura que o produziu."""
+
+    data: pd.DataFrame
+    fingerprint: str
+    columns: tuple
+    fragments: int
+    total_fragments: int
+    batches: int
+    rows_scanned: int
+    seconds: float
+    from_cache: bool = False
+
+
+def run_query(query, dataset, dataset_sha="", batch_size=BATCH_SIZE, compact_rows=COMPACT_ROWS):
+    """Executa ``query`` sobre um ``pyarrow.dataset.Dataset`` lote a lote (sem cache).
+
+    O resultado tem uma linha por combinação das dimensões (valores nulos formam
+    um grupo), a coluna ``pedidos`` (linhas) e uma coluna por medida, nomeada por
+    ``measure_name``.
+    """
+    inicio = time.perf_counter()
+    keys = list(query.by) or [_ALL]
+    specs = list(dict.fromkeys(
+        (c, k) for c, a in query.measures if a != "distinct" for k in _PARTIALS[a]
+    ))
+    distintas = [c for c, a in query.measures if a == "distinct"]
+
+    expressao = filter_expression(query.where)
+    fragmentos = len(list(dataset.get_fragments(filter=expressao) if expressao is not None
+                          else dataset.get_fragments()))
+    scanner = dataset.scanner(columns=query.columns, filter=expressao, batch_size=batch_size)
+
+    parciais, pares = [], {c: [] for c in distintas}
+    acumuladas = lotes = linhas = 0
+    for lote in scanner.to_batches():
+        if lote.num_rows == 0:
+            continue
+        lotes += 1
+        linhas += lote.num_rows
+        tabela = pa.Table.from_batches([lote])
+        if not query.by:
+            tabela = tabela.append_column(_ALL, pa.array(np.zeros(lote.num_rows, dtype=np.int8)))
+        parcial = tabela.group_by(keys, use_threads=False).aggregate([([], "count_all")] + specs)
+        parciais.append(parcial)
+        acumuladas += parcial.num_rows
+        for coluna in distintas:
+            par = tabela.select(keys + [coluna]).group_by(keys + [coluna], use_threads=False).aggregate([])
+            pares[coluna].append(par)
+            acumuladas += par.num_rows
+        if acumuladas > compact_rows:
+            parciais = [_merge_partials(parciais, keys, specs)]
+            pares = {c: [_merge_pairs(t, keys, c)] for c, t in pares.items()}
+            acumuladas = parciais[0].num_rows + sum(t[0].num_rows for t in pares.values())
+
+    nomes = [measure_name(c, a) for c, a in query.measures]
+    if parciais:
+        df = _merge_partials(parciais, keys, specs).to_pandas().rename(columns={"count_all": ROWS})
+        for coluna, agregacao in query.measures:
+            nome = measure_name(coluna, agregacao)
+            if agregacao == "distinct":
+                contagem = (_merge_pairs(pares[coluna], keys, coluna)
+                            .group_by(keys, use_threads=False).aggregate([(coluna, "count")])
+                            .to_pandas().rename(columns={f"{coluna}_count": nome}))
+                df = df.merge(contagem, on=keys, how="left")
+                df[nome] = df[nome].fillna(0).astype("int64")
+            elif agregacao == "mean":
+                df[nome] = df[f"{coluna}_sum"] / df[f"{coluna}_count"].where(df[f"{coluna}_count"] > 0)
+            else:
+                df[nome] = df[f"{coluna}_{agregacao}"]
+        df = df[list(query.by) + [ROWS] + nomes]
+        if query.by:
+            df = df.sort_values(list(query.by), na_position="last", ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=list(query.by) + [ROWS] + nomes)
+
+    return QueryResult(
+        data=df,
+        fingerprint=query.fingerprint(dataset_sha),
+        columns=tuple(query.columns),
+        fragments=fragmentos,
+        total_fragments=len(list(dataset.get_fragments())),
+        batches=lotes,
+        rows_scanned=linhas,
+        seconds=time.perf_counter() - inicio,
+    )
+
+
+class QueryEngine:
+    """Dataset em Parquet com cache LRU de resultados, compartilhado entre sessões.
+
+    O dataset é reaberto (e o cache esvaziado) sempre que o manifesto muda, isto
+    é, depois de uma nova conversão.
+    """
+
+    def __init__(self, output_dir=PARQUET_DIR, max_entries=MAX_ENTRIES):
+        self.output_dir = Path(output_dir)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._dataset = None
+        self._manifest = None
+        self._lock = threading.RLock()
+
+    @property
+    def dataset(self):
+        """``pyarrow.dataset.Dataset`` atual; reaberto se o manifesto mudou."""
+        manifesto = load_manifest(self.output_dir)
+        if manifesto is None:
+            raise FileNotFoundError(f"Dataset Parquet não encontrado em {self.output_dir}. "
+                                    "Execute: python -m utils.query build")
+        with self._lock:
+            if manifesto != self._manifest:
+                self._dataset = ds.dataset(self.output_dir, format="parquet", partitioning=PARTITIONING)
+                self._manifest = manifesto
+                self._entries.clear()
+            return self._dataset
+
+    @property
+    def manifest(self):
+        self.dataset
+        return self._manifest
+
+    def run(self, query, batch_size=BATCH_SIZE):
+        """Resultado de ``query`` (``QueryResult``), do cache quando a mesma consulta já rodou."""
+        dataset = self.dataset
+        sha = self._manifest["source"]["sha256"]
+        chave = query.fingerprint(sha)
+        with self._lock:
+            resultado = self._entries.get(chave)
+            if resultado is not None:
+                self._entries.move_to_end(chave)
+                self.hits += 1
+                return replace(resultado, from_cache=True)
+            self.misses += 1
+
+        resultado = run_query(query, dataset, sha, batch_size)
+        with self._lock:
+            self._entries[chave] = resultado
+            self._entries.move_to_end(chave)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return resultado
+
+    def values(self, dimensao):
+        """Valores distintos de uma dimensão (não nulos, ordenados)."""
+        return [v for v in self.run(Query.create(by=(dimensao,))).data[dimensao] if pd.notna(v)]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": self.hits / total if total else 0.0,
+                "entradas": len(self._entries),
+                "max_entradas": self.max_entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+# --- Linha de comando --------------------------------------------------------------
+
+_WHERE = re.compile(r"^\s*(\w+)\s*(==|!=|<=|>=|<|>|not in|in)\s*(.*?)\s*$")
+
+
+def _coerce(valor, tipo):
+    """Texto da linha de comando convertido para o tipo da coluna no esquema."""
+    if pa.types.is_boolean(tipo):
+        return valor.lower() in ("true", "1", "sim")
+    if pa.types.is_integer(tipo):
+        return int(valor)
+    if pa.types.is_floating(tipo):
+        return float(valor)
+    return valor
+
+
+def parse_where(texto, schema):
+    """``"coluna op valor"`` → ``(coluna, op, valor)``; ``in``/``not in`` aceitam valores separados por vírgula."""
+    encontrado = _WHERE.match(texto)
+    if encontrado is None:
+        raise ValueError(f"Filtro inválido: {texto!r}")
+    coluna, operador, valor = encontrado.groups()
+    tipo = schema.field(coluna).type
+    if operador in ("in", "not in"):
+        return coluna, operador, [_coerce(v.strip(), tipo) for v in valor.split(",")]
+    return coluna, operador, _coerce(valor, tipo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas ad hoc sobre o dataset processado em Parquet.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    build = sub.add_parser("build", help="Converte o CSV processado para Parquet particionado por região e mês.")
+    build.add_argument("--dataset", type=Path, default=DATASET_PATH)
+    build.add_argument("--force", action="store_true")
+
+    run = sub.add_parser("run", help="Executa uma consulta e exibe o resultado.")
+    run.add_argument("--by", nargs="*", default=[], help=f"Dimensões ({', '.join(DIMENSIONS)}).")
+    run.add_argument("--measure", nargs="*", default=[], help="Medidas coluna:agregação "
+                     f"(agregações: {', '.join(AGGREGATIONS)}).")
+    run.add_argument("--where", nargs="*", default=[], help="Filtros \"coluna op valor\" "
+                     f"(operadores: {', '.join(FILTER_OPS)}).")
+    run.add_argument("--output", type=Path, help="Grava o resultado em CSV.")
+    args = parser.parse_args()
+
+    if args.comando == "build":
+        manifesto = build_dataset(args.dataset, force=args.force)
+        print(f"{manifesto['rows']} linhas · {manifesto['partitions']} partições em {PARQUET_DIR}")
+        return
+
+    engine = QueryEngine()
+    schema = engine.dataset.schema
+    query = Query.create(
+        by=args.by,
+        measures=[tuple(m.split(":", 1)) for m in args.measure],
+        where=[parse_where(w, schema) for w in args.where],
+    )
+    resultado = engine.run(query)
+    print(resultado.data.to_string(index=False))
+    print(f"\n{resultado.rows_scanned} linhas em {resultado.batches} lotes · "
+          f"{resultado.fragments} de {resultado.total_fragments} partições · "
+          f"colunas: {', '.join(resultado.columns) or '-'} · {resultado.seconds * 1000:.1f} ms")
+    if args.output:
+        resultado.data.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""Registro de modelos (campeão e desafiantes) e pontuação em lote lado a lado.
+
+O índice ``modelo/registry.json`` lista os modelos registrados. Cada versão tem
+um artefato (``.pkl``) e um esquema JSON com as colunas codificadas que o modelo
+espera, na ordem do treinamento, além do hash do artefato. O campeão é o modelo
+usado pelo dashboard (``gradient_boosting_model.pkl``); os desafiantes são
+pontuados nos mesmos dados para comparação.
+
+A pontuação em lote codifica as variáveis uma única vez, com o pré-processamento
+do pipeline do dashboard, em uma matriz em disco (``utils.feature_matrix``) e
+cada modelo roda em um processo separado lendo a mesma matriz mapeada em memória
+(sem cópia por modelo). Treino e busca de hiperparâmetros usam a matriz
+materializada do dataset, então todos os modelos compartilham a mesma codificação.
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.registry list
+    python -m utils.registry train logistic_regression adaboost
+    python -m utils.registry tune adaboost
+    python -m utils.registry score novos.csv --output scores.csv
+    python -m utils.registry score                # dataset processado (matriz materializada)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.data import DATA_DIR, DATASET_PATH, MODEL_DIR
+from utils.drift import record_batches, record_file
+from utils.feature_matrix import (
+    CHUNKSIZE, MATRIX_DIR, build_matrix, count_rows, open_matrix, read_raw_chunks, write_matrix
+)
+from utils.model import MODEL_PATH, X_TRAIN_COLUMNS, load_model
+from utils.preprocessing import load_preprocessor
+from utils.thresholds import load_thresholds, row_thresholds
+
+REGISTRY_PATH = MODEL_DIR / "registry.json"
+REGISTRY_DIR = MODEL_DIR / "registry"
+SCORES_DIR = DATA_DIR / "scores"
+
+CHAMPION = "champion"
+CHALLENGER = "challenger"
+TARGET = "fraud_flag"
+
+# Colunas brutas mantidas ao lado dos scores (a região escolhe o limiar de cada pedido)
+ID_COLUMNS = ("order_id", "region", TARGET)
+
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# Divisão treino/teste do notebook
+TEST_SIZE = 0.3
+RANDOM_STATE = 42
+
+
+def _candidates():
+    """Modelos do notebook de modelagem, com os mesmos hiperparâmetros."""
+    from sklearn.ensemble import AdaBoostClassifier, GradientBoostingClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import SVC
+
+    return {
+        "logistic_regression": lambda: LogisticRegression(
+            class_weight="balanced", max_iter=1000, random_state=RANDOM_STATE
+        ),
+        "gradient_boosting": lambda: GradientBoostingClassifier(random_state=RANDOM_STATE),
+        "svm": lambda: SVC(kernel="linear", probability=True, random_state=RANDOM_STATE),
+        "adaboost": lambda: AdaBoostClassifier(n_estimators=200, learning_rate=0.05, random_state=RANDOM_STATE),
+    }
+
+
+CANDIDATES = ("logistic_regression", "gradient_boosting", "svm", "adaboost")
+
+# Grades da busca de hiperparâmetros do notebook
+PARAM_GRIDS = {
+    "gradient_boosting": {
+        "n_estimators": [100, 200, 300],
+        "learning_rate": [0.01, 0.05, 0.1],
+        "max_depth": [3, 5, 7],
+        "subsample": [0.8, 1.0],
+    },
+    "adaboost": {
+        "n_estimators": [50, 100, 200],
+        "learning_rate": [0.01, 0.05, 0.1],
+    },
+}
+
+
+@dataclass(frozen=True)
+class ModelEntry:
+    """Versão registrada de um modelo (caminhos relativos a ``modelo/``)."""
+
+    name: str
+    version: int
+    role: str
+    artifact: str
+    schema: str
+
+    @property
+    def label(self):
+        return f"{self.name}_v{self.version}"
+
+    @property
+    def artifact_path(self):
+        return MODEL_DIR / self.artifact
+
+    @property
+    def schema_path(self):
+        return MODEL_DIR / self.schema
+
+    def load_schema(self):
+        with open(self.schema_path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def load_registry(path=REGISTRY_PATH):
+    """Modelos registrados, com o campeão primeiro."""
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        entradas = [ModelEntry(**entrada) for entrada in json.load(f)["models"]]
+    return sorted(entradas, key=lambda e: (e.role != CHAMPION, e.name, e.version))
+
+
+def save_registry(entries, path=REGISTRY_PATH):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"models": [asdict(e) for e in entries]}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def champion(entries=None):
+    entries = load_registry() if entries is None else entries
+    return next((e for e in entries if e.role == CHAMPION), None)
+
+
+def _sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _json_params(model):
+    """Hiperparâmetros serializáveis em JSON (objetos viram o nome da classe)."""
+    return {
+        chave: valor if isinstance(valor, (int, float, str, bool, type(None))) else type(valor).__name__
+        for chave, valor in model.get_params(deep=False).items()
+    }
+
+
+def register(model, name, features=None, role=CHALLENGER, artifact=None, metrics=None, path=REGISTRY_PATH):
+    """Registra uma nova versão de ``name`` e retorna a entrada.
+
+    Sem ``artifact``, o modelo é salvo em ``modelo/registry/<name>/v<versão>.pkl``;
+    com ``artifact`` (caminho existente em ``modelo/``), só o esquema é gravado.
+    Registrar um campeão rebaixa o campeão anterior a desafiante.
+    """
+    import joblib
+
+    entradas = load_registry(path)
+    versao = 1 + max((e.version for e in entradas if e.name == name), default=0)
+    pasta = REGISTRY_DIR / name
+    pasta.mkdir(parents=True, exist_ok=True)
+
+    if artifact is None:
+        artefato = pasta / f"v{versao}.pkl"
+        joblib.dump(model, artefato)
+    else:
+        artefato = Path(artifact)
+
+    features = list(features if features is not None else getattr(model, "feature_names_in_", X_TRAIN_COLUMNS))
+    esquema = {
+        "name": name,
+        "version": versao,
+        "features": features,
+        "target": TARGET,
+        "estimator": type(model).__name__,
+        "params": _json_params(model),
+        "sha256": _sha256(artefato),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "metrics": metrics or {},
+    }
+    caminho_esquema = pasta / f"v{versao}.schema.json"
+    with open(caminho_esquema, "w", encoding="utf-8") as f:
+        json.dump(esquema, f, indent=2, ensure_ascii=False)
+
+    if role == CHAMPION:
+        entradas = [ModelEntry(**{**asdict(e), "role": CHALLENGER}) if e.role == CHAMPION else e for e in entradas]
+    entrada = ModelEntry(
+        name, versao, role,
+        artefato.relative_to(MODEL_DIR).as_posix(), caminho_esquema.relative_to(MODEL_DIR).as_posix(),
+    )
+    save_registry(entradas + [entrada], path)
+    return entrada
+
+
+def _column_indices(features):
+    """Posições das colunas de um esquema na matriz codificada (``X_TRAIN_COLUMNS``)."""
+    posicoes = {coluna: i for i, coluna in enumerate(X_TRAIN_COLUMNS)}
+    desconhecidas = [c for c in features if c not in posicoes]
+    if desconhecidas:
+        raise ValueError(f"Colunas fora da codificação padrão: {', '.join(desconhecidas)}")
+    return np.array([posicoes[c] for c in features])
+
+
+def _score_model(matrix_dir, artifact_path, columns, features):
+    """Executado em um processo do pool: pontua a matriz compartilhada com um modelo."""
+    import joblib
+
+    modelo = joblib.load(artifact_path)
+    X, _, _ = open_matrix(matrix_dir)
+    if not np.array_equal(columns, np.arange(X.shape[1])):
+        X = X[:, columns]
+    if hasattr(modelo, "feature_names_in_"):
+        X = pd.DataFrame(X, columns=features)
+    return modelo.predict_proba(X)[:, 1]
+
+
+def _check_artifacts(entries):
+    esquemas = [entry.load_schema() for entry in entries]
+    for entry, esquema in zip(entries, esquemas):
+        if _sha256(entry.artifact_path) != esquema["sha256"]:
+            raise ValueError(f"O artefato de {entry.label} não corresponde ao esquema registrado.")
+    return esquemas
+
+
+def score_matrix(matrix_dir=MATRIX_DIR, entries=None, max_workers=MAX_WORKERS):
+    """Pontua uma matriz codificada (``utils.feature_matrix``) com todos os modelos registrados.
+
+    Cada modelo roda em um processo e abre a mesma matriz mapeada em memória.
+    Retorna um DataFrame com uma coluna ``score_<nome>_v<versão>`` por modelo, o
+    campeão primeiro.
+    """
+    entries = load_registry() if entries is None else entries
+    if not entries:
+        raise ValueError("Nenhum modelo registrado.")
+    esquemas = _check_artifacts(entries)
+    open_matrix(matrix_dir)
+
+    resultado = pd.DataFrame()
+    with ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(entries)))) as pool:
+        futures = {
+            entry.label: pool.submit(
+                _score_model, matrix_dir, entry.artifact_path, _column_indices(esquema["features"]),
+                esquema["features"],
+            )
+            for entry, esquema in zip(entries, esquemas)
+        }
+        for label, future in futures.items():
+            resultado[f"score_{label}"] = future.result()
+    return resultado
+
+
+def score_batch(df, entries=None, max_workers=MAX_WORKERS, monitor=True):
+    """Pontua ``df`` (dados brutos) com todos os modelos registrados.
+
+    As variáveis são codificadas uma única vez em uma matriz temporária. Além dos
+    scores, o resultado traz ``order_id`` e o rótulo, quando existirem. Com
+    ``monitor``, o lote é acumulado no monitor de drift (``utils.drift``).
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        write_matrix([df], len(df), pasta, load_preprocessor())
+        scores = score_matrix(pasta, entries, max_workers)
+    if monitor:
+        record_batches([df])
+    scores.index = df.index
+    identificacao = df[[c for c in ID_COLUMNS if c in df]]
+    return pd.concat([identificacao, scores], axis=1)
+
+
+def score_file(path, entries=None, max_workers=MAX_WORKERS, chunksize=CHUNKSIZE, monitor=True):
+    """Como ``score_batch``, mas lê e codifica o CSV em blocos (memória limitada)."""
+    with tempfile.TemporaryDirectory() as pasta:
+        write_matrix(read_raw_chunks(path, chunksize), count_rows(path, chunksize), pasta, load_preprocessor())
+        scores = score_matrix(pasta, entries, max_workers)
+    if monitor:
+        record_file(path, chunksize)
+    cabecalho = pd.read_csv(path, nrows=0).columns
+    identificacao = pd.read_csv(path, usecols=[c for c in ID_COLUMNS if c in cabecalho])
+    return pd.concat([identificacao, scores], axis=1)
+
+
+def _thresholds(regions, threshold=None):
+    """Limiar de cada pedido: ``threshold``, se informado, ou os limiares salvos por região."""
+    if threshold is not None:
+        return threshold
+    if regions is None:
+        return load_thresholds()["default"]
+    return row_thresholds(regions)
+
+
+def compare_scores(scores, threshold=None):
+    """Resumo por modelo: média, taxa sinalizada e concordância com o campeão (e métricas, se houver rótulo).
+
+    Os pedidos são sinalizados com o limiar salvo da sua região (``utils.thresholds``,
+    o mesmo da previsão); ``threshold`` aplica um limiar único a todos.
+    """
+    colunas = [c for c in scores.columns if c.startswith("score_")]
+    limiares = _thresholds(scores["region"] if "region" in scores else None, threshold)
+    referencia = scores[colunas[0]] >= limiares
+    linhas = []
+    for coluna in colunas:
+        sinalizados = scores[coluna] >= limiares
+        linha = {
+            "modelo": coluna.removeprefix("score_"),
+            "score_medio": scores[coluna].mean(),
+            "taxa_sinalizada": sinalizados.mean(),
+            "concordancia_campeao": (sinalizados == referencia).mean(),
+        }
+        if TARGET in scores:
+            from sklearn.metrics import precision_score, recall_score, roc_auc_score
+
+            y = scores[TARGET].astype(int)
+            linha["precisao"] = precision_score(y, sinalizados, zero_division=0)
+            linha["recall"] = recall_score(y, sinalizados, zero_division=0)
+            linha["auc"] = roc_auc_score(y, scores[coluna]) if y.nunique() > 1 else np.nan
+        linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+
+def _split(y):
+    """Índices de treino e teste com a divisão do notebook."""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(np.arange(len(y)), test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+
+def _matrix_regions(X):
+    """Região de cada linha codificada, recuperada das colunas one-hot ``region_*``."""
+    colunas = [c for c in X.columns if c.startswith("region_")]
+    regioes = X[colunas].idxmax(axis=1).str.removeprefix("region_")
+    return regioes.where(X[colunas].sum(axis=1) > 0).to_numpy()
+
+
+def _holdout_metrics(modelo, X, y):
+    from sklearn.metrics import precision_score, recall_score, roc_auc_score
+
+    scores = modelo.predict_proba(X)[:, 1]
+    sinalizados = scores >= _thresholds(_matrix_regions(X))
+    return {
+        "auc": roc_auc_score(y, scores),
+        "precisao": precision_score(y, sinalizados, zero_division=0),
+        "recall": recall_score(y, sinalizados, zero_division=0),
+    }
+
+
+def _training_frame(X, indices):
+    return pd.DataFrame(X[indices], columns=X_TRAIN_COLUMNS)
+
+
+def train_candidate(name, matrix_dir=MATRIX_DIR):
+    """Treina um modelo candidato com a divisão do notebook e o registra como desafiante.
+
+    Usa a matriz codificada do dataset (materializada se estiver desatualizada).
+    """
+    if matrix_dir == MATRIX_DIR:
+        build_matrix()
+    X, y, _ = open_matrix(matrix_dir)
+    treino, teste = _split(y)
+    modelo = _candidates()[name]()
+    modelo.fit(_training_frame(X, treino), y[treino])
+    return register(modelo, name, metrics=_holdout_metrics(modelo, _training_frame(X, teste), y[teste]))
+
+
+def tune_candidate(name, matrix_dir=MATRIX_DIR, n_jobs=-1):
+    """Busca em grade do notebook (precisão, 3 folds) e registra o melhor modelo como desafiante.
+
+    Os folds são índices sobre a matriz mapeada em memória: os processos da busca
+    recebem a referência ao arquivo, não uma cópia de X. O teste fica fora da busca.
+    """
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+
+    if matrix_dir == MATRIX_DIR:
+        build_matrix()
+    X, y, _ = open_matrix(matrix_dir)
+    treino, teste = _split(y)
+    folds = [(treino[a], treino[b]) for a, b in StratifiedKFold(n_splits=3).split(treino, y[treino])]
+    busca = GridSearchCV(_candidates()[name](), PARAM_GRIDS[name], scoring="precision", cv=folds,
+                         n_jobs=n_jobs, refit=False)
+    busca.fit(X, y)
+    modelo = _candidates()[name]().set_params(**busca.best_params_)
+    modelo.fit(_training_frame(X, treino), y[treino])
+    metricas = _holdout_metrics(modelo, _training_frame(X, teste), y[teste])
+    metricas["cv_precisao"] = busca.best_score_
+    return register(modelo, f"{name}_tuned", metrics=metricas)
+
+
+def register_champion(path=MODEL_PATH):
+    """Registra o modelo atual do dashboard como campeão (sem copiar o artefato)."""
+    return register(load_model(path), "gradient_boosting", role=CHAMPION, artifact=path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de modelos e pontuação campeão/desafiantes.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("list", help="Lista os modelos registrados.")
+    sub.add_parser("champion", help="Registra o modelo atual do dashboard como campeão.")
+    treino = sub.add_parser("train", help="Treina e registra modelos candidatos como desafiantes.")
+    treino.add_argument("nomes", nargs="+", choices=CANDIDATES)
+    busca = sub.add_parser("tune", help="Busca em grade e registra o melhor modelo como desafiante.")
+    busca.add_argument("nomes", nargs="+", choices=sorted(PARAM_GRIDS))
+    score = sub.add_parser("score", help="Pontua um CSV (padrão: o dataset processado) com todos os modelos.")
+    score.add_argument("csv", type=Path, nargs="?", default=None)
+    score.add_argument("--output", type=Path, default=None)
+    score.add_argument("--workers", type=int, default=MAX_WORKERS)
+    score.add_argument("--threshold", type=float, default=None,
+                       help="Limiar único (padrão: os limiares salvos por região, como na previsão).")
+    score.add_argument("--no-drift", action="store_true", help="Não acumula o lote no monitor de drift.")
+    args = parser.parse_args()
+
+    if args.comando == "list":
+        for entry in load_registry():
+            esquema = entry.load_schema()
+            print(f"{entry.label:<24} {entry.role:<10} {esquema['estimator']:<28} {entry.artifact}")
+    elif args.comando == "champion":
+        print(register_champion().label)
+    elif args.comando in ("train", "tune"):
+        treinar = train_candidate if args.comando == "train" else tune_candidate
+        for nome in args.nomes:
+            entry = treinar(nome)
+            print(entry.label, entry.load_schema()["metrics"])
+    else:
+        if args.csv is None:
+            build_matrix()
+            scores = pd.concat([
+                pd.read_csv(DATASET_PATH, usecols=list(ID_COLUMNS)),
+                score_matrix(max_workers=args.workers),
+            ], axis=1)
+        else:
+            scores = score_file(args.csv, max_workers=args.workers, monitor=not args.no_drift)
+        saida = args.output or SCORES_DIR / f"scores_{datetime.now():%Y%m%d_%H%M%S}.csv"
+        saida.parent.mkdir(parents=True, exist_ok=True)
+        scores.to_csv(saida, index=False)
+        print(compare_scores(scores, args.threshold).to_string(index=False))
+        print(f"\nScores gravados em {saida}")
+
+
+if __name__ == "__main__":
+    main()
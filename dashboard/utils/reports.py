@@ -0,0 +1,328 @@
+"""Relatórios por região e por mês (PDF e CSV), gerados em lote.
+
+Cada partição (região, mês) do dataset processado gera uma pasta em
+``data/reports/<mês>/<região>/`` com:
+
+- ``relatorio.pdf``: KPIs, ranking das regiões no mês, gráficos e os 10
+  motoristas e clientes com maior perda financeira;
+- ``kpis.csv``, ``ranking_regioes.csv``, ``top_motoristas.csv`` e
+  ``top_clientes.csv``: as mesmas tabelas, sem formatação;
+- ``ranking_regioes.png`` e ``faltantes_por_hora.png``: os gráficos estáticos.
+
+Os agregados vêm das mesmas especificações das páginas (``utils.sharding``). As
+regiões são distribuídas em um ``ProcessPoolExecutor``; cada processo desenha os
+meses da sua região com o matplotlib (sem servidor gráfico).
+
+``manifest.json`` guarda o hash de cada partição (as linhas usadas no relatório e
+o ranking do mês, que depende das outras regiões). Apenas as partições novas ou
+alteradas são geradas novamente, então o job pode rodar periodicamente (ex.: cron).
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.reports build [--workers 4] [--months 2023-01 ...] [--regions Apopka ...] [--force]
+    python -m utils.reports list
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.data import DATA_DIR
+from utils.features import month_keys
+from utils.sharding import SPECS, aggregate, loss_ranking, missing_rate, prepare_frame, region_ranking
+
+REPORTS_DIR = DATA_DIR / "reports"
+MANIFEST_FILE = "manifest.json"
+
+# Versão do conteúdo/leiaute: mude ao alterar o relatório para gerar todos de novo
+REPORT_VERSION = 1
+
+TOP_N = 10
+
+REPORT_SPECS = tuple(SPECS[nome] for nome in ("kpis", "hora", "motoristas", "clientes", "motorista_cliente"))
+
+# Colunas lidas pelos relatórios (e consideradas no hash das partições)
+REPORT_COLUMNS = sorted({
+    col for spec in REPORT_SPECS + (SPECS["regiao"],) for _, col, _ in spec.measures
+} | {"region", "hour", "driver_name", "customer_name", "items_missing", "order_amount"})
+
+
+def partition_digest(partition, ranking):
+    """Hash das linhas da partição (colunas usadas), do ranking do mês e da versão do relatório."""
+    sha = hashlib.sha256(f"v{REPORT_VERSION}".encode())
+    sha.update(pd.util.hash_pandas_object(partition[REPORT_COLUMNS], index=False).to_numpy().tobytes())
+    sha.update(pd.util.hash_pandas_object(ranking, index=False).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+def report_tables(partition, ranking):
+    """Tabelas de um relatório: KPIs, ranking, faltantes por hora e os maiores motoristas e clientes."""
+    kpis = aggregate(partition, SPECS["kpis"]).iloc[0]
+    mc = aggregate(partition, SPECS["motorista_cliente"]).iloc[0]
+    tabela_kpis = pd.DataFrame([
+        ("Total de Pedidos", kpis["total_pedidos"]),
+        ("Pedidos com Faltantes", kpis["pedidos_com_faltantes"]),
+        ("Itens Faltantes", kpis["itens_faltantes"]),
+        ("Taxa Média de Faltantes", missing_rate(kpis["itens_faltantes"], kpis["produtos_entregues"])),
+        ("Produtos Entregues", kpis["produtos_entregues"]),
+        ("Impacto Financeiro ($)", kpis["impacto_financeiro"]),
+        ("Reclamação Média dos Motoristas", mc["reclamacao_motoristas"] / mc["n_pedidos"]),
+        ("Reclamação Média dos Clientes", mc["reclamacao_clientes"] / mc["n_pedidos"]),
+        ("Total de Viagens (Motoristas)", mc["viagens_motoristas"]),
+        ("Total de Pedidos (Clientes)", mc["pedidos_clientes"]),
+    ], columns=["indicador", "valor"])
+
+    return {
+        "kpis": tabela_kpis,
+        "ranking_regioes": ranking,
+        "hora": aggregate(partition, SPECS["hora"]),
+        "top_motoristas": loss_ranking(partition, "motoristas", TOP_N),
+        "top_clientes": loss_ranking(partition, "clientes", TOP_N),
+    }
+
+
+def _ranking_figure(ranking, regiao, mes):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8.27, 4.5))
+    ax = fig.subplots()
+    cores = ["#EF553B" if r == regiao else "#636EFA" for r in ranking["region"]]
+    ax.barh(ranking["region"], ranking["impacto_financeiro"], color=cores)
+    ax.invert_yaxis()
+    ax.set_title(f"Impacto Financeiro por Região — {mes}")
+    ax.set_xlabel(r"Valor (\$)")
+    fig.tight_layout()
+    return fig
+
+
+def _hour_figure(hora, regiao, mes):
+    from matplotlib.figure import Figure
+
+    horas = hora.set_index("hour").reindex(range(24), fill_value=0)
+    fig = Figure(figsize=(8.27, 4.0))
+    ax = fig.subplots()
+    ax.bar(horas.index, horas["total_pedidos"], color="#636EFA", label="Total de Pedidos")
+    ax.bar(horas.index, horas["pedidos_com_faltantes"], color="#EF553B", label="Pedidos com Faltantes")
+    ax.set_title(f"Pedidos por Hora da Entrega — {regiao}, {mes}")
+    ax.set_xlabel("Hora")
+    ax.set_xticks(range(0, 24, 2))
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def _table_figure(titulo, secoes):
+    """Página A4 com um título e tabelas (lista de ``(subtítulo, DataFrame formatado)``)."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8.27, 11.69))
+    fig.suptitle(titulo, fontsize=14, fontweight="bold", y=0.97)
+    axes = fig.subplots(len(secoes), 1)
+    for ax, (subtitulo, tabela) in zip(np.atleast_1d(axes), secoes):
+        ax.axis("off")
+        ax.set_title(subtitulo, loc="left", fontsize=11)
+        if tabela.empty:
+            ax.text(0, 0.9, "Sem pedidos com itens faltantes.", fontsize=9)
+            continue
+        celulas = ax.table(cellText=tabela.to_numpy(), colLabels=list(tabela.columns), loc="upper center",
+                           cellLoc="left")
+        celulas.auto_set_font_size(False)
+        celulas.set_fontsize(7.5)
+        celulas.auto_set_column_width(range(tabela.shape[1]))
+    return fig
+
+
+def _format_kpis(kpis):
+    def formatar(indicador, valor):
+        if "Taxa" in indicador or "Reclamação" in indicador:
+            return f"{valor:.2%}"
+        if "($)" in indicador:
+            return f"$ {valor:,.2f}"
+        return f"{valor:,.0f}"
+
+    return pd.DataFrame({
+        "Indicador": kpis["indicador"],
+        "Valor": [formatar(i, v) for i, v in zip(kpis["indicador"], kpis["valor"])],
+    })
+
+
+def _format_ranking(ranking):
+    return pd.DataFrame({
+        "Região": ranking["region"],
+        "Total de Pedidos": ranking["total_pedidos"],
+        "Produtos Entregues": ranking["produtos_entregues"],
+        "Itens Faltantes": ranking["itens_faltantes"],
+        "Taxa Média de Faltantes (%)": ranking["taxa_media_faltantes"].map(lambda x: f"{x:.2%}"),
+        "Valores Perdidos ($)": ranking["impacto_financeiro"].map(lambda x: f"$ {x:,.2f}"),
+    })
+
+
+def _format_top(top, coluna):
+    return pd.DataFrame({
+        "Nome": top[coluna],
+        "Pedidos": top["n_pedidos"],
+        "Itens Entregues": top["itens_entregues"],
+        "Itens Faltantes": top["itens_faltantes"],
+        "Taxa Média": top["taxa_media_faltantes"].map(lambda x: f"{x:.2%}"),
+        "Perda Financeira": top["perda_financeira"].map(lambda x: f"$ {x:,.2f}"),
+    })
+
+
+def write_report(partition, ranking, regiao, mes, output_dir):
+    """Grava o PDF, os CSVs e as imagens de uma partição; retorna os arquivos gerados."""
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    pasta = Path(output_dir) / mes / regiao
+    pasta.mkdir(parents=True, exist_ok=True)
+    tabelas = report_tables(partition, ranking)
+
+    arquivos = []
+    for nome in ("kpis", "ranking_regioes", "top_motoristas", "top_clientes"):
+        tabelas[nome].to_csv(pasta / f"{nome}.csv", index=False)
+        arquivos.append(f"{nome}.csv")
+
+    figuras = {
+        "ranking_regioes.png": _ranking_figure(ranking, regiao, mes),
+        "faltantes_por_hora.png": _hour_figure(tabelas["hora"], regiao, mes),
+    }
+    for nome, figura in figuras.items():
+        figura.savefig(pasta / nome, dpi=120)
+        arquivos.append(nome)
+
+    tmp = pasta / "relatorio.pdf.tmp"
+    with PdfPages(tmp) as pdf:
+        pdf.savefig(_table_figure(f"Relatório de Entregas — {regiao}, {mes}", [
+            ("Indicadores-Chave de Desempenho (KPIs)", _format_kpis(tabelas["kpis"])),
+            ("Ranking das Regiões por Impacto Financeiro", _format_ranking(ranking)),
+        ]))
+        for figura in figuras.values():
+            pdf.savefig(figura)
+        pdf.savefig(_table_figure(f"Top {TOP_N} Motoristas e Clientes por Perda Financeira — {regiao}, {mes}", [
+            ("Motoristas", _format_top(tabelas["top_motoristas"], "driver_name")),
+            ("Clientes", _format_top(tabelas["top_clientes"], "customer_name")),
+        ]))
+        info = pdf.infodict()
+        info["Title"] = f"Relatório de Entregas — {regiao}, {mes}"
+        info["CreationDate"] = None
+    os.replace(tmp, pasta / "relatorio.pdf")
+    arquivos.append("relatorio.pdf")
+    return arquivos
+
+
+def render_region(regiao, shard, meses, rankings, output_dir):
+    """Gera os relatórios dos ``meses`` de uma região (executado em um processo do pool)."""
+    por_mes = dict(tuple(shard.groupby("mes", sort=True)))
+    return {mes: write_report(por_mes[mes], rankings[mes], regiao, mes, output_dir) for mes in meses}
+
+
+def load_manifest(output_dir=REPORTS_DIR):
+    caminho = Path(output_dir) / MANIFEST_FILE
+    if not caminho.exists():
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, output_dir=REPORTS_DIR):
+    caminho = Path(output_dir) / MANIFEST_FILE
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    tmp = caminho.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, caminho)
+
+
+def _key(mes, regiao):
+    return f"{mes}/{regiao}"
+
+
+def plan_reports(df, manifest, output_dir=REPORTS_DIR, months=None, regions=None, force=False):
+    """Partições a gerar: ``({região: [meses]}, {mês: ranking}, {chave: hash})``.
+
+    Uma partição é gerada de novo se o hash mudou ou se o PDF não existe mais.
+    """
+    rankings = {mes: region_ranking(df_mes) for mes, df_mes in df.groupby("mes", sort=True)
+                if months is None or mes in months}
+    pendentes, hashes = {}, {}
+    for (regiao, mes), partition in df.groupby(["region", "mes"], sort=True):
+        if mes not in rankings or (regions is not None and regiao not in regions):
+            continue
+        digest = partition_digest(partition, rankings[mes])
+        hashes[_key(mes, regiao)] = digest
+        existente = manifest.get(_key(mes, regiao), {})
+        pdf = Path(output_dir) / mes / regiao / "relatorio.pdf"
+        if force or existente.get("sha256") != digest or not pdf.exists():
+            pendentes.setdefault(regiao, []).append(mes)
+    return pendentes, rankings, hashes
+
+
+def build_reports(df, output_dir=REPORTS_DIR, months=None, regions=None, force=False, max_workers=None):
+    """Gera os relatórios das partições novas ou alteradas; retorna um resumo."""
+    df = prepare_frame(df).assign(mes=month_keys(df["date_days"]))
+    manifest = load_manifest(output_dir)
+    pendentes, rankings, hashes = plan_reports(df, manifest, output_dir, months, regions, force)
+
+    inicio = time.perf_counter()
+    gerados = 0
+    if pendentes:
+        colunas = sorted(set(REPORT_COLUMNS) | {"mes", "pedidos_com_faltantes", "valor_com_faltantes", "has_missing"})
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(pendentes)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futuros = {
+                regiao: pool.submit(
+                    render_region, regiao, df.loc[(df["region"] == regiao) & df["mes"].isin(meses), colunas],
+                    meses, {mes: rankings[mes] for mes in meses}, output_dir,
+                )
+                for regiao, meses in pendentes.items()
+            }
+            for regiao, futuro in futuros.items():
+                for mes, arquivos in futuro.result().items():
+                    manifest[_key(mes, regiao)] = {"sha256": hashes[_key(mes, regiao)], "arquivos": arquivos}
+                    gerados += 1
+                # Grava a cada região concluída: uma falha posterior não refaz as já geradas
+                save_manifest(manifest, output_dir)
+
+    return {
+        "particoes": len(hashes),
+        "gerados": gerados,
+        "inalterados": len(hashes) - gerados,
+        "regioes": len(pendentes),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def main():
+    from utils.data import load_data
+
+    parser = argparse.ArgumentParser(description="Relatórios por região e por mês (PDF/CSV).")
+    parser.add_argument("comando", choices=["build", "list"])
+    parser.add_argument("--output", type=Path, default=REPORTS_DIR)
+    parser.add_argument("--months", nargs="+", help="Meses (AAAA-MM) a considerar (padrão: todos).")
+    parser.add_argument("--regions", nargs="+", help="Regiões a considerar (padrão: todas).")
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: número de CPUs).")
+    parser.add_argument("--force", action="store_true", help="Gera de novo mesmo sem alterações.")
+    args = parser.parse_args()
+
+    if args.comando == "list":
+        manifest = load_manifest(args.output)
+        for chave in sorted(manifest):
+            print(f"{chave:<32} {manifest[chave]['sha256'][:12]}")
+        return
+
+    from utils import reports
+
+    # Pelo módulo importado (não ``__main__``), para os processos do pool encontrarem render_region
+    resumo = reports.build_reports(load_data(), args.output, args.months, args.regions, args.force, args.workers)
+    print(f"{resumo['gerados']} relatórios gerados ({resumo['regioes']} regiões) · "
+          f"{resumo['inalterados']} inalterados · {resumo['segundos']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
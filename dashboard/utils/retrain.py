@@ -0,0 +1,359 @@
+"""Retreino incremental do modelo a partir das partições mensais novas.
+
+Em vez de treinar do zero em todo o histórico (e repetir a busca em grade), o
+retreino parte do pipeline em uso (``modelo/fraud_pipeline.pkl``): o
+pré-processamento ajustado é mantido e o modelo recebe
+
+- ``warm_start``: mais árvores (``--trees``), ajustadas sobre as anteriores, para
+  modelos de ensemble que aceitam ``warm_start`` (o gradient boosting do
+  dashboard), até ``MAX_TREES``; acima disso, o modo ``refit``;
+- ``refit``: um modelo novo, com os mesmos hiperparâmetros.
+
+Os dados de treino são só os arquivos ainda não consumidos e uma amostra de
+reservatório de tamanho fixo do histórico (amostragem uniforme por chaves
+aleatórias: ficam as ``RESERVOIR_SIZE`` linhas de menor chave). Os dados novos
+são identificados pela chegada: por padrão, os arquivos do dataset em Parquet
+particionado por região e mês (``utils.query``, um arquivo por
+``region=.../mes=...``); ou os CSVs novos passados ao ``run``. Cada arquivo é
+identificado pelo hash do conteúdo, recalculado apenas quando o tamanho ou a data
+de modificação mudam; os arquivos já consumidos nem são abertos. Assim, a leitura
+e o custo do retreino dependem do volume novo e do tamanho do reservatório, não
+do histórico total.
+
+Uma parte estratificada dos dados novos (que o modelo atual nunca viu) fica fora
+do treino; o candidato só é promovido se a AUC nesse holdout não for menor que a
+do modelo atual (menos ``--tolerance``). Precisão e recall usam os limiares
+salvos por região (``utils.thresholds``), os mesmos da previsão. Promovido, o
+candidato substitui o pipeline do dashboard e é registrado como campeão
+(``utils.registry``). Com ou sem promoção, os arquivos passam a ser consumidos e
+entram no reservatório.
+
+O estado (hashes consumidos, assinaturas dos arquivos e o reservatório) fica em
+``data/retrain/``.
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.query build                      # dataset em Parquet (região × mês)
+    python -m utils.retrain init [--until 2023-09]   # meses já usados no treino do modelo atual
+    python -m utils.retrain run [novos.csv ...] [--mode warm_start|refit] [--dry-run]
+    python -m utils.retrain status
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.data import DATA_DIR
+from utils.feature_matrix import CHUNKSIZE, RAW_COLUMNS, dataset_digest, read_raw_chunks
+from utils.preprocessing import PIPELINE_PATH, load_pipeline
+from utils.query import PARQUET_DIR, PARTITIONING
+from utils.registry import CHAMPION, RANDOM_STATE, TARGET, TEST_SIZE, champion, register
+from utils.thresholds import row_thresholds
+
+RETRAIN_DIR = DATA_DIR / "retrain"
+STATE_FILE = "state.json"
+RESERVOIR_FILE = "reservoir.csv"
+
+# Versão do formato do estado: mude ao alterar a identificação dos dados consumidos
+STATE_VERSION = 2
+
+RESERVOIR_SIZE = 20_000
+ADD_TREES = 50
+MAX_TREES = 500
+
+WARM_START = "warm_start"
+REFIT = "refit"
+
+# Coluna com a chave aleatória de cada linha do reservatório
+_CHAVE = "_chave"
+
+
+def source_files(paths=None, parquet_dir=PARQUET_DIR):
+    """Arquivos de dados: os CSVs indicados ou os do dataset em Parquet (um por região e mês)."""
+    if paths:
+        return [Path(p) for p in paths]
+    arquivos = sorted(Path(parquet_dir).glob("region=*/mes=*/*.parquet"))
+    if not arquivos:
+        raise FileNotFoundError(f"Dataset Parquet não encontrado em {parquet_dir}. Execute: python -m utils.query build")
+    return arquivos
+
+
+def file_month(path):
+    """Mês (``AAAA-MM``) de um arquivo do dataset particionado; ``None`` para CSVs."""
+    pasta = Path(path).parent.name
+    return pasta.split("=", 1)[1] if pasta.startswith("mes=") else None
+
+
+def _parquet_frame(path, parquet_dir=PARQUET_DIR):
+    """Linhas de um arquivo do dataset particionado, com a região (do caminho) e só as colunas do modelo."""
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset([str(path)], format="parquet", partitioning=PARTITIONING,
+                         partition_base_dir=str(parquet_dir))
+    colunas = [c for c in RAW_COLUMNS + [TARGET] if c in dataset.schema.names]
+    return dataset.to_table(columns=colunas).to_pandas()
+
+
+def read_files(paths, chunksize=CHUNKSIZE, parquet_dir=PARQUET_DIR):
+    """Blocos dos arquivos com as colunas do modelo e o rótulo."""
+    for path in paths:
+        if Path(path).suffix == ".parquet":
+            yield _parquet_frame(path, parquet_dir)
+        else:
+            yield from read_raw_chunks(path, chunksize)
+
+
+def content_digest(path, parquet_dir=PARQUET_DIR):
+    """Hash do conteúdo de um arquivo.
+
+    Nos Parquet, o hash é das linhas (não dos bytes): reconverter o dataset com
+    outro tamanho de bloco muda os grupos de linhas, mas não os dados.
+    """
+    if Path(path).suffix != ".parquet":
+        return dataset_digest(path)
+    linhas = pd.util.hash_pandas_object(_parquet_frame(path, parquet_dir), index=False)
+    return hashlib.sha256(linhas.to_numpy().tobytes()).hexdigest()
+
+
+def _rng(digests):
+    """Gerador das chaves do reservatório, com semente derivada dos hashes consumidos.
+
+    Cada lote de arquivos recebe chaves diferentes (uma semente fixa repetiria as
+    mesmas chaves nas mesmas posições de todo lote); o mesmo lote, as mesmas chaves.
+    """
+    semente = hashlib.sha256("\n".join(sorted(digests)).encode()).digest()
+    return np.random.default_rng(int.from_bytes(semente[:8], "little"))
+
+
+def update_reservoir(reservoir, novos, size=RESERVOIR_SIZE, rng=None):
+    """Amostra uniforme de tamanho fixo de tudo o que já passou pelo reservatório.
+
+    Cada linha nova recebe uma chave uniforme; ficam as ``size`` menores chaves.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    novos = novos.assign(**{_CHAVE: rng.random(len(novos))})
+    juntos = pd.concat([reservoir, novos], ignore_index=True) if len(reservoir) else novos
+    return juntos.nsmallest(size, _CHAVE).reset_index(drop=True)
+
+
+class RetrainState:
+    """Hashes dos arquivos consumidos, assinaturas dos arquivos vistos e o reservatório do histórico."""
+
+    def __init__(self, directory=RETRAIN_DIR):
+        self.directory = Path(directory)
+        self.consumed = {}  # hash do conteúdo -> arquivo de origem
+        self.signatures = {}  # caminho -> {"size", "mtime_ns", "sha256"}
+        self.reservoir = pd.DataFrame()
+        state = self.directory / STATE_FILE
+        if state.exists():
+            with open(state, encoding="utf-8") as f:
+                dados = json.load(f)
+            if dados.get("version") != STATE_VERSION:
+                raise ValueError("Estado de retreino em formato antigo. Execute: python -m utils.retrain init")
+            self.consumed = dados["consumed"]
+            self.signatures = dados["signatures"]
+            self.reservoir = pd.read_csv(self.directory / RESERVOIR_FILE)
+
+    def digests(self, paths, parquet_dir=PARQUET_DIR):
+        """Hash do conteúdo de cada arquivo; só relê os arquivos com tamanho ou data de modificação diferentes."""
+        digests = {}
+        for path in paths:
+            stat = os.stat(path)
+            chave = str(Path(path).resolve())
+            anterior = self.signatures.get(chave)
+            if anterior is None or (anterior["size"], anterior["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+                anterior = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                            "sha256": content_digest(path, parquet_dir)}
+                self.signatures[chave] = anterior
+            digests[Path(path)] = anterior["sha256"]
+        # Esquece arquivos que não existem mais (ex.: após reconverter o dataset)
+        self.signatures = {c: a for c, a in self.signatures.items() if os.path.exists(c)}
+        return digests
+
+    def pending(self, digests):
+        """Arquivos com conteúdo ainda não consumido."""
+        return [path for path, digest in digests.items() if digest not in self.consumed]
+
+    def consume(self, digests, novos, size=RESERVOIR_SIZE):
+        self.reservoir = update_reservoir(self.reservoir, novos, size, _rng(digests.values()))
+        self.consumed.update({digest: str(path) for path, digest in digests.items()})
+
+    def months(self):
+        """Meses dos arquivos consumidos do dataset particionado."""
+        return sorted({m for m in map(file_month, self.consumed.values()) if m})
+
+    def save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / (RESERVOIR_FILE + ".tmp")
+        self.reservoir.to_csv(tmp, index=False)
+        os.replace(tmp, self.directory / RESERVOIR_FILE)
+        tmp = self.directory / (STATE_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": STATE_VERSION, "consumed": self.consumed,
+                       "signatures": self.signatures}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.directory / STATE_FILE)
+
+
+def _warm_start_supported(estimator):
+    params = estimator.get_params()
+    return "warm_start" in params and "n_estimators" in params
+
+
+def fit_candidate(estimator, X, y, mode=WARM_START, trees=ADD_TREES, max_trees=MAX_TREES):
+    """Candidato a partir do modelo atual; retorna ``(modelo, modo usado)``."""
+    from sklearn.base import clone
+
+    total = getattr(estimator, "n_estimators", 0) + trees
+    if mode == WARM_START and _warm_start_supported(estimator) and total <= max_trees:
+        candidato = copy.deepcopy(estimator)
+        candidato.set_params(warm_start=True, n_estimators=total)
+        candidato.fit(X, y)
+        return candidato.set_params(warm_start=False), WARM_START
+    return clone(estimator).fit(X, y), REFIT
+
+
+def _holdout_split(y):
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(np.arange(len(y)), test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y)
+
+
+def _metrics(modelo, X, y, limiares):
+    from sklearn.metrics import precision_score, recall_score, roc_auc_score
+
+    scores = modelo.predict_proba(X)[:, 1]
+    return {
+        "auc": roc_auc_score(y, scores),
+        "precisao": precision_score(y, scores >= limiares, zero_division=0),
+        "recall": recall_score(y, scores >= limiares, zero_division=0),
+    }
+
+
+def _save_pipeline(pipeline, path):
+    import joblib
+
+    tmp = Path(path).with_name(Path(path).name + ".tmp")
+    joblib.dump(pipeline, tmp)
+    os.replace(tmp, path)
+
+
+def init_state(paths=None, until=None, directory=RETRAIN_DIR, size=RESERVOIR_SIZE):
+    """Marca como consumidos os arquivos já usados no treino do modelo atual.
+
+    ``until`` limita os arquivos do dataset particionado aos meses até ele; os
+    CSVs indicados são consumidos inteiros. Recomeça o estado do zero.
+    """
+    state = RetrainState.__new__(RetrainState)
+    state.directory, state.consumed, state.signatures, state.reservoir = Path(directory), {}, {}, pd.DataFrame()
+    arquivos = [f for f in source_files(paths) if until is None or (file_month(f) or "") <= until]
+    digests = state.digests(arquivos)
+    rng = _rng(digests.values())
+    for bloco in read_files(arquivos):
+        state.reservoir = update_reservoir(state.reservoir, bloco, size, rng)
+    state.consumed.update({digest: str(path) for path, digest in digests.items()})
+    state.save()
+    return state
+
+
+def retrain(paths=None, mode=WARM_START, trees=ADD_TREES, tolerance=0.0, dry_run=False,
+            directory=RETRAIN_DIR, pipeline_path=PIPELINE_PATH, size=RESERVOIR_SIZE):
+    """Retreina com os arquivos novos (``paths`` ou o dataset particionado) e promove o
+    candidato se o holdout não piorar.
+
+    Com ``dry_run``, nada é gravado (nem o pipeline, nem o registro, nem o estado).
+    Retorna um resumo.
+    """
+    inicio = time.perf_counter()
+    state = RetrainState(directory)
+    digests = state.digests(source_files(paths))
+    pendentes = state.pending(digests)
+    if not pendentes:
+        if not dry_run:
+            state.save()
+        return {"particoes": [], "promovido": False, "motivo": "nenhum arquivo novo"}
+
+    rotulos = [str(p.relative_to(PARQUET_DIR)) if file_month(p) else str(p) for p in pendentes]
+    novos = pd.concat(list(read_files(pendentes)), ignore_index=True)
+    y_novos = novos[TARGET].to_numpy(dtype=int)
+    if len(np.unique(y_novos)) < 2:
+        return {"particoes": rotulos, "promovido": False, "motivo": "dados novos com uma única classe"}
+    treino, holdout = _holdout_split(y_novos)
+
+    pipeline = load_pipeline(pipeline_path)
+    preprocessor, atual = pipeline[0], pipeline[-1]
+    dados_treino = pd.concat([state.reservoir.drop(columns=_CHAVE, errors="ignore"),
+                              novos.iloc[treino]], ignore_index=True)
+    X_treino = preprocessor.transform(dados_treino)
+    X_holdout = preprocessor.transform(novos.iloc[holdout])
+    y_holdout = y_novos[holdout]
+    limiares = row_thresholds(novos["region"].iloc[holdout])
+
+    candidato, modo = fit_candidate(atual, X_treino, dados_treino[TARGET].to_numpy(dtype=int), mode, trees)
+    metricas_atual = _metrics(atual, X_holdout, y_holdout, limiares)
+    metricas = _metrics(candidato, X_holdout, y_holdout, limiares)
+    promovido = metricas["auc"] >= metricas_atual["auc"] - tolerance
+
+    resumo = {
+        "particoes": rotulos,
+        "modo": modo,
+        "linhas_treino": len(dados_treino),
+        "linhas_holdout": len(holdout),
+        "arvores": getattr(candidato, "n_estimators", None),
+        "auc_atual": metricas_atual["auc"],
+        "auc_candidato": metricas["auc"],
+        "promovido": bool(promovido),
+        "motivo": "AUC no holdout não piorou" if promovido else "AUC no holdout piorou",
+    }
+    if not dry_run:
+        if promovido:
+            from sklearn.pipeline import Pipeline
+
+            _save_pipeline(Pipeline([("preprocessamento", preprocessor), ("modelo", candidato)]), pipeline_path)
+            atual_registrado = champion()
+            nome = atual_registrado.name if atual_registrado else "gradient_boosting"
+            entry = register(candidato, nome, role=CHAMPION, metrics={
+                **metricas, "auc_anterior": metricas_atual["auc"], "modo": modo, "particoes": rotulos,
+            })
+            resumo["registro"] = entry.label
+        state.consume({path: digests[path] for path in pendentes}, novos, size)
+        state.save()
+    resumo["segundos"] = time.perf_counter() - inicio
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retreino incremental com partições novas e reservatório.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    init = sub.add_parser("init", help="Marca os dados usados no treino do modelo atual como consumidos.")
+    init.add_argument("csv", type=Path, nargs="*", help="CSVs (padrão: o dataset em Parquet).")
+    init.add_argument("--until", help="Último mês (AAAA-MM) do dataset em Parquet já usado no treino.")
+    run = sub.add_parser("run", help="Retreina com os arquivos novos e promove se o holdout não piorar.")
+    run.add_argument("csv", type=Path, nargs="*", help="CSVs novos (padrão: o dataset em Parquet).")
+    run.add_argument("--mode", choices=[WARM_START, REFIT], default=WARM_START)
+    run.add_argument("--trees", type=int, default=ADD_TREES, help="Árvores adicionadas no modo warm_start.")
+    run.add_argument("--tolerance", type=float, default=0.0, help="Queda máxima aceita na AUC do holdout.")
+    run.add_argument("--dry-run", action="store_true", help="Avalia o candidato sem gravar nada.")
+    sub.add_parser("status", help="Dados consumidos e tamanho do reservatório.")
+    args = parser.parse_args()
+
+    if args.comando == "init":
+        state = init_state(args.csv, args.until)
+        print(f"{len(state.consumed)} arquivos consumidos · reservatório com {len(state.reservoir)} linhas")
+    elif args.comando == "run":
+        resumo = retrain(args.csv, args.mode, args.trees, args.tolerance, args.dry_run)
+        print(json.dumps(resumo, indent=2, ensure_ascii=False))
+    else:
+        state = RetrainState()
+        print(f"Arquivos consumidos: {len(state.consumed)} · meses: {', '.join(state.months()) or '-'}")
+        print(f"Reservatório: {len(state.reservoir)} linhas (máximo {RESERVOIR_SIZE})")
+
+
+if __name__ == "__main__":
+    main()
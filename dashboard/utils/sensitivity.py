@@ -0,0 +1,78 @@
+"""Análise de sensibilidade ("e se?") de uma previsão.
+
+A partir de um pedido base, varia uma ou duas variáveis por vez e mantém as
+demais fixas. Todos os cenários (curvas de resposta e mapa de calor) formam uma
+única tabela, pré-processada de uma vez pelo pipeline do modelo e pontuada em
+uma única chamada a ``predict_proba``: mil cenários custam praticamente o mesmo
+que uma previsão isolada.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.features import ORDER_VALUE_BINS, ORDER_VALUE_LABELS
+from utils.model import CATEGORIES
+
+# Variáveis que podem ser variadas na análise
+SWEEP_NUMERIC = ("order_amount", "Trips", "items_delivered")
+SWEEP_CATEGORICAL = ("region", "delivery_period")
+
+# Coluna com o painel (curva ou mapa de calor) de cada cenário
+PAINEL = "painel"
+MAPA = "mapa"
+
+
+def numeric_values(inicio, fim, pontos, inteiro=False):
+    """Valores igualmente espaçados de uma variável numérica (sem repetições)."""
+    valores = np.linspace(inicio, fim, pontos)
+    return np.unique(np.round(valores)).astype(int) if inteiro else valores
+
+
+def categorical_values(variavel):
+    return np.asarray(CATEGORIES[variavel], dtype=object)
+
+
+def _grid(base, eixos):
+    """Produto cartesiano dos valores dos eixos; as demais variáveis vêm de ``base``."""
+    malha = np.meshgrid(*[np.asarray(v) for v in eixos.values()], indexing="ij")
+    cenarios = pd.DataFrame({nome: m.ravel() for nome, m in zip(eixos, malha)})
+    for variavel, valor in base.items():
+        if variavel not in cenarios:
+            cenarios[variavel] = valor
+    return cenarios
+
+
+def build_scenarios(base, curvas, mapa=None, derive_value_category=True):
+    """Tabela com todos os cenários da análise.
+
+    ``curvas`` mapeia cada variável variada isoladamente para os seus valores;
+    ``mapa`` (opcional) mapeia as duas variáveis do mapa de calor para os seus
+    valores. Com ``derive_value_category``, a categoria do valor do pedido
+    acompanha o valor variado (mesmas faixas da engenharia de variáveis).
+    """
+    partes = [_grid(base, {variavel: valores}).assign(**{PAINEL: variavel})
+              for variavel, valores in curvas.items()]
+    if mapa:
+        partes.append(_grid(base, mapa).assign(**{PAINEL: MAPA}))
+    cenarios = pd.concat(partes, ignore_index=True)
+
+    if derive_value_category:
+        variado = cenarios[PAINEL].eq("order_amount")
+        if mapa and "order_amount" in mapa:
+            variado |= cenarios[PAINEL].eq(MAPA)
+        categorias = pd.cut(cenarios["order_amount"], bins=ORDER_VALUE_BINS, labels=ORDER_VALUE_LABELS)
+        cenarios["order_value_category"] = cenarios["order_value_category"].where(
+            ~variado, categorias.astype(object)
+        )
+    return cenarios
+
+
+def score_scenarios(model, cenarios):
+    """Probabilidade de fraude de todos os cenários em uma única chamada ao pipeline."""
+    return cenarios.assign(probabilidade=model.predict_proba(cenarios)[:, 1])
+
+
+def heatmap_table(cenarios, linhas, colunas):
+    """Probabilidades do mapa de calor em formato de tabela (linhas × colunas)."""
+    mapa = cenarios[cenarios[PAINEL] == MAPA]
+    return mapa.pivot_table(index=linhas, columns=colunas, values="probabilidade", sort=False)
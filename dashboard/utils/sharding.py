@@ -0,0 +1,377 @@
+"""Agregações particionadas (por região ou por partição) em um pool de processos.
+
+Cada agregação das páginas é descrita por um ``AggSpec``. O dataset é dividido em
+partições, cada partição gera agregados parciais e os parciais são combinados.
+O caminho serial (``max_workers=1``) e o caminho paralelo executam exatamente as
+mesmas funções sobre as mesmas partições, na mesma ordem, então os resultados são
+idênticos bit a bit.
+
+A referência é ``aggregate``: o ``groupby`` direto, em um único processo, da
+mesma ``AggSpec``. Contagens, distintos, mínimos, máximos e somas de inteiros
+particionados são exatamente iguais a ela; somas de floats somam os parciais em
+outra ordem e podem diferir no último bit, por isso são comparadas com a
+tolerância relativa ``FLOAT_RTOL``.
+
+O caminho particionado é opcional: as páginas agregam com ``aggregate`` (o
+dataset cabe em um processo) e as mesmas ``AggSpec`` (e os rankings
+``region_ranking`` e ``loss_ranking``) são reutilizadas pelos relatórios
+(``utils.reports``) e por este benchmark, então cada KPI tem uma única definição.
+
+Benchmark de escalabilidade (a partir da pasta ``dashboard/``)::
+
+    python -m utils.sharding --scale 50 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+# Chave artificial usada quando a agregação não tem agrupamento (totais gerais)
+_ALL = "__all__"
+
+FUNCOES_SUPORTADAS = ("sum", "count", "min", "max", "nunique")
+
+# Diferença relativa admitida entre somas de floats particionadas e diretas
+FLOAT_RTOL = 1e-12
+
+
+@dataclass(frozen=True)
+class AggSpec:
+    """Descrição de uma agregação combinável.
+
+    ``measures`` segue o formato das agregações nomeadas do pandas:
+    ``(("total_pedidos", "order_id", "count"), ...)``. ``where`` é o nome de uma
+    coluna booleana usada para filtrar as linhas antes de agrupar.
+    """
+
+    name: str
+    by: tuple = ()
+    measures: tuple = ()
+    where: str = None
+
+    def __post_init__(self):
+        for _, _, func in self.measures:
+            if func not in FUNCOES_SUPORTADAS:
+                raise ValueError(f"Função de agregação não suportada: {func}")
+
+
+def prepare_frame(df):
+    """Adiciona as colunas derivadas usadas pelas agregações das páginas.
+
+    A hora da entrega (``hour``) já vem pré-calculada no dataset processado.
+    """
+    has_missing = df["items_missing"] > 0
+    return df.assign(
+        has_missing=has_missing,
+        pedidos_com_faltantes=has_missing.astype("int64"),
+        order_id_com_faltantes=df["order_id"].where(has_missing),
+        valor_com_faltantes=df["order_amount"].where(has_missing, 0.0),
+    )
+
+
+# Agregações usadas nas páginas do dashboard
+PAGE_SPECS = (
+    AggSpec(
+        name="regiao",
+        by=("region",),
+        measures=(
+            ("total_pedidos", "order_id", "nunique"),
+            ("produtos_entregues", "items_delivered", "sum"),
+            ("itens_faltantes", "items_missing", "sum"),
+            ("pedidos_com_faltantes", "pedidos_com_faltantes", "sum"),
+            ("receita_total", "order_amount", "sum"),
+            ("impacto_financeiro", "valor_com_faltantes", "sum"),
+        ),
+    ),
+    AggSpec(
+        name="kpis",
+        measures=(
+            ("total_pedidos", "order_id", "nunique"),
+            ("pedidos_com_faltantes", "order_id_com_faltantes", "nunique"),
+            ("produtos_entregues", "items_delivered", "sum"),
+            ("itens_faltantes", "items_missing", "sum"),
+            ("impacto_financeiro", "valor_com_faltantes", "sum"),
+        ),
+    ),
+    AggSpec(
+        name="hora",
+        by=("hour",),
+        measures=(
+            ("total_pedidos", "order_id", "count"),
+            ("pedidos_com_faltantes", "pedidos_com_faltantes", "sum"),
+        ),
+    ),
+    AggSpec(
+        name="dia_da_semana",
+        by=("day_of_week",),
+        measures=(
+            ("total_pedidos", "order_id", "count"),
+            ("pedidos_com_faltantes", "pedidos_com_faltantes", "sum"),
+        ),
+    ),
+    AggSpec(
+        name="mes",
+        by=("month_name",),
+        measures=(
+            ("total_pedidos", "order_id", "count"),
+            ("pedidos_com_faltantes", "pedidos_com_faltantes", "sum"),
+        ),
+    ),
+    AggSpec(
+        name="idade_motorista",
+        by=("age",),
+        measures=(
+            ("total_pedidos", "order_id", "count"),
+            ("pedidos_com_faltantes", "pedidos_com_faltantes", "sum"),
+        ),
+    ),
+    AggSpec(
+        name="idade_cliente",
+        by=("customer_age",),
+        measures=(
+            ("total_pedidos", "order_id", "count"),
+            ("pedidos_com_faltantes", "pedidos_com_faltantes", "sum"),
+        ),
+    ),
+    # Motorista e cliente com mais pedidos (KPIs da análise geral)
+    AggSpec(
+        name="pedidos_motorista",
+        by=("driver_name",),
+        measures=(
+            ("total_pedidos", "order_id", "count"),
+            ("itens_faltantes", "items_missing", "sum"),
+        ),
+    ),
+    AggSpec(
+        name="pedidos_cliente",
+        by=("customer_name",),
+        measures=(
+            ("total_pedidos", "order_id", "count"),
+            ("itens_faltantes", "items_missing", "sum"),
+        ),
+    ),
+    # KPIs da página de motoristas e clientes (médias a partir de somas e contagens)
+    AggSpec(
+        name="motorista_cliente",
+        measures=(
+            ("n_pedidos", "order_id", "count"),
+            ("reclamacao_motoristas", "driver_complaint_rate", "sum"),
+            ("reclamacao_clientes", "customer_complaint_rate", "sum"),
+            ("viagens_motoristas", "driver_recurrence", "sum"),
+            ("pedidos_clientes", "customer_recurrence", "sum"),
+        ),
+    ),
+    AggSpec(
+        name="motoristas",
+        by=("driver_name",),
+        where="has_missing",
+        measures=(
+            ("n_pedidos", "order_id", "count"),
+            ("pedidos_com_faltantes", "order_id", "nunique"),
+            ("itens_entregues", "items_delivered", "sum"),
+            ("itens_faltantes", "items_missing", "sum"),
+            ("perda_financeira", "order_amount", "sum"),
+        ),
+    ),
+    AggSpec(
+        name="clientes",
+        by=("customer_name",),
+        where="has_missing",
+        measures=(
+            ("n_pedidos", "order_id", "count"),
+            ("pedidos_com_faltantes", "order_id", "nunique"),
+            ("itens_entregues", "items_delivered", "sum"),
+            ("itens_faltantes", "items_missing", "sum"),
+            ("perda_financeira", "order_amount", "sum"),
+        ),
+    ),
+)
+
+
+SPECS = {spec.name: spec for spec in PAGE_SPECS}
+
+
+def aggregate(df, spec):
+    """Agregação direta (``groupby`` em um único processo) descrita por ``spec``."""
+    if spec.where is not None:
+        df = df[df[spec.where]]
+    keys = list(spec.by)
+    if not keys:
+        df = df.assign(**{_ALL: 0})
+        keys = [_ALL]
+
+    grouped = df.groupby(keys, sort=True)
+    result = grouped.agg(**{out: (col, func) for out, col, func in spec.measures}).reset_index()
+    if not spec.by:
+        result = result.drop(columns=_ALL)
+    return result
+
+
+def missing_rate(itens_faltantes, itens_entregues):
+    """Taxa de itens faltantes: faltantes / (entregues + faltantes), 0 sem itens."""
+    itens = itens_entregues + itens_faltantes
+    if np.ndim(itens) == 0:
+        return itens_faltantes / itens if itens else 0.0
+    return itens_faltantes / itens.where(itens > 0, 1)
+
+
+def region_ranking(df):
+    """Agregados por região ordenados pelo impacto financeiro (valor dos pedidos com faltantes)."""
+    ranking = aggregate(df, SPECS["regiao"])
+    ranking["taxa_media_faltantes"] = missing_rate(ranking["itens_faltantes"], ranking["produtos_entregues"])
+    return ranking.sort_values("impacto_financeiro", ascending=False, ignore_index=True)
+
+
+def loss_ranking(df, name, n=None):
+    """Motoristas (``name="motoristas"``) ou clientes (``"clientes"``) com itens faltantes,
+    ordenados pela perda financeira; ``n`` limita aos primeiros."""
+    ranking = aggregate(df, SPECS[name])
+    ranking["taxa_media_faltantes"] = missing_rate(ranking["itens_faltantes"], ranking["itens_entregues"])
+    ranking = ranking.sort_values("perda_financeira", ascending=False, ignore_index=True)
+    return ranking if n is None else ranking.head(n)
+
+
+def assert_matches(result, reference, rtol=FLOAT_RTOL):
+    """Compara um resultado particionado com ``aggregate``: exato, exceto somas de floats (``rtol``)."""
+    pd.testing.assert_index_equal(result.columns, reference.columns)
+    floats = [c for c in reference.columns if pd.api.types.is_float_dtype(reference[c])]
+    exatas = [c for c in reference.columns if c not in floats]
+    pd.testing.assert_frame_equal(result[exatas], reference[exatas], check_exact=True)
+    if floats:
+        pd.testing.assert_frame_equal(result[floats], reference[floats], check_exact=False, rtol=rtol, atol=0)
+
+
+def split_shards(df, shard_by="region"):
+    """Divide o DataFrame em partições.
+
+    ``shard_by`` pode ser o nome de uma coluna (uma partição por valor, em ordem
+    alfabética) ou um inteiro (número de blocos contíguos de linhas). A ordem das
+    linhas é preservada dentro de cada partição.
+    """
+    if isinstance(shard_by, int):
+        limites = np.linspace(0, len(df), shard_by + 1).astype(int)
+        return [df.iloc[inicio:fim] for inicio, fim in zip(limites[:-1], limites[1:])]
+    return [shard for _, shard in df.groupby(shard_by, sort=True)]
+
+
+def partial_aggregate(shard, spec):
+    """Calcula os agregados parciais de uma partição."""
+    if spec.where is not None:
+        shard = shard[shard[spec.where]]
+    keys = list(spec.by)
+    if not keys:
+        shard = shard.assign(**{_ALL: 0})
+        keys = [_ALL]
+
+    grouped = shard.groupby(keys, sort=True)
+    partial = {}
+    for out, col, func in spec.measures:
+        if func == "nunique":
+            # Guarda os valores distintos para que a união entre partições seja exata
+            partial[out] = grouped[col].unique()
+        else:
+            partial[out] = grouped[col].agg(func)
+    return pd.DataFrame(partial, index=grouped.size().index)
+
+
+def _count_distinct(arrays):
+    return pd.Series(np.concatenate(arrays.to_list())).nunique()
+
+
+def merge_partials(partials, spec):
+    """Combina os agregados parciais de todas as partições."""
+    combined = pd.concat(partials)
+    grouped = combined.groupby(level=list(range(combined.index.nlevels)), sort=True)
+
+    merged = {}
+    for out, _, func in spec.measures:
+        if func in ("sum", "count"):
+            merged[out] = grouped[out].sum()
+        elif func in ("min", "max"):
+            merged[out] = grouped[out].agg(func)
+        else:
+            merged[out] = grouped[out].agg(_count_distinct).astype("int64")
+
+    result = pd.DataFrame(merged, index=grouped.size().index).reset_index()
+    if not spec.by:
+        result = result.drop(columns=_ALL)
+    return result
+
+
+def _aggregate_shard(shard, specs):
+    return {spec.name: partial_aggregate(shard, spec) for spec in specs}
+
+
+def sharded_aggregate(df, specs=PAGE_SPECS, shard_by="region", max_workers=1):
+    """Executa as agregações por partição e retorna ``{spec.name: DataFrame}``.
+
+    Com ``max_workers=1`` tudo roda no processo atual; acima disso as partições
+    são distribuídas em um ``ProcessPoolExecutor``.
+    """
+    shards = split_shards(df, shard_by)
+    if max_workers == 1 or len(shards) <= 1:
+        partials = [_aggregate_shard(shard, specs) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            partials = list(pool.map(_aggregate_shard, shards, repeat(specs)))
+
+    return {
+        spec.name: merge_partials([partial[spec.name] for partial in partials], spec)
+        for spec in specs
+    }
+
+
+def benchmark(df, workers, shard_by="region", repeats=3):
+    """Mede o tempo das agregações para cada número de processos.
+
+    Verifica que o caminho particionado serial corresponde à agregação direta
+    (``assert_matches``) e que cada execução paralela é idêntica à serial.
+    """
+    referencia = sharded_aggregate(df, shard_by=shard_by, max_workers=1)
+    for spec in PAGE_SPECS:
+        assert_matches(referencia[spec.name], aggregate(df, spec))
+    linhas = []
+    for n in workers:
+        tempos = []
+        for _ in range(repeats):
+            inicio = time.perf_counter()
+            resultado = sharded_aggregate(df, shard_by=shard_by, max_workers=n)
+            tempos.append(time.perf_counter() - inicio)
+        for nome, tabela in referencia.items():
+            pd.testing.assert_frame_equal(resultado[nome], tabela, check_exact=True)
+        linhas.append({"workers": n, "segundos": min(tempos)})
+
+    tabela = pd.DataFrame(linhas)
+    tabela["speedup"] = tabela["segundos"].iloc[0] / tabela["segundos"]
+    return tabela
+
+
+def main():
+    from utils.data import load_data
+
+    parser = argparse.ArgumentParser(description="Benchmark das agregações particionadas.")
+    parser.add_argument("--scale", type=int, default=1, help="Replica o dataset N vezes.")
+    parser.add_argument("--workers", type=int, nargs="+", default=None)
+    parser.add_argument("--shards", type=int, default=None,
+                        help="Particiona em N blocos de linhas em vez de por região.")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    workers = args.workers or list(range(1, (os.cpu_count() or 1) + 1))
+    df = prepare_frame(load_data())
+    if args.scale > 1:
+        df = pd.concat([df] * args.scale, ignore_index=True)
+
+    shard_by = args.shards if args.shards else "region"
+    print(f"Linhas: {len(df):,} | Partições: {shard_by}")
+    print(benchmark(df, workers, shard_by=shard_by, repeats=args.repeats).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
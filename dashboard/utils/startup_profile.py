@@ -0,0 +1,90 @@
+"""Perfil de inicialização das páginas do dashboard.
+
+Cada página é executada em um processo novo com ``python -X importtime`` através
+do ``streamlit.testing`` (sem servidor). O relatório mostra o tempo total de
+importação, o tempo da primeira renderização e os pacotes mais caros.
+
+Uso (a partir da pasta ``dashboard/``)::
+
+    python -m utils.startup_profile [--top 10] [Home.py pages/1-Analise_Geral.py ...]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+DASHBOARD_DIR = Path(__file__).resolve().parent.parent
+
+_RENDER = """
+import json, time
+from streamlit.testing.v1 import AppTest
+inicio = time.perf_counter()
+at = AppTest.from_file({page!r}, default_timeout=300).run()
+print(json.dumps({{"render": time.perf_counter() - inicio, "erros": len(at.exception)}}))
+"""
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Importados apenas pelo executor de testes, não pela página
+_HARNESS = ("streamlit.testing",)
+
+
+def default_pages():
+    return [DASHBOARD_DIR / "Home.py", *sorted((DASHBOARD_DIR / "pages").glob("*.py"))]
+
+
+def parse_importtime(stderr):
+    """Soma o tempo cumulativo (em segundos) de cada pacote de primeiro nível."""
+    pacotes = defaultdict(float)
+    for linha in stderr.splitlines():
+        match = _IMPORTTIME.match(linha)
+        if not match:
+            continue
+        _, cumulativo, recuo, modulo = match.groups()
+        # Apenas importações de primeiro nível (sem recuo) para não contar em dobro
+        if recuo == " " and not modulo.startswith(_HARNESS):
+            pacotes[modulo.split(".")[0]] += int(cumulativo) / 1e6
+    return dict(pacotes)
+
+
+def profile_page(page):
+    """Executa uma página em um processo novo e retorna o perfil de inicialização."""
+    env = dict(os.environ, PYTHONPATH=str(DASHBOARD_DIR))
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _RENDER.format(page=str(page))],
+        cwd=DASHBOARD_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    resultado = json.loads(processo.stdout.strip().splitlines()[-1])
+    pacotes = parse_importtime(processo.stderr)
+    return {
+        "pagina": Path(page).name,
+        "importacao": sum(pacotes.values()),
+        "renderizacao": resultado["render"],
+        "erros": resultado["erros"],
+        "pacotes": pacotes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de inicialização das páginas.")
+    parser.add_argument("pages", nargs="*", help="Páginas a perfilar (padrão: todas).")
+    parser.add_argument("--top", type=int, default=8, help="Pacotes mais caros exibidos por página.")
+    args = parser.parse_args()
+
+    pages = [Path(p).resolve() for p in args.pages] or default_pages()
+    for page in pages:
+        perfil = profile_page(page)
+        print(f"\n{perfil['pagina']}: importação {perfil['importacao']:.2f}s | "
+              f"primeira renderização {perfil['renderizacao']:.2f}s | erros {perfil['erros']}")
+        mais_caros = sorted(perfil["pacotes"].items(), key=lambda item: -item[1])[:args.top]
+        for pacote, segundos in mais_caros:
+            print(f"    {pacote:<24} {segundos:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Execução concorrente das seções independentes de uma página.
+
+As agregações de cada seção são declaradas como tarefas (funções sem argumentos)
+e executadas em um pool de threads: os kernels de ``groupby`` do pandas/NumPy
+liberam o GIL, então o tempo total tende ao da seção mais lenta. A renderização
+(chamadas ``st.*``) continua na thread da página, na ordem original.
+
+As tarefas não devem chamar ``st.*`` nem alterar os DataFrames compartilhados.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def run_tasks(tasks, max_workers=MAX_WORKERS, timings=None):
+    """Executa ``{nome: função}`` em paralelo e retorna ``{nome: resultado}``.
+
+    Os resultados seguem a ordem de declaração. Se uma tarefa falhar, a exceção
+    é propagada. Se ``timings`` for um dicionário, recebe a duração de cada tarefa.
+    """
+    def executar(nome, func):
+        inicio = time.perf_counter()
+        resultado = func()
+        if timings is not None:
+            timings[nome] = time.perf_counter() - inicio
+        return resultado
+
+    if max_workers <= 1 or len(tasks) <= 1:
+        return {nome: executar(nome, func) for nome, func in tasks.items()}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+        futures = {nome: pool.submit(executar, nome, func) for nome, func in tasks.items()}
+        return {nome: future.result() for nome, future in futures.items()}
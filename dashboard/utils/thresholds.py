@@ -0,0 +1,112 @@
+"""Análise de limiar de decisão a partir das pontuações do modelo.
+
+As pontuações do dataset rotulado são ordenadas uma única vez e as somas
+acumuladas de rótulos e valores ficam em memória. Qualquer limiar é então
+avaliado com uma busca binária (O(log n)), sem repontuar os pedidos.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.data import MODEL_DIR
+
+THRESHOLDS_PATH = MODEL_DIR / "thresholds.json"
+
+# Limiar escolhido no notebook de treinamento
+DEFAULT_THRESHOLD = 0.45
+
+
+class ScoreDistribution:
+    """Pontuações ordenadas e somas acumuladas de um conjunto rotulado."""
+
+    def __init__(self, scores, labels, amounts):
+        scores = np.asarray(scores, dtype=float)
+        ordem = np.argsort(-scores, kind="stable")
+        self._scores_asc = scores[ordem][::-1].copy()
+        labels = np.asarray(labels, dtype=np.int64)[ordem]
+        amounts = np.asarray(amounts, dtype=float)[ordem]
+
+        # Posição k = métricas dos k pedidos com maior pontuação
+        self._tp = np.concatenate([[0], np.cumsum(labels)])
+        self._amount = np.concatenate([[0.0], np.cumsum(amounts)])
+        self._fraud_amount = np.concatenate([[0.0], np.cumsum(amounts * labels)])
+        self.n = len(scores)
+        self.positives = int(self._tp[-1])
+
+    def flagged(self, threshold):
+        """Número de pedidos com pontuação >= ``threshold``."""
+        return self.n - np.searchsorted(self._scores_asc, threshold, side="left")
+
+    def metrics(self, threshold):
+        """Precisão, recall, F1, volume e exposição financeira em um limiar."""
+        k = self.flagged(threshold)
+        tp = self._tp[k]
+        precisao = tp / k if k else 0.0
+        recall = tp / self.positives if self.positives else 0.0
+        f1 = 2 * precisao * recall / (precisao + recall) if precisao + recall else 0.0
+        return {
+            "limiar": float(threshold),
+            "precisao": float(precisao),
+            "recall": float(recall),
+            "f1": float(f1),
+            "pedidos_sinalizados": int(k),
+            "verdadeiros_positivos": int(tp),
+            "falsos_positivos": int(k - tp),
+            "valor_sinalizado": float(self._amount[k]),
+            "valor_fraudes_sinalizadas": float(self._fraud_amount[k]),
+        }
+
+    def curve(self, thresholds):
+        """Métricas para vários limiares (uma linha por limiar)."""
+        return pd.DataFrame([self.metrics(t) for t in thresholds])
+
+
+def build_distributions(scores, labels, amounts, regions):
+    """Cria a distribuição geral (chave ``None``) e uma por região."""
+    scores = np.asarray(scores)
+    labels = np.asarray(labels)
+    amounts = np.asarray(amounts)
+    regions = np.asarray(regions)
+
+    distributions = {None: ScoreDistribution(scores, labels, amounts)}
+    for region in np.unique(regions):
+        mascara = regions == region
+        distributions[region] = ScoreDistribution(scores[mascara], labels[mascara], amounts[mascara])
+    return distributions
+
+
+def load_thresholds(path=THRESHOLDS_PATH):
+    """Carrega os limiares salvos (``{"default": float, "regions": {...}}``)."""
+    if not path.exists():
+        return {"default": DEFAULT_THRESHOLD, "regions": {}}
+    with open(path, encoding="utf-8") as f:
+        thresholds = json.load(f)
+    thresholds.setdefault("default", DEFAULT_THRESHOLD)
+    thresholds.setdefault("regions", {})
+    return thresholds
+
+
+def save_thresholds(default, regions=None, path=THRESHOLDS_PATH):
+    """Salva os limiares escolhidos para uso na previsão."""
+    thresholds = {
+        "default": float(default),
+        "regions": {region: float(valor) for region, valor in (regions or {}).items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(thresholds, f, ensure_ascii=False, indent=2)
+    return thresholds
+
+
+def threshold_for(region, thresholds=None):
+    """Limiar aplicável a uma região (ou o limiar padrão)."""
+    thresholds = thresholds if thresholds is not None else load_thresholds()
+    return thresholds["regions"].get(region, thresholds["default"])
+
+
+def row_thresholds(regions, thresholds=None):
+    """Limiar de cada pedido pela sua região (o padrão para regiões sem limiar próprio)."""
+    thresholds = thresholds if thresholds is not None else load_thresholds()
+    regioes = pd.Series(np.asarray(regions, dtype=object))
+    return regioes.map(thresholds["regions"]).fillna(thresholds["default"]).to_numpy(dtype=float)
@@ -0,0 +1,152 @@
+"""Recursos compartilhados entre sessões e aquecimento do servidor.
+
+O dataset e o modelo ficam em ``st.cache_resource``: são carregados uma vez por
+processo e reaproveitados por todas as sessões (o modelo é recarregado se o
+arquivo ``.pkl`` mudar). As páginas chamam ``warm_up``,
+que carrega esses recursos em uma thread em segundo plano na primeira sessão.
+
+Para aquecer antes da primeira sessão (incluindo plotly/sklearn), inicie o
+dashboard por este módulo (a partir da pasta ``dashboard/``)::
+
+    python -m utils.warmup [opções do streamlit run]
+"""
+
+import importlib
+import os
+import sys
+import threading
+from pathlib import Path
+
+import streamlit as st
+
+from utils.data import dashboard_dataset_path, load_data
+
+HOME_PATH = Path(__file__).resolve().parent.parent / "Home.py"
+
+# Bibliotecas importadas sob demanda pelas páginas
+HEAVY_MODULES = ("plotly.express", "sklearn.ensemble", "scipy.sparse", "joblib")
+
+_iniciado = threading.Event()
+
+
+@st.cache_resource(show_spinner=False)
+def _dataset():
+    return load_data(dashboard_dataset_path())
+
+
+def get_dataset():
+    """Dataset compartilhado.
+
+    Retorna uma cópia rasa: as páginas podem criar ou substituir colunas sem
+    alterar o objeto em cache das outras sessões.
+    """
+    return _dataset().copy(deep=False)
+
+
+@st.cache_resource(show_spinner=False)
+def get_prediction_cache():
+    """Pipeline com cache LRU de previsões, compartilhado entre as sessões."""
+    from utils.prediction_cache import PredictionCache
+
+    return PredictionCache()
+
+
+def get_model():
+    """Pipeline preditivo (pré-processamento + modelo) compartilhado, recarregado quando o arquivo .pkl muda."""
+    return get_prediction_cache().model
+
+
+def get_model_signature():
+    """Versão do arquivo do modelo em uso, para invalidar caches derivados dele."""
+    return get_prediction_cache().signature
+
+
+@st.cache_resource(show_spinner=False)
+def get_kpi_store():
+    """Agregados e sketches por partição para os KPIs aproximados."""
+    from utils.sketches import KpiStore
+
+    return KpiStore.build(_dataset())
+
+
+@st.cache_resource(show_spinner=False)
+def get_bitmap_index():
+    """Índices de bitmap das dimensões filtráveis do dataset."""
+    from utils.bitmap_index import BitmapIndex
+
+    return BitmapIndex.build(_dataset())
+
+
+@st.cache_resource(show_spinner=False)
+def get_query_engine():
+    """Dataset em Parquet com cache de consultas ad hoc (convertido do CSV, se preciso)."""
+    from utils.query import QueryEngine, build_dataset
+
+    build_dataset(dashboard_dataset_path())
+    return QueryEngine()
+
+
+@st.cache_resource(show_spinner=False)
+def _example_drift_monitor(reference_version):
+    from utils.drift import DriftMonitor, load_reference
+
+    monitor = DriftMonitor(load_reference())
+    monitor.update(_dataset())
+    return monitor
+
+
+def get_example_drift_monitor():
+    """Monitor de drift de exemplo com o dataset inteiro, para quando não há lotes pontuados.
+
+    Montado uma vez por processo (e de novo se a referência do drift mudar).
+    """
+    from utils.drift import REFERENCE_PATH
+
+    return _example_drift_monitor(os.stat(REFERENCE_PATH).st_mtime_ns)
+
+
+def preload(imports=True):
+    """Carrega as bibliotecas pesadas, o dataset, os índices, os agregados e o modelo no processo atual."""
+    if imports:
+        for modulo in HEAVY_MODULES:
+            importlib.import_module(modulo)
+    get_dataset()
+    get_bitmap_index()
+    get_kpi_store()
+    try:
+        get_model()
+    except FileNotFoundError:
+        pass
+
+
+def warm_up():
+    """Inicia (uma única vez por processo) o carregamento do dataset, dos índices e do modelo.
+
+    Roda em segundo plano sem pré-importar as bibliotecas de ``HEAVY_MODULES``
+    (isso só acontece em ``main``, antes de aceitar conexões). Os recursos ainda
+    importam o que usam: ``utils.bitmap_index``, ``utils.sketches``,
+    ``utils.prediction_cache`` e, ao desserializar o modelo, joblib e sklearn.
+    Essas importações podem coincidir com as das páginas; o import lock por
+    módulo do Python as serializa. O acesso simultâneo aos recursos é serializado
+    pelo ``st.cache_resource``.
+    """
+    if not _iniciado.is_set():
+        _iniciado.set()
+        threading.Thread(target=preload, args=(False,), name="warm-up", daemon=True).start()
+
+
+def main():
+    from streamlit.web import cli
+
+    from utils import warmup
+
+    # Pelo módulo importado (não ``__main__``): as chaves do ``st.cache_resource``
+    # incluem o módulo da função, e as páginas leem os caches e o evento de ``utils.warmup``.
+    # Antes de aceitar conexões: nenhuma sessão concorre com o pré-carregamento
+    warmup.preload()
+    warmup._iniciado.set()
+    cli.main(["run", str(HOME_PATH), *sys.argv[1:]])
+
+
+if __name__ == "__main__":
+    main()